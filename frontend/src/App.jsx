@@ -52,9 +52,13 @@ const RegAndLogout = () => {
 };
 
 function App() {
-  setInterval(() => {
-    api.get("/api/cotizaciones/");
-  }, 45000); // 45 seconds interval
+  useEffect(() => {
+    // Keeps the backend awake; the rates are cached there and in the browser
+    const interval = setInterval(() => {
+      api.get("/api/cotizacion/");
+    }, 45000); // 45 seconds interval
+    return () => clearInterval(interval);
+  }, []);
 
   return (
     <>
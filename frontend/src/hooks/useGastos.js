@@ -6,6 +6,33 @@ import { ACCESS_TOKEN } from '../constants';
 let gastosCache = null;
 let cacheTimestamp = null;
 const CACHE_DURATION = 5 * 60 * 1000; // 5 minutes in milliseconds
+// Delta sync cursor of gastosCache (see /api/gastos/changes/)
+let syncCursor = null;
+
+// Newest first, the order of the list endpoint
+const byFechaDesc = (a, b) =>
+  b.fecha_gasto.localeCompare(a.fecha_gasto) || b.created_at.localeCompare(a.created_at) || a.id - b.id;
+
+// Applies the changes since syncCursor to `current`; without a cursor downloads everything
+const syncGastos = async (current) => {
+  const byId = new Map((current || []).map(gasto => [gasto.id, gasto]));
+  let since = current ? syncCursor : null;
+  for (;;) {
+    const { data } = await api.get('/api/gastos/changes/', { params: since ? { since } : {} });
+    if (data.reset) {
+      // Our cursor outlived the server's deletion log: start over
+      byId.clear();
+      since = null;
+      continue;
+    }
+    data.upserts.forEach(gasto => byId.set(gasto.id, gasto));
+    data.deleted.forEach(id => byId.delete(id));
+    since = data.cursor;
+    if (!data.has_more) break;
+  }
+  syncCursor = since;
+  return [...byId.values()].sort(byFechaDesc);
+};
 
 export const useGastos = () => {
   const [gastos, setGastos] = useState(gastosCache || []);
@@ -31,14 +58,15 @@ export const useGastos = () => {
       // Fetch fresh data
       setLoading(true);
       setError(null);
-      const response = await api.get('/api/gastos/');
+      // Only the changes since the last sync are downloaded once the cache exists
+      const synced = await syncGastos(gastosCache && syncCursor ? gastosCache : null);
       
       if (isMounted.current) {
         // Update cache
-        gastosCache = response.data;
+        gastosCache = synced;
         cacheTimestamp = Date.now();
         
-        setGastos(response.data);
+        setGastos(synced);
         setLoading(false);
       }
     } catch (err) {
@@ -57,6 +85,7 @@ export const useGastos = () => {
   const clearGastos = useCallback(() => {
     gastosCache = null;
     cacheTimestamp = null;
+    syncCursor = null;
     setGastos([]);
   }, []);
 
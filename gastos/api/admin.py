@@ -1,4 +1,7 @@
 from django.contrib import admin
+from django.db import transaction
+from django.utils import timezone
+from .grupos import grupos_changed
 from .models import Gasto, MedioPago, TokenActivity, LoginAttempt, Grupo, GrupoMembership, GrupoInvitation, ExpenseSplit
 
 # Register your models here.
@@ -47,6 +50,12 @@ class GastoAdmin(admin.ModelAdmin):
         }),
     )
 
+    def delete_queryset(self, request, queryset):
+        """Delete through Gasto.delete, which keeps rollups, counters and tombstones current."""
+        with transaction.atomic():
+            for gasto in queryset:
+                gasto.delete()
+
 @admin.register(TokenActivity)
 class TokenActivityAdmin(admin.ModelAdmin):
     list_display = ('token_jti_short', 'user', 'last_activity', 'is_active', 'ip_address', 'created_at')
@@ -77,13 +86,14 @@ class TokenActivityAdmin(admin.ModelAdmin):
     
     def deactivate_tokens(self, request, queryset):
         """Admin action to deactivate selected tokens."""
-        count = queryset.update(is_active=False)
+        # update() skips auto_now; sessions are read uncached, so nothing else to refresh
+        count = queryset.update(is_active=False, updated_at=timezone.now())
         self.message_user(request, f'{count} tokens deactivated successfully.')
     deactivate_tokens.short_description = 'Deactivate selected tokens'
     
     def activate_tokens(self, request, queryset):
         """Admin action to activate selected tokens."""
-        count = queryset.update(is_active=True)
+        count = queryset.update(is_active=True, updated_at=timezone.now())
         self.message_user(request, f'{count} tokens activated successfully.')
     activate_tokens.short_description = 'Activate selected tokens'
     
@@ -119,15 +129,15 @@ class LoginAttemptAdmin(admin.ModelAdmin):
 
 @admin.register(Grupo)
 class GrupoAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'grupo_type', 'owner', 'member_count', 'is_active', 'created_at')
+    list_display = ('id', 'name', 'grupo_type', 'owner', 'member_count', 'expense_count', 'is_active', 'created_at')
     list_filter = ('grupo_type', 'is_active', 'default_currency', 'created_at')
     search_fields = ('name', 'description', 'owner__username')
     ordering = ('-created_at',)
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('member_count', 'expense_count', 'created_at', 'updated_at')
     
     fieldsets = (
         ('Información Básica', {
-            'fields': ('name', 'description', 'grupo_type', 'owner')
+            'fields': ('name', 'description', 'grupo_type', 'owner', 'member_count', 'expense_count')
         }),
         ('Configuración', {
             'fields': ('default_currency', 'is_active', 'allow_new_members')
@@ -138,22 +148,31 @@ class GrupoAdmin(admin.ModelAdmin):
         }),
     )
     
-    def member_count(self, obj):
-        """Display number of active members."""
-        return obj.get_member_count()
-    member_count.short_description = 'Miembros'
-    
     actions = ['deactivate_grupos', 'activate_grupos']
+
+    def delete_queryset(self, request, queryset):
+        """Delete through Grupo.delete, which records the removed gastos and their members' changes."""
+        with transaction.atomic():
+            for grupo in queryset:
+                grupo.delete()
+    
+    def _set_active(self, queryset, is_active):
+        """Update ``is_active`` and invalidate the members' cached grupos and permissions."""
+        with transaction.atomic():
+            grupo_ids = list(queryset.values_list('pk', flat=True))
+            count = Grupo.objects.filter(pk__in=grupo_ids).update(is_active=is_active, updated_at=timezone.now())
+            grupos_changed(grupo_ids)
+        return count
     
     def deactivate_grupos(self, request, queryset):
         """Admin action to deactivate selected grupos."""
-        count = queryset.update(is_active=False)
+        count = self._set_active(queryset, False)
         self.message_user(request, f'{count} grupos desactivados exitosamente.')
     deactivate_grupos.short_description = 'Desactivar grupos seleccionados'
     
     def activate_grupos(self, request, queryset):
         """Admin action to activate selected grupos."""
-        count = queryset.update(is_active=True)
+        count = self._set_active(queryset, True)
         self.message_user(request, f'{count} grupos activados exitosamente.')
     activate_grupos.short_description = 'Activar grupos seleccionados'
 
@@ -179,6 +198,12 @@ class GrupoMembershipAdmin(admin.ModelAdmin):
         }),
     )
 
+    def delete_queryset(self, request, queryset):
+        """Delete through GrupoMembership.delete, which keeps member_count and the members' caches current."""
+        with transaction.atomic():
+            for membership in queryset:
+                membership.delete()
+
 
 @admin.register(GrupoInvitation)
 class GrupoInvitationAdmin(admin.ModelAdmin):
@@ -0,0 +1,128 @@
+import heapq
+import unicodedata
+from bisect import bisect_left
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db.models import Count, Max
+from django.utils import timezone
+
+from .caching import gasto_version
+from .models import Gasto
+
+
+VENDOR_DEFAULT_LIMIT = 10
+VENDOR_MAX_LIMIT = 50
+# A vendor last used this many days ago counts half as much as one used today
+VENDOR_HALF_LIFE_DAYS = 90
+VENDOR_CACHE_TIMEOUT = 24 * 60 * 60
+VENDOR_CACHE_KEY = 'gastos:vendors:{user_id}:{version}'
+# Indexes kept in process memory, so a keystroke skips unpickling the shared
+# cache entry; the least recently used users are dropped first
+VENDOR_LOCAL_INDEXES = 256
+
+_local_indexes = OrderedDict()
+_local_lock = Lock()
+
+
+def normalize_vendor(text):
+    """Casefolded ``text`` without accents or repeated spaces."""
+    decomposed = unicodedata.normalize('NFKD', text.casefold())
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).split())
+
+
+class VendorIndex:
+    """Sorted prefix index of one user's vendors.
+
+    ``keys`` holds the normalized vendor name and every suffix starting at a
+    word ("supermercado coto", "coto"), sorted, so the entries starting with
+    a prefix are one contiguous slice found with ``bisect``. ``entries[i]``
+    is the position in ``vendors`` of the vendor ``keys[i]`` belongs to;
+    vendors are stored best score first, so the lowest positions of a slice
+    are its best matches.
+    """
+
+    def __init__(self, vendors):
+        # vendors: (vendedor, count, last_used, score) tuples
+        self.vendors = sorted(vendors, key=lambda vendor: (-vendor[3], vendor[0]))
+        pairs = []
+        for position, (vendedor, *_) in enumerate(self.vendors):
+            words = normalize_vendor(vendedor).split(' ')
+            pairs.extend((' '.join(words[start:]), position) for start in range(len(words)))
+        pairs.sort()
+        self.keys = [key for key, _ in pairs]
+        self.entries = [position for _, position in pairs]
+
+    @classmethod
+    def build(cls, user, today=None):
+        """One grouped query over the user's gastos; spellings that normalize alike are merged."""
+        today = today or timezone.localdate()
+        rows = (
+            Gasto.objects.filter(user=user).order_by()
+            .values('vendedor')
+            .annotate(count=Count('id'), last_used=Max('fecha_gasto'))
+        )
+        # Show the spelling used most often, then most recently; the rest of
+        # the ties go to the first in code point order (capitalized first), so
+        # the choice never depends on the order the rows come back in
+        rows = sorted(rows, key=lambda row: (-row['count'], -row['last_used'].toordinal(), row['vendedor']))
+        merged = {}
+        for row in rows:
+            key = normalize_vendor(row['vendedor'])
+            if not key:
+                continue
+            current = merged.get(key)
+            if current is None:
+                merged[key] = [row['vendedor'], row['count'], row['last_used']]
+                continue
+            current[1] += row['count']
+            current[2] = max(current[2], row['last_used'])
+
+        vendors = []
+        for vendedor, count, last_used in merged.values():
+            age = max((today - last_used).days, 0)
+            vendors.append((vendedor, count, last_used, count * 0.5 ** (age / VENDOR_HALF_LIFE_DAYS)))
+        return cls(vendors)
+
+    def suggest(self, prefix, limit=VENDOR_DEFAULT_LIMIT):
+        """Up to ``limit`` vendors with a word starting with ``prefix``, best score first."""
+        prefix = normalize_vendor(prefix)
+        if not prefix:
+            best = range(min(limit, len(self.vendors)))
+        else:
+            # Every key starting with prefix sorts before prefix + the last code point
+            start = bisect_left(self.keys, prefix)
+            end = bisect_left(self.keys, prefix + '\U0010ffff', start)
+            best = heapq.nsmallest(limit, set(self.entries[start:end]))
+        return [
+            {'vendedor': vendedor, 'count': count, 'last_used': last_used}
+            for vendedor, count, last_used, _ in (self.vendors[position] for position in best)
+        ]
+
+
+def vendor_index(user):
+    """The user's VendorIndex for the current gasto version, built at most once per write."""
+    version = gasto_version(user.id)
+    with _local_lock:
+        local = _local_indexes.get(user.id)
+        if local is not None and local[0] == version:
+            _local_indexes.move_to_end(user.id)
+            return local[1]
+
+    key = VENDOR_CACHE_KEY.format(user_id=user.id, version=version)
+    index = cache.get(key)
+    if index is None:
+        index = VendorIndex.build(user)
+        cache.set(key, index, VENDOR_CACHE_TIMEOUT)
+
+    with _local_lock:
+        _local_indexes[user.id] = (version, index)
+        _local_indexes.move_to_end(user.id)
+        while len(_local_indexes) > VENDOR_LOCAL_INDEXES:
+            _local_indexes.popitem(last=False)
+    return index
+
+
+def suggest_vendors(user, prefix, limit=VENDOR_DEFAULT_LIMIT):
+    return vendor_index(user).suggest(prefix, limit)
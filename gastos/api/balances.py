@@ -0,0 +1,111 @@
+import heapq
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db import connection
+from django.db.models import F, FloatField, Func
+from django.db.models.functions import Coalesce
+
+from .models import ExpenseSplit
+
+
+# Splits whose debt is already settled
+SETTLED_SPLIT_STATUSES = ('paid', 'confirmed')
+
+
+def load_net_balances(grupo):
+    """Net balance of every member of ``grupo``: ``{moneda: {user id: cents}}``.
+
+    Each open split of a shared gasto is a debt of its user to whoever paid
+    the gasto (``paid_by``, or the user who registered it), less what was
+    already paid; the payer's own share is skipped. Every split becomes a
+    debit entry for its user and a credit entry for the payer, and one
+    grouped query over both sums them per moneda and member, so the result
+    has a row per member however many splits the grupo has. Members owed
+    money get a positive balance and debtors a negative one. Each split is
+    rounded to whole cents once, so the balances of a moneda add up to
+    exactly zero.
+    """
+    splits = (
+        ExpenseSplit.objects.filter(expense__grupo=grupo, expense__is_shared=True)
+        .exclude(status__in=SETTLED_SPLIT_STATUSES)
+        .annotate(
+            payer=Coalesce('expense__paid_by_id', 'expense__user_id'),
+            # ROUND(double) keeps the float type; Round() would cast each
+            # split to numeric on PostgreSQL
+            owed=Func((F('amount') - F('paid_amount')) * 100, function='ROUND', output_field=FloatField()),
+        )
+        .exclude(user_id=F('payer'))
+        .order_by()
+    )
+    debits = splits.values(moneda=F('expense__moneda'), member=F('user_id'), cents=-F('owed'))
+    credits = splits.values(moneda=F('expense__moneda'), member=F('payer'), cents=F('owed'))
+    entries, params = debits.union(credits, all=True).query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'SELECT moneda, member, SUM(cents) FROM ({entries}) entries GROUP BY moneda, member',
+            params,
+        )
+        rows = cursor.fetchall()
+
+    balances = defaultdict(dict)
+    for moneda, user_id, cents in rows:
+        if round(cents):
+            balances[moneda][user_id] = round(cents)
+    return dict(balances)
+
+
+def settle(balances):
+    """Transfers ``[(debtor id, creditor id, cents)]`` that bring ``balances`` to zero.
+
+    Greedy debt simplification: the largest debtor pays the largest
+    creditor as much as both allow, and whoever is left with a balance goes
+    back on its heap. Every transfer settles at least one member, so n
+    members with a balance need at most n - 1 transfers, found in
+    O(n log n). ``balances`` (``{user id: cents}``) must add up to zero.
+    """
+    creditors = [(-cents, user_id) for user_id, cents in balances.items() if cents > 0]
+    debtors = [(cents, user_id) for user_id, cents in balances.items() if cents < 0]
+    heapq.heapify(creditors)
+    heapq.heapify(debtors)
+    transfers = []
+    while creditors and debtors:
+        credit, creditor_id = heapq.heappop(creditors)
+        debt, debtor_id = heapq.heappop(debtors)
+        amount = min(-credit, -debt)
+        transfers.append((debtor_id, creditor_id, amount))
+        if credit + amount:
+            heapq.heappush(creditors, (credit + amount, creditor_id))
+        if debt + amount:
+            heapq.heappush(debtors, (debt + amount, debtor_id))
+    return transfers
+
+
+def grupo_balances(grupo):
+    """Balances and settlement transfers of ``grupo``, per moneda, ready to render.
+
+    Returns ``{moneda: {'balances': [...], 'transfers': [...]}}`` with the
+    members that owe or are owed money, largest credit first, and the
+    transfers of settle(). Costs two queries: the balances and the usernames.
+    """
+    net_balances = load_net_balances(grupo)
+    user_ids = {user_id for by_user in net_balances.values() for user_id in by_user}
+    usernames = dict(User.objects.filter(pk__in=user_ids).values_list('id', 'username')) if user_ids else {}
+
+    def user(user_id):
+        return {'id': user_id, 'username': usernames.get(user_id)}
+
+    result = {}
+    for moneda in sorted(net_balances):
+        by_user = net_balances[moneda]
+        result[moneda] = {
+            'balances': [
+                {'user': user(user_id), 'balance': cents / 100}
+                for user_id, cents in sorted(by_user.items(), key=lambda item: (-item[1], item[0]))
+            ],
+            'transfers': [
+                {'from': user(debtor_id), 'to': user(creditor_id), 'amount': cents / 100}
+                for debtor_id, creditor_id, cents in settle(by_user)
+            ],
+        }
+    return result
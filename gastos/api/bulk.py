@@ -0,0 +1,190 @@
+from django.contrib.auth.models import User
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .caching import gastos_changed
+from .models import Gasto, GastoTombstone, MedioPago
+from .categorization import CATEGORY_SOURCE_FIELDS, CategoryDeltas, keep_suggestion
+from .permissions import get_grupo_permissions, membership_allows
+from .rollups import ROLLUP_SOURCE_FIELDS, RollupDeltas
+from .serializers import GastoBulkItemSerializer
+
+
+BULK_MAX_ITEMS = 5000
+BULK_BATCH_SIZE = 500
+BULK_OPERATIONS = ('create', 'update', 'delete')
+RELATION_FIELDS = ('medio_pago', 'grupo', 'paid_by')
+
+
+def _field_errors(items, partial):
+    """Validate every item with a single list serializer; return (data, errors)."""
+    if not items:
+        return [], []
+    serializer = GastoBulkItemSerializer(data=items, many=True, partial=partial)
+    if serializer.is_valid():
+        return list(serializer.validated_data), [{} for _ in items]
+    return None, serializer.errors
+
+
+def _model_kwargs(item):
+    """Map validated item data to model attribute names (relations by id)."""
+    return {
+        f'{name}_id' if name in RELATION_FIELDS else name: value
+        for name, value in item.items()
+        if name != 'id'
+    }
+
+
+def apply_gasto_batch(user, payload):
+    """Validate and apply a batch of gasto creates, updates and deletes.
+
+    ``payload`` is ``{"create": [...], "update": [...], "delete": [ids]}``.
+    All items are validated first, with ownership of every referenced
+    medio de pago and gasto resolved through one query per table, and the
+    right to add gastos to each grupo read from the user's cached membership
+    map (see api.permissions).
+    Any error rejects the whole batch with a ValidationError holding one
+    error dict per item (empty for valid ones). Otherwise the writes run in a
+    single transaction with ``bulk_create`` / ``bulk_update``, together with
+    the monthly rollup changes of the whole batch, and the result lists the
+    ``index`` and ``id`` of every item. The gastos updated or deleted are
+    read with ``select_for_update()`` in that same transaction, so the
+    deltas are computed from the rows actually overwritten.
+    """
+    if not isinstance(payload, dict) or not set(payload) <= set(BULK_OPERATIONS):
+        raise ValidationError({'detail': f"Se espera un objeto con claves {', '.join(BULK_OPERATIONS)}."})
+    creates = payload.get('create') or []
+    updates = payload.get('update') or []
+    deletes = payload.get('delete') or []
+    for name, items in (('create', creates), ('update', updates), ('delete', deletes)):
+        if not isinstance(items, list):
+            raise ValidationError({name: 'Debe ser una lista.'})
+    if len(creates) + len(updates) + len(deletes) > BULK_MAX_ITEMS:
+        raise ValidationError({'detail': f'Máximo {BULK_MAX_ITEMS} elementos por lote.'})
+
+    create_data, create_errors = _field_errors(creates, partial=False)
+    update_data, update_errors = _field_errors(updates, partial=True)
+    delete_errors = [{} if isinstance(item, int) and not isinstance(item, bool) else {'id': ['Debe ser un id numérico.']} for item in deletes]
+    if create_data is None or update_data is None or any(delete_errors):
+        raise ValidationError(_error_payload(create_errors, update_errors, delete_errors))
+
+    for index, item in enumerate(create_data):
+        if 'id' in item:
+            create_errors[index]['id'] = ['No se permite id al crear.']
+    for index, item in enumerate(update_data):
+        if 'id' not in item:
+            update_errors[index]['id'] = ['Este campo es requerido.']
+
+    # Set-based ownership resolution: one query per referenced table
+    items = create_data + update_data
+    medio_pago_ids = {item['medio_pago'] for item in items if 'medio_pago' in item}
+    grupo_ids = {item['grupo'] for item in items if item.get('grupo') is not None}
+    payer_ids = {item['paid_by'] for item in items if item.get('paid_by') is not None}
+    update_ids = [item['id'] for item in update_data if 'id' in item]
+
+    owned_medios_pago = set(
+        MedioPago.objects.filter(user=user, id__in=medio_pago_ids).values_list('id', flat=True)
+    ) if medio_pago_ids else set()
+    memberships = get_grupo_permissions(user) if grupo_ids else {}
+    member_grupos = {grupo_id for grupo_id in grupo_ids if membership_allows(memberships.get(grupo_id), 'add_expenses')}
+    known_payers = set(User.objects.filter(id__in=payer_ids).values_list('id', flat=True)) if payer_ids else set()
+    with transaction.atomic():
+        # The deltas are computed from the rows being written: read and lock them
+        # in the write's transaction, in id order so concurrent batches cannot
+        # deadlock
+        existing = (
+            Gasto.objects.filter(user=user, id__in=update_ids).order_by('id').select_for_update().in_bulk()
+            if update_ids else {}
+        )
+        # Deleted rows are read with the columns their rollup and category count rows need
+        deletable = {
+            row['id']: row
+            for row in Gasto.objects.filter(user=user, id__in=deletes).order_by('id').select_for_update().values(
+                'id', *{*ROLLUP_SOURCE_FIELDS, *CATEGORY_SOURCE_FIELDS}
+            )
+        } if deletes else {}
+
+        def check_relations(item, errors):
+            if 'medio_pago' in item and item['medio_pago'] not in owned_medios_pago:
+                errors['medio_pago'] = ['Medio de pago inexistente o ajeno.']
+            if item.get('grupo') is not None and item['grupo'] not in member_grupos:
+                errors['grupo'] = ['No podés agregar gastos en este grupo.']
+            if item.get('paid_by') is not None and item['paid_by'] not in known_payers:
+                errors['paid_by'] = ['Usuario inexistente.']
+
+        for item, errors in zip(create_data, create_errors):
+            check_relations(item, errors)
+        seen = set()
+        for item, errors in zip(update_data, update_errors):
+            check_relations(item, errors)
+            if 'id' in item:
+                if item['id'] not in existing:
+                    errors['id'] = ['Gasto inexistente.']
+                elif item['id'] in seen:
+                    errors['id'] = ['Gasto repetido en el lote.']
+                seen.add(item['id'])
+        seen = set()
+        for gasto_id, errors in zip(deletes, delete_errors):
+            if gasto_id not in deletable:
+                errors['id'] = ['Gasto inexistente.']
+            elif gasto_id in seen:
+                errors['id'] = ['Gasto repetido en el lote.']
+            seen.add(gasto_id)
+
+        if any(create_errors) or any(update_errors) or any(delete_errors):
+            raise ValidationError(_error_payload(create_errors, update_errors, delete_errors))
+
+        new_gastos = [Gasto(user=user, **_model_kwargs(item)) for item in create_data]
+        deltas = RollupDeltas()
+        deltas.add_all(new_gastos)
+        deltas.add_all((deletable[gasto_id] for gasto_id in deletes), sign=-1)
+        categories = CategoryDeltas()
+        categories.add_all(new_gastos)
+        categories.add_all((deletable[gasto_id] for gasto_id in deletes), sign=-1)
+        changed_gastos = []
+        changed_fields = set()
+        now = timezone.now()
+        for item in update_data:
+            gasto = existing[item['id']]
+            deltas.add(gasto, sign=-1)
+            categories.add(gasto, sign=-1)
+            previous = {'categoria': gasto.categoria, 'categoria_automatica': gasto.categoria_automatica}
+            for name, value in _model_kwargs(item).items():
+                setattr(gasto, name, value)
+            if keep_suggestion(gasto, previous):
+                changed_fields.add('categoria_automatica')
+            deltas.add(gasto)
+            categories.add(gasto)
+            changed_fields.update(name for name in item if name != 'id')
+            # bulk_update() skips auto_now
+            gasto.updated_at = now
+            changed_gastos.append(gasto)
+
+        Gasto.objects.bulk_create(new_gastos, batch_size=BULK_BATCH_SIZE)
+        if changed_gastos:
+            Gasto.objects.bulk_update(
+                changed_gastos, sorted(changed_fields | {'updated_at'}), batch_size=BULK_BATCH_SIZE
+            )
+        if deletes:
+            GastoTombstone.objects.bulk_create(
+                (GastoTombstone(user=user, gasto_id=gasto_id) for gasto_id in deletes), batch_size=BULK_BATCH_SIZE
+            )
+            Gasto.objects.filter(user=user, id__in=deletes).delete()
+        deltas.apply()
+        categories.apply()
+        gastos_changed(user.id)
+
+        return {
+            'created': [{'index': index, 'id': gasto.id} for index, gasto in enumerate(new_gastos)],
+            'updated': [{'index': index, 'id': gasto.id} for index, gasto in enumerate(changed_gastos)],
+            'deleted': [{'index': index, 'id': gasto_id} for index, gasto_id in enumerate(deletes)],
+        }
+
+
+def _error_payload(create_errors, update_errors, delete_errors):
+    errors = {}
+    for name, item_errors in (('create', create_errors), ('update', update_errors), ('delete', delete_errors)):
+        if any(item_errors):
+            errors[name] = item_errors
+    return errors
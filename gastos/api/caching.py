@@ -0,0 +1,56 @@
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+VERSION_KEY = '{scope}:version:{user_id}'
+
+# Scopes of per-user data whose caches and HTTP validators follow a version
+GASTOS = 'gastos'
+MEDIOS_PAGO = 'medios_pago'
+GRUPOS = 'grupos'
+
+
+def get_version(scope, user_id):
+    """Current version of ``user_id``'s data in ``scope``; changes on every committed write.
+
+    Versions are nanosecond timestamps of the last write, so cache keys that
+    embed one are invalidated all at once without deleting anything, and
+    ``version_timestamp()`` can feed a Last-Modified header.
+    """
+    key = VERSION_KEY.format(scope=scope, user_id=user_id)
+    version = cache.get(key)
+    if version is None:
+        # Seed from the clock so a version lost on eviction is never reused
+        version = time.time_ns()
+        if not cache.add(key, version, timeout=None):
+            version = cache.get(key, version)
+    return version
+
+
+def version_timestamp(version):
+    """Seconds since the epoch of a version returned by ``get_version``."""
+    return version // 1_000_000_000
+
+
+def versions_changed(scope, *user_ids):
+    """Bump the ``scope`` version of ``user_ids`` once the current transaction commits.
+
+    Bumping after the commit keeps a concurrent request from caching data
+    computed from the old rows under the new version.
+    """
+    def bump():
+        for user_id in set(user_ids):
+            key = VERSION_KEY.format(scope=scope, user_id=user_id)
+            cache.set(key, max(time.time_ns(), (cache.get(key) or 0) + 1), timeout=None)
+
+    transaction.on_commit(bump)
+
+
+def gasto_version(user_id):
+    return get_version(GASTOS, user_id)
+
+
+def gastos_changed(*user_ids):
+    versions_changed(GASTOS, *user_ids)
@@ -0,0 +1,133 @@
+from collections import defaultdict
+
+from django.db.models import Count
+
+from .autocomplete import normalize_vendor
+from .models import Gasto, VendorCategoryCount
+from .rollups import upsert_counters
+
+
+# Gastos nobody categorized (statement imports, quick entries) land here;
+# they are what suggestions are for, not evidence for them
+UNCATEGORIZED = 'otros'
+# Gasto attributes that decide which VendorCategoryCount row a gasto counts towards
+CATEGORY_SOURCE_FIELDS = ('user_id', 'vendedor', 'categoria', 'categoria_automatica')
+# Share of a vendor's gastos the winning categoria needs before the batch
+# recategorize applies it
+RECATEGORIZE_MIN_CONFIDENCE = 0.6
+
+_vendedor_length = VendorCategoryCount._meta.get_field('vendedor').max_length
+
+
+def vendor_key(vendedor):
+    return normalize_vendor(vendedor or '')[:_vendedor_length]
+
+
+def touches_categories(update_fields):
+    """Whether a ``save(update_fields=...)`` can move a gasto between VendorCategoryCount rows."""
+    if update_fields is None:
+        return True
+    return any(Gasto._meta.get_field(name).attname in CATEGORY_SOURCE_FIELDS for name in update_fields)
+
+
+def keep_suggestion(gasto, previous):
+    """Carry ``previous``'s categoria_automatica over to ``gasto`` until its categoria is changed.
+
+    ``previous`` holds the stored ``categoria`` and ``categoria_automatica``.
+    A categoria set by recategorize_gastos stays out of the counts; once the
+    user picks another one it is theirs. Returns whether the flag changed.
+    """
+    suggested = previous['categoria_automatica'] and gasto.categoria == previous['categoria']
+    changed = gasto.categoria_automatica != suggested
+    gasto.categoria_automatica = suggested
+    return changed
+
+
+def _best(counts):
+    """``(categoria, confidence, count)`` of the most used categoria in ``{categoria: count}``."""
+    total = sum(counts.values())
+    # Ties go to the alphabetically first categoria, so the answer is stable
+    categoria, count = min(counts.items(), key=lambda item: (-item[1], item[0]))
+    return categoria, count / total, count
+
+
+def suggest_categoria(user, vendedor):
+    """Categoria the user most often chose for ``vendedor``, or None; one indexed query.
+
+    Returns ``{'categoria', 'confidence', 'count'}`` where ``confidence`` is
+    the share of the vendor's categorized gastos in that categoria.
+    """
+    key = vendor_key(vendedor)
+    if not key:
+        return None
+    counts = dict(
+        VendorCategoryCount.objects.filter(user=user, vendedor=key, count__gt=0).values_list('categoria', 'count')
+    )
+    if not counts:
+        return None
+    categoria, confidence, count = _best(counts)
+    return {'categoria': categoria, 'confidence': round(confidence, 2), 'count': count}
+
+
+def category_table(user):
+    """``{vendor key: (categoria, confidence)}`` for every vendor of the user; one query."""
+    counts = defaultdict(dict)
+    for key, categoria, count in VendorCategoryCount.objects.filter(user=user, count__gt=0).values_list(
+        'vendedor', 'categoria', 'count'
+    ):
+        counts[key][categoria] = count
+    return {key: _best(categorias)[:2] for key, categorias in counts.items()}
+
+
+def classify(rows, table, min_confidence=RECATEGORIZE_MIN_CONFIDENCE):
+    """Group uncategorized gasto ``rows`` (dicts with ``vendedor``) by the categoria ``table`` suggests.
+
+    Returns ``{categoria: [row, ...]}``; rows whose vendor has no suggestion
+    reaching ``min_confidence`` are left out.
+    """
+    classified = defaultdict(list)
+    for row in rows:
+        suggestion = table.get(vendor_key(row['vendedor']))
+        if suggestion is not None and suggestion[1] >= min_confidence:
+            classified[suggestion[0]].append(row)
+    return classified
+
+
+class CategoryDeltas:
+    """Collects per-(user, vendor, categoria) count changes of a write and applies them once.
+
+    Used like api.rollups.RollupDeltas: add the old version of every touched
+    gasto with ``sign=-1`` and the new one with ``sign=1``, then ``apply()``
+    in the transaction of the gasto write.
+    """
+
+    def __init__(self):
+        self.changes = defaultdict(int)
+
+    def add(self, gasto, sign=1):
+        if not isinstance(gasto, dict):
+            gasto = {name: getattr(gasto, name) for name in CATEGORY_SOURCE_FIELDS}
+        if gasto['categoria_automatica']:
+            # Guesses of recategorize_gastos are not evidence for more guesses
+            return
+        key = vendor_key(gasto['vendedor'])
+        if gasto['categoria'] != UNCATEGORIZED and key:
+            self.changes[(gasto['user_id'], key, gasto['categoria'])] += sign
+
+    def add_all(self, gastos, sign=1):
+        for gasto in gastos:
+            self.add(gasto, sign)
+
+    def subtract_queryset(self, queryset):
+        """Remove the gastos of ``queryset`` (about to be deleted) with one grouped query."""
+        rows = queryset.order_by().values(*CATEGORY_SOURCE_FIELDS).annotate(count=Count('id'))
+        for row in rows:
+            self.add(row, -row['count'])
+
+    def apply(self):
+        upsert_counters(VendorCategoryCount, (
+            ({'user_id': user_id, 'vendedor': vendedor, 'categoria': categoria}, {'count': count})
+            for (user_id, vendedor, categoria), count in sorted(self.changes.items())
+            if count
+        ))
+        self.changes.clear()
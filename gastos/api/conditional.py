@@ -0,0 +1,52 @@
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date
+from rest_framework.response import Response
+
+from .caching import get_version, version_timestamp
+
+
+class ConditionalListMixin:
+    """Answers an unchanged list GET with ``304 Not Modified``.
+
+    The validator is built from one aggregate query (row count and newest
+    ``updated_at`` of the user's collection), the per-user write versions of
+    ``version_scopes`` (see api.caching) and the query string. It is computed
+    before the list query, so a matching ``If-None-Match`` or
+    ``If-Modified-Since`` never reaches the paginator or the serializer.
+    ``Cache-Control: private, no-cache`` lets the browser keep the body and
+    revalidate it on every request.
+    """
+    version_scopes = ()
+
+    def get_conditional_queryset(self):
+        """Rows whose changes alter the list; the unfiltered queryset by default."""
+        return self.get_queryset()
+
+    def get_conditional_aggregates(self):
+        return {'count': Count('pk', distinct=True), 'updated_at': Max('updated_at')}
+
+    def get_validators(self, request):
+        state = self.get_conditional_queryset().order_by().aggregate(**self.get_conditional_aggregates())
+        versions = [get_version(scope, request.user.id) for scope in self.version_scopes]
+        key = '|'.join([str(request.user.id), request.get_full_path(), *map(str, state.values()), *map(str, versions)])
+        etag = f'W/"{hashlib.sha256(key.encode()).hexdigest()[:32]}"'
+        timestamps = [int(value.timestamp()) for value in state.values() if hasattr(value, 'timestamp')]
+        timestamps += [version_timestamp(version) for version in versions]
+        return etag, max(timestamps, default=None)
+
+    def list(self, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        conditional = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if conditional is not None:
+            response = Response(status=conditional.status_code)
+        else:
+            response = super().list(request, *args, **kwargs)
+        response['ETag'] = etag
+        if last_modified is not None:
+            response['Last-Modified'] = http_date(last_modified)
+        response['Cache-Control'] = 'private, no-cache'
+        patch_vary_headers(response, ('Authorization',))
+        return response
@@ -0,0 +1,112 @@
+from collections import defaultdict
+from datetime import timedelta
+from decimal import ROUND_HALF_UP, Decimal
+from difflib import SequenceMatcher
+
+from django.db.models import FloatField, Value
+from django.db.models.functions import Round
+
+from .autocomplete import normalize_vendor
+from .models import Gasto
+
+
+# Two gastos may be the same expense entered twice when they have the same
+# rounded monto and moneda, dates at most this many days apart and similar vendors
+DUPLICATE_DAY_WINDOW = 1
+DUPLICATE_VENDOR_SIMILARITY = 0.8
+# Columns the duplicate scan reads, in the order it reads them
+DUPLICATE_COLUMNS = ('id', 'monto', 'moneda', 'fecha_gasto', 'vendedor')
+
+
+_CENT = Decimal('0.01')
+
+
+def monto_bucket(monto):
+    """``monto`` rounded to cents exactly like the ``Round('monto', 2)`` of the bucket index.
+
+    PostgreSQL casts the double to numeric with 15 significant digits and
+    rounds half away from zero, so 2.675 falls in 2.68; Python's
+    ``round(2.675, 2)`` would give 2.67 and split the pair across buckets.
+    """
+    return Decimal(f'{monto:.15g}').quantize(_CENT, ROUND_HALF_UP)
+
+
+def similar_vendors(first, second):
+    """Whether two normalized vendor names likely name the same shop ("coto" / "merpago*coto")."""
+    if first == second or (first and second and (first in second or second in first)):
+        return True
+    return SequenceMatcher(None, first, second).ratio() >= DUPLICATE_VENDOR_SIMILARITY
+
+
+def find_duplicates(gasto, queryset=None):
+    """Gastos of ``gasto``'s user that look like the same expense; one bucket index lookup.
+
+    The lookup matches the ``gasto_duplicate_bucket_idx`` expression index
+    on (user, moneda, rounded monto, fecha_gasto); vendor similarity is
+    then checked on the few candidates.
+    """
+    if queryset is None:
+        queryset = Gasto.objects.all()
+    window = timedelta(days=DUPLICATE_DAY_WINDOW)
+    candidates = (
+        queryset.order_by('fecha_gasto', 'id')
+        .alias(monto_bucket=Round('monto', 2))
+        .filter(
+            user_id=gasto.user_id,
+            moneda=gasto.moneda,
+            monto_bucket=Round(Value(float(gasto.monto), output_field=FloatField()), 2),
+            fecha_gasto__range=(gasto.fecha_gasto - window, gasto.fecha_gasto + window),
+        )
+        .exclude(pk=gasto.pk)
+    )
+    vendedor = normalize_vendor(gasto.vendedor)
+    return [candidate for candidate in candidates if similar_vendors(vendedor, normalize_vendor(candidate.vendedor))]
+
+
+def duplicate_clusters(rows):
+    """Group ``rows`` (tuples of DUPLICATE_COLUMNS) into clusters of likely duplicates.
+
+    Rows are hashed into buckets by (rounded monto, moneda, day); each row is
+    compared only against the buckets of its own and the neighbouring days,
+    so the scan is linear in the number of rows instead of quadratic.
+    Returns lists of ids, each sorted, with two ids or more.
+    """
+    buckets = defaultdict(list)
+    vendors = {}
+    parents = {}
+    # Histories repeat a few vendors many times: normalize and compare each once
+    normalized = {}
+    similar = {}
+
+    def root(gasto_id):
+        while parents[gasto_id] != gasto_id:
+            parents[gasto_id] = parents[parents[gasto_id]]
+            gasto_id = parents[gasto_id]
+        return gasto_id
+
+    for gasto_id, monto, moneda, fecha, vendedor in rows:
+        parents[gasto_id] = gasto_id
+        if vendedor not in normalized:
+            normalized[vendedor] = normalize_vendor(vendedor)
+        vendors[gasto_id] = normalized[vendedor]
+        day = fecha.toordinal()
+        key = (monto_bucket(monto), moneda)
+        for other_day in range(day - DUPLICATE_DAY_WINDOW, day + DUPLICATE_DAY_WINDOW + 1):
+            for other_id in buckets.get((*key, other_day), ()):
+                pair = (vendors[gasto_id], vendors[other_id])
+                if pair not in similar:
+                    similar[pair] = similar_vendors(*pair)
+                if similar[pair]:
+                    parents[root(gasto_id)] = root(other_id)
+        buckets[(*key, day)].append(gasto_id)
+
+    clusters = defaultdict(list)
+    for gasto_id in parents:
+        clusters[root(gasto_id)].append(gasto_id)
+    return [sorted(ids) for ids in clusters.values() if len(ids) > 1]
+
+
+def scan_duplicates(user):
+    """Clusters of likely duplicates in the user's whole history; one streamed query."""
+    rows = Gasto.objects.filter(user=user).order_by().values_list(*DUPLICATE_COLUMNS)
+    return duplicate_clusters(rows.iterator(chunk_size=2000))
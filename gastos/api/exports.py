@@ -0,0 +1,84 @@
+import csv
+import io
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+EXPORT_CHUNK_SIZE = 2000
+# Flush the text buffer to the response roughly every 64 KiB
+EXPORT_BUFFER_SIZE = 64 * 1024
+
+# Column name in the export -> lookup passed to values()
+EXPORT_COLUMNS = (
+    ('id', 'id'),
+    ('fecha_gasto', 'fecha_gasto'),
+    ('titulo', 'titulo'),
+    ('vendedor', 'vendedor'),
+    ('categoria', 'categoria'),
+    ('moneda', 'moneda'),
+    ('monto', 'monto'),
+    ('pagos_realizados', 'pagos_realizados'),
+    ('pagos_totales', 'pagos_totales'),
+    ('medio_pago', 'medio_pago__ente_emisor'),
+    ('grupo', 'grupo__name'),
+    ('is_shared', 'is_shared'),
+    ('comentarios', 'comentarios'),
+    ('created_at', 'created_at'),
+)
+
+EXPORT_FORMATS = {
+    'csv': 'text/csv; charset=utf-8',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def iter_export_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Yield one dict per gasto, reading the database ``chunk_size`` rows at a time.
+
+    Rows are fetched with ``values()`` over ``iterator()`` so no model
+    instances are built and no result cache accumulates.
+    """
+    lookups = [lookup for _, lookup in EXPORT_COLUMNS]
+    names = [name for name, _ in EXPORT_COLUMNS]
+    for values in queryset.values_list(*lookups).iterator(chunk_size=chunk_size):
+        yield dict(zip(names, values))
+
+
+def _buffered(lines):
+    buffer = io.StringIO()
+    for line in lines:
+        buffer.write(line)
+        if buffer.tell() >= EXPORT_BUFFER_SIZE:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def _csv_lines(rows):
+    line = io.StringIO()
+    writer = csv.writer(line)
+
+    def render(values):
+        line.seek(0)
+        line.truncate()
+        writer.writerow(values)
+        return line.getvalue()
+
+    yield render([name for name, _ in EXPORT_COLUMNS])
+    for row in rows:
+        yield render(row.values())
+
+
+def _ndjson_lines(rows):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def stream_export(queryset, export_format, chunk_size=EXPORT_CHUNK_SIZE):
+    """Return a generator of text chunks with the queryset rendered as CSV or NDJSON."""
+    rows = iter_export_rows(queryset, chunk_size=chunk_size)
+    lines = _csv_lines(rows) if export_format == 'csv' else _ndjson_lines(rows)
+    return _buffered(lines)
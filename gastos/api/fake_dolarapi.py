@@ -0,0 +1,156 @@
+import json
+import random
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from django.utils import timezone
+
+
+# Quotes served by the fake, shaped like dolarapi's /v1/dolares and /v1/cotizaciones
+FAKE_DOLARES = (
+    ('oficial', 'Oficial', 1050.0, 1090.0),
+    ('blue', 'Blue', 1180.0, 1200.0),
+    ('bolsa', 'Bolsa', 1150.0, 1160.0),
+    ('contadoconliqui', 'Contado con liquidación', 1160.0, 1170.0),
+    ('mayorista', 'Mayorista', 1060.0, 1070.0),
+    ('cripto', 'Cripto', 1170.0, 1190.0),
+    ('tarjeta', 'Tarjeta', 1365.0, 1417.0),
+)
+FAKE_COTIZACIONES = (
+    ('USD', 'oficial', 'Dólar', 1050.0, 1090.0),
+    ('EUR', 'oficial', 'Euro', 1140.0, 1190.0),
+    ('BRL', 'oficial', 'Real Brasileño', 180.0, 195.0),
+    ('CLP', 'oficial', 'Peso Chileno', 1.1, 1.2),
+    ('UYU', 'oficial', 'Peso Uruguayo', 25.0, 27.0),
+)
+
+
+def fake_quotes(path):
+    """Body of ``path`` (``/v1/dolares`` or ``/v1/cotizaciones``), or None for unknown paths."""
+    fecha = timezone.now().isoformat()
+    if path.rstrip('/') == '/v1/dolares':
+        return [
+            {'moneda': 'USD', 'casa': casa, 'nombre': nombre, 'compra': compra, 'venta': venta,
+             'fechaActualizacion': fecha}
+            for casa, nombre, compra, venta in FAKE_DOLARES
+        ]
+    if path.rstrip('/') == '/v1/cotizaciones':
+        return [
+            {'moneda': moneda, 'casa': casa, 'nombre': nombre, 'compra': compra, 'venta': venta,
+             'fechaActualizacion': fecha}
+            for moneda, casa, nombre, compra, venta in FAKE_COTIZACIONES
+        ]
+    return None
+
+
+class _Handler(BaseHTTPRequestHandler):
+    # HTTP/1.1 keeps connections open, so pooled clients can reuse them
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, a reused
+    # connection would wait for the client's delayed ACK (~40 ms) in between
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        super().setup()
+        self.server.fake.record_connection()
+
+    def do_GET(self):
+        fake = self.server.fake
+        fake.record_request()
+        if fake.latency:
+            time.sleep(fake.latency)
+        if fake.should_fail():
+            self._send(fake.error_status, {'error': 'fake dolarapi failure'})
+            return
+        body = fake_quotes(self.path.split('?', 1)[0])
+        if body is None:
+            self._send(404, {'error': 'not found'})
+        else:
+            self._send(200, body)
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        try:
+            self.end_headers()
+            self.wfile.write(payload)
+        except (BrokenPipeError, ConnectionResetError):
+            # The client gave up first (timeouts, cancelled trials); nothing to answer
+            self.close_connection = True
+
+    def log_message(self, format, *args):
+        if self.server.fake.verbose:
+            super().log_message(format, *args)
+
+
+class _Server(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        # Clients that hang up mid-request are expected; report anything else
+        if not isinstance(sys.exc_info()[1], ConnectionError):
+            super().handle_error(request, client_address)
+
+
+class FakeDolarapi:
+    """Local stand-in for dolarapi with configurable latency and failures, for tests and benchmarks.
+
+    ``latency`` seconds are added to every response; ``error_rate`` of the
+    responses (0 to 1) are ``error_status`` errors, and ``down = True``
+    fails all of them. Used as a context manager it serves on a free port in
+    a background thread; ``url`` is then the base URL to give the client.
+    ``requests`` and ``connections`` count what the server has received.
+    """
+
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0, error_rate=0.0, error_status=503, seed=None, verbose=False):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.down = False
+        self.verbose = verbose
+        self.requests = 0
+        self.connections = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.server = _Server((host, port), _Handler)
+        self.server.daemon_threads = True
+        self.server.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f'http://{host}:{port}/v1'
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+
+    def should_fail(self):
+        with self._lock:
+            return self.down or (self.error_rate > 0 and self._random.random() < self.error_rate)
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def start(self):
+        # A short poll interval makes stop() return promptly
+        self._thread = threading.Thread(target=self.server.serve_forever, kwargs={'poll_interval': 0.05}, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -0,0 +1,150 @@
+import math
+
+from django.db.models import F, Q
+from django.utils.dateparse import parse_date
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+from .models import Gasto
+
+
+# Whitelisted sort keys. Every ordering ends in a unique column so it can drive
+# keyset pagination, and each one is served by a (user, ...) composite index.
+GASTO_ORDERING_OPTIONS = {
+    '-fecha_gasto': ('-fecha_gasto', '-created_at', 'id'),
+    'fecha_gasto': ('fecha_gasto', 'created_at', '-id'),
+    '-monto': ('-monto', '-id'),
+    'monto': ('monto', 'id'),
+}
+
+# Gastos with installments left; matches the condition of gasto_user_pending_idx
+PENDING_GASTOS = Q(pagos_realizados__lt=F('pagos_totales'))
+
+TRUE_VALUES = ('true', '1', 'yes')
+FALSE_VALUES = ('false', '0', 'no')
+
+
+def _split(value):
+    return [item.strip() for item in value.split(',') if item.strip()]
+
+
+def filter_gastos(queryset, params):
+    """Apply the gasto list filters present in ``params``.
+
+    ``params`` is a QueryDict or plain dict. Invalid values raise a
+    ValidationError keyed by parameter name. Multi-valued filters accept a
+    comma separated list (``?categoria=comida,salud``).
+    """
+    filters = {}
+    errors = {}
+
+    for param, lookup in (('fecha_desde', 'fecha_gasto__gte'), ('fecha_hasta', 'fecha_gasto__lte')):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            parsed = parse_date(value)
+        except ValueError:
+            parsed = None
+        if parsed is None:
+            errors[param] = 'Fecha inválida, usar formato AAAA-MM-DD.'
+        else:
+            filters[lookup] = parsed
+
+    for param, choices in (('categoria', Gasto.CATEGORIAS_CHOICES), ('moneda', Gasto.MONEDAS_CHOICES)):
+        value = params.get(param)
+        if not value:
+            continue
+        values = _split(value)
+        valid = {key for key, _ in choices}
+        invalid = [item for item in values if item not in valid]
+        if invalid:
+            errors[param] = f'Valores inválidos: {", ".join(invalid)}.'
+        else:
+            filters[f'{param}__in'] = values
+
+    for param in ('grupo', 'medio_pago'):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            filters[f'{param}_id__in'] = [int(item) for item in _split(value)]
+        except ValueError:
+            errors[param] = 'Debe ser un id numérico o una lista separada por comas.'
+
+    value = params.get('is_shared')
+    if value:
+        if value.lower() in TRUE_VALUES:
+            filters['is_shared'] = True
+        elif value.lower() in FALSE_VALUES:
+            filters['is_shared'] = False
+        else:
+            errors['is_shared'] = 'Debe ser true o false.'
+
+    pending = None
+    value = params.get('pendiente')
+    if value:
+        if value.lower() in TRUE_VALUES:
+            pending = PENDING_GASTOS
+        elif value.lower() in FALSE_VALUES:
+            pending = ~PENDING_GASTOS
+        else:
+            errors['pendiente'] = 'Debe ser true o false.'
+
+    for param, lookup in (('monto_min', 'monto__gte'), ('monto_max', 'monto__lte')):
+        value = params.get(param)
+        if not value:
+            continue
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        # float() also accepts 'nan' and 'inf', which no monto can match
+        if number is None or not math.isfinite(number):
+            errors[param] = 'Debe ser un número.'
+        else:
+            filters[lookup] = number
+
+    if errors:
+        raise ValidationError(errors)
+    if pending is not None:
+        queryset = queryset.filter(pending)
+    return queryset.filter(**filters)
+
+
+def order_gastos(queryset, params):
+    """Order ``queryset`` by the whitelisted ``ordering`` key in ``params``."""
+    key = params.get('ordering')
+    if not key:
+        return queryset
+    if key not in GASTO_ORDERING_OPTIONS:
+        raise ValidationError({'ordering': f'Orden inválido. Opciones: {", ".join(GASTO_ORDERING_OPTIONS)}.'})
+    return queryset.order_by(*GASTO_ORDERING_OPTIONS[key])
+
+
+class GastoFilterBackend(BaseFilterBackend):
+    """Server-side filtering and sorting for the gasto list."""
+
+    def filter_queryset(self, request, queryset, view):
+        return order_gastos(filter_gastos(queryset, request.query_params), request.query_params)
+
+    def get_schema_operation_parameters(self, view):
+        def param(name, description, schema_type='string', schema_format=None):
+            schema = {'type': schema_type}
+            if schema_format:
+                schema['format'] = schema_format
+            return {'name': name, 'required': False, 'in': 'query', 'description': description, 'schema': schema}
+
+        return [
+            param('fecha_desde', 'Fecha mínima (inclusive)', schema_format='date'),
+            param('fecha_hasta', 'Fecha máxima (inclusive)', schema_format='date'),
+            param('categoria', 'Una o más categorías separadas por coma'),
+            param('moneda', 'Una o más monedas separadas por coma'),
+            param('grupo', 'Uno o más ids de grupo separados por coma'),
+            param('medio_pago', 'Uno o más ids de medio de pago separados por coma'),
+            param('is_shared', 'Solo gastos compartidos (true) o individuales (false)', 'boolean'),
+            param('pendiente', 'Solo gastos con cuotas por pagar (true) o saldados (false)', 'boolean'),
+            param('monto_min', 'Monto mínimo (inclusive)', 'number'),
+            param('monto_max', 'Monto máximo (inclusive)', 'number'),
+            param('ordering', f'Orden: {", ".join(GASTO_ORDERING_OPTIONS)}'),
+        ]
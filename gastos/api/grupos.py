@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.contrib.auth.models import User
+from django.db.models import Count, F, Prefetch, Sum
+
+from .caching import GRUPOS, versions_changed
+from .models import Gasto, Grupo, GrupoCurrencyTotal, GrupoMembership
+from .rate_history import latest_rates
+from .rates import cached_rates, convert
+
+
+def user_grupos(user):
+    """Grupos ``user`` has a membership in, ready for GrupoSerializer.
+
+    The counters are columns of the grupo and the ``members`` ids come from
+    one prefetch, so listing any number of grupos costs two queries (plus
+    grupo_totals() for the spend). Filtering through a membership subquery
+    instead of joining ``members`` avoids a DISTINCT.
+    """
+    return Grupo.objects.filter(
+        id__in=GrupoMembership.objects.filter(user=user).values('grupo_id')
+    ).prefetch_related(
+        # The serializer only renders the member ids
+        Prefetch('members', queryset=User.objects.only('pk'))
+    )
+
+
+def adjust_member_counts(changes):
+    """Apply ``{grupo id: change}`` to Grupo.member_count with atomic F() updates."""
+    # A stable order keeps concurrent writers from deadlocking on grupo rows
+    for grupo_id in sorted(changes):
+        if changes[grupo_id]:
+            Grupo.objects.filter(pk=grupo_id).update(member_count=F('member_count') + changes[grupo_id])
+
+
+def grupos_changed(grupo_ids):
+    """Invalidate the grupo lists and membership maps of everyone in ``grupo_ids`` (see api.caching).
+
+    Grupo.members_changed() for writes that skip the model, such as a
+    queryset ``update()``; the versions are bumped once the transaction
+    commits.
+    """
+    owner_ids = Grupo.objects.filter(pk__in=grupo_ids).values_list('owner_id', flat=True)
+    member_ids = GrupoMembership.objects.filter(grupo_id__in=grupo_ids).values_list('user_id', flat=True)
+    versions_changed(GRUPOS, *owner_ids, *member_ids)
+
+
+def apply_grupo_changes(changes):
+    """Apply ``{(grupo id, moneda): [total, count]}`` gasto changes to the grupo counters.
+
+    Updates GrupoCurrencyTotal and Grupo.expense_count with atomic F()
+    updates; RollupDeltas.apply() calls it with the changes of each gasto
+    write, in the write's transaction.
+    """
+    from .rollups import upsert_counters
+
+    expense_counts = defaultdict(int)
+    for (grupo_id, _), (_, count) in changes.items():
+        expense_counts[grupo_id] += count
+    upsert_counters(GrupoCurrencyTotal, (
+        ({'grupo_id': grupo_id, 'moneda': moneda}, {'total': total, 'count': count})
+        for (grupo_id, moneda), (total, count) in sorted(changes.items())
+        if count or abs(total) >= 0.005
+    ))
+    for grupo_id in sorted(expense_counts):
+        if expense_counts[grupo_id]:
+            Grupo.objects.filter(pk=grupo_id).update(expense_count=F('expense_count') + expense_counts[grupo_id])
+
+
+def expected_member_counts(grupo_ids):
+    """``{grupo id: active memberships}`` counted from api_grupo_membership; one query."""
+    rows = (
+        GrupoMembership.objects.filter(grupo_id__in=grupo_ids, is_active=True).order_by()
+        .values_list('grupo_id')
+        .annotate(count=Count('id'))
+    )
+    return dict(rows)
+
+
+def expected_currency_totals(grupo_ids):
+    """``{(grupo id, moneda): (total, count)}`` summed from api_gasto; one query."""
+    rows = (
+        Gasto.objects.filter(grupo_id__in=grupo_ids).order_by()
+        .values_list('grupo_id', 'moneda')
+        .annotate(total=Sum('monto'), count=Count('id'))
+    )
+    return {(grupo_id, moneda): (total, count) for grupo_id, moneda, total, count in rows}
+
+
+def stored_rates(monedas):
+    """Rates to convert ``monedas`` without calling dolarapi: the cached quotes, else the latest snapshots."""
+    return cached_rates() or latest_rates(monedas)
+
+
+def grupo_totals(grupos):
+    """Spend of every grupo in ``grupos``, per moneda and converted to its default_currency.
+
+    Returns ``{grupo id: {'totales_por_moneda': {moneda: total}, 'total': float | None}}``
+    from one query over the persisted GrupoCurrencyTotal rows. ``total`` is
+    None when a moneda cannot be converted (no exchange rates, or gastos in
+    'NA'). Rates come from stored_rates(), read once and only when some grupo
+    has gastos in a moneda other than its default_currency: serializing a
+    grupo never waits for dolarapi.
+    """
+    grupos = list(grupos)
+    sums = defaultdict(dict)
+    rows = (
+        GrupoCurrencyTotal.objects.filter(grupo_id__in=[grupo.pk for grupo in grupos])
+        .values_list('grupo_id', 'moneda', 'total')
+    )
+    for grupo_id, moneda, total in rows:
+        sums[grupo_id][moneda] = total
+
+    monedas = {
+        moneda
+        for grupo in grupos
+        for moneda in sums.get(grupo.pk, {})
+        if moneda != grupo.default_currency
+    }
+    if monedas:
+        monedas |= {grupo.default_currency for grupo in grupos}
+    rates = stored_rates(monedas) if monedas else None
+    totals = {}
+    for grupo in grupos:
+        by_currency = sums.get(grupo.pk, {})
+        total = 0.0
+        for moneda, amount in by_currency.items():
+            converted = convert(amount, moneda, grupo.default_currency, rates)
+            if converted is None:
+                total = None
+                break
+            total += converted
+        totals[grupo.pk] = {
+            'totales_por_moneda': {moneda: round(amount, 2) for moneda, amount in sorted(by_currency.items())},
+            'total': None if total is None else round(total, 2),
+        }
+    return totals
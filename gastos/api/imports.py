@@ -0,0 +1,266 @@
+import csv
+import hashlib
+import io
+from collections import Counter
+from datetime import datetime
+
+from django.contrib.auth.models import User
+from django.db import transaction
+
+from .caching import gastos_changed
+from .models import Gasto, MedioPago
+from .categorization import CategoryDeltas
+from .rollups import RollupDeltas
+
+
+IMPORT_CHUNK_SIZE = 1000
+# Keep at most this many row errors in the summary; the rest are only counted
+IMPORT_MAX_REPORTED_ERRORS = 100
+
+# Gasto field (or medio de pago key) -> accepted CSV headers, compared lowercased
+DEFAULT_COLUMN_ALIASES = {
+    'fecha_gasto': ('fecha_gasto', 'fecha', 'date'),
+    'monto': ('monto', 'importe', 'amount'),
+    'vendedor': ('vendedor', 'descripcion', 'descripción', 'comercio', 'detalle', 'description'),
+    'titulo': ('titulo', 'título'),
+    'moneda': ('moneda', 'currency'),
+    'categoria': ('categoria', 'categoría'),
+    'comentarios': ('comentarios', 'notas'),
+    'pagos_realizados': ('pagos_realizados',),
+    'pagos_totales': ('pagos_totales', 'cuotas'),
+    'ente_emisor': ('ente_emisor', 'emisor', 'banco'),
+    'extra': ('extra', 'tarjeta'),
+}
+
+DATE_FORMATS = ('%Y-%m-%d', '%d/%m/%Y', '%d-%m-%Y', '%d/%m/%y')
+CATEGORIAS = {key for key, _ in Gasto.CATEGORIAS_CHOICES}
+MONEDAS = {key for key, _ in Gasto.MONEDAS_CHOICES}
+
+
+class StatementImportError(ValueError):
+    """Raised when a statement cannot be imported at all (bad header, no medio de pago)."""
+
+
+def parse_amount(value):
+    """Parse ``1234.56``, ``1.234,56`` or ``1,234.56`` into a float."""
+    value = value.strip().replace('$', '').replace(' ', '')
+    if ',' in value and '.' in value:
+        if value.rfind(',') > value.rfind('.'):
+            value = value.replace('.', '').replace(',', '.')
+        else:
+            value = value.replace(',', '')
+    elif ',' in value:
+        value = value.replace(',', '.')
+    return float(value)
+
+
+def parse_statement_date(value, formats=DATE_FORMATS):
+    """Parse ``value`` with the first matching format; return ``(date, format)``."""
+    value = value.strip()
+    for date_format in formats:
+        try:
+            return datetime.strptime(value, date_format).date(), date_format
+        except ValueError:
+            continue
+    raise ValueError(value)
+
+
+def import_hash(fecha_gasto, monto, vendedor, occurrence):
+    """Content hash of an imported row.
+
+    ``occurrence`` numbers identical (fecha, monto, vendedor) rows within one
+    statement, so two equal purchases on the same day are both kept while
+    importing the same statement twice inserts nothing.
+    """
+    key = f'{fecha_gasto.isoformat()}|{monto:.2f}|{vendedor.strip().lower()}|{occurrence}'
+    return hashlib.sha256(key.encode('utf-8')).hexdigest()
+
+
+def open_text(binary_file, encoding='utf-8-sig'):
+    """Wrap an uploaded (binary) file so it can be read line by line as text."""
+    return io.TextIOWrapper(binary_file, encoding=encoding, newline='')
+
+
+class StatementImporter:
+    """Streams a bank/card statement CSV into gastos.
+
+    Rows are parsed one at a time from the text stream and inserted with
+    ``bulk_create`` every ``chunk_size`` rows, so the file is never held in
+    memory. Each chunk first looks up its content hashes on the
+    ``(user, import_hash)`` index and skips rows that were already imported.
+    """
+
+    def __init__(self, user, mapping=None, default_medio_pago=None, moneda='ARS',
+                 delimiter=None, chunk_size=IMPORT_CHUNK_SIZE):
+        self.user = user
+        self.mapping = self._validate_mapping(mapping or {})
+        self.moneda = moneda
+        self.delimiter = delimiter
+        self.chunk_size = chunk_size
+        self.medios_pago = list(MedioPago.objects.filter(user=user))
+        self.default_medio_pago = None
+        if default_medio_pago is not None:
+            self.default_medio_pago = next((mp for mp in self.medios_pago if str(mp.id) == str(default_medio_pago)), None)
+            if self.default_medio_pago is None:
+                raise StatementImportError('Medio de pago inexistente o ajeno.')
+        self._by_emisor_extra = {(mp.ente_emisor.lower(), mp.extra.lower()): mp for mp in self.medios_pago}
+        by_emisor = {}
+        for mp in self.medios_pago:
+            by_emisor.setdefault(mp.ente_emisor.lower(), []).append(mp)
+        # Only an unambiguous ente_emisor resolves without the extra column
+        self._by_emisor = {emisor: mps[0] for emisor, mps in by_emisor.items() if len(mps) == 1}
+        self._occurrences = Counter()
+        # Statements use one date format throughout: try the last match first
+        self._date_formats = DATE_FORMATS
+
+    @staticmethod
+    def _validate_mapping(mapping):
+        if not isinstance(mapping, dict):
+            raise StatementImportError('mapping debe ser un objeto JSON.')
+        unknown = sorted(str(field) for field in mapping if field not in DEFAULT_COLUMN_ALIASES)
+        if unknown:
+            raise StatementImportError(f"Campos de mapping desconocidos: {', '.join(unknown)}.")
+        invalid = sorted(field for field, column in mapping.items() if not isinstance(column, str) or not column.strip())
+        if invalid:
+            raise StatementImportError(f"El mapping debe indicar el nombre de columna como texto: {', '.join(invalid)}.")
+        return mapping
+
+    def run(self, text_stream):
+        """Import every row of ``text_stream``; return a summary dict."""
+        self.summary = {'rows': 0, 'created': 0, 'duplicates': 0, 'error_count': 0, 'errors': []}
+        reader = csv.reader(text_stream, delimiter=self._delimiter(text_stream))
+        try:
+            header = next(reader)
+        except StopIteration:
+            raise StatementImportError('El archivo está vacío.')
+        columns = self._resolve_columns(header)
+
+        chunk = []
+        for values in reader:
+            if not any(value.strip() for value in values):
+                continue
+            self.summary['rows'] += 1
+            gasto = self._build(reader.line_num, values, columns)
+            if gasto is not None:
+                chunk.append(gasto)
+            if len(chunk) >= self.chunk_size:
+                self._flush(chunk)
+                chunk = []
+        if chunk:
+            self._flush(chunk)
+        return self.summary
+
+    def _delimiter(self, text_stream):
+        if self.delimiter:
+            return self.delimiter
+        sample = text_stream.read(4096)
+        text_stream.seek(0)
+        try:
+            return csv.Sniffer().sniff(sample, delimiters=',;\t|').delimiter
+        except csv.Error:
+            return ','
+
+    def _resolve_columns(self, header):
+        normalized = {name.strip().lower(): index for index, name in enumerate(header)}
+        columns = {}
+        for field, aliases in DEFAULT_COLUMN_ALIASES.items():
+            candidates = [self.mapping[field]] if field in self.mapping else aliases
+            for candidate in candidates:
+                if candidate.strip().lower() in normalized:
+                    columns[field] = normalized[candidate.strip().lower()]
+                    break
+        missing = [field for field in ('fecha_gasto', 'monto', 'vendedor') if field not in columns]
+        if missing:
+            raise StatementImportError(f"Faltan columnas: {', '.join(missing)}.")
+        if 'ente_emisor' not in columns and self.default_medio_pago is None:
+            raise StatementImportError('Indicá un medio de pago o incluí la columna ente_emisor.')
+        return columns
+
+    def _error(self, line_number, errors):
+        self.summary['error_count'] += 1
+        if len(self.summary['errors']) < IMPORT_MAX_REPORTED_ERRORS:
+            self.summary['errors'].append({'line': line_number, 'errors': errors})
+
+    def _medio_pago(self, row):
+        emisor = row.get('ente_emisor', '').strip().lower()
+        if not emisor:
+            return self.default_medio_pago
+        extra = row.get('extra', '').strip().lower()
+        return self._by_emisor_extra.get((emisor, extra)) or (None if extra else self._by_emisor.get(emisor))
+
+    def _build(self, line_number, values, columns):
+        row = {field: values[index] if index < len(values) else '' for field, index in columns.items()}
+        errors = {}
+
+        try:
+            fecha_gasto, date_format = parse_statement_date(row['fecha_gasto'], self._date_formats)
+            if date_format != self._date_formats[0]:
+                self._date_formats = (date_format, *(f for f in DATE_FORMATS if f != date_format))
+        except ValueError:
+            errors['fecha_gasto'] = 'Fecha inválida.'
+        try:
+            monto = parse_amount(row['monto'])
+            if monto <= 0:
+                errors['monto'] = 'El monto debe ser positivo.'
+        except ValueError:
+            errors['monto'] = 'Monto inválido.'
+        vendedor = row['vendedor'].strip()[:128]
+        if not vendedor:
+            errors['vendedor'] = 'Vacío.'
+        moneda = row.get('moneda', '').strip().upper() or self.moneda
+        if moneda not in MONEDAS:
+            errors['moneda'] = 'Moneda inválida.'
+        categoria = row.get('categoria', '').strip().lower() or 'otros'
+        if categoria not in CATEGORIAS:
+            errors['categoria'] = 'Categoría inválida.'
+        try:
+            pagos_totales = int(row.get('pagos_totales') or 1)
+            pagos_realizados = int(row.get('pagos_realizados') or 1)
+        except ValueError:
+            errors['pagos_totales'] = 'Cuotas inválidas.'
+        medio_pago = self._medio_pago(row)
+        if medio_pago is None:
+            errors['medio_pago'] = 'No se encontró el medio de pago.'
+
+        if errors:
+            self._error(line_number, errors)
+            return None
+
+        key = (fecha_gasto, round(monto, 2), vendedor.lower())
+        self._occurrences[key] += 1
+        return Gasto(
+            user_id=self.user.id,
+            medio_pago_id=medio_pago.id,
+            titulo=(row.get('titulo', '').strip() or vendedor)[:32],
+            vendedor=vendedor,
+            monto=monto,
+            moneda=moneda,
+            categoria=categoria,
+            comentarios=row.get('comentarios', '').strip()[:256],
+            pagos_realizados=pagos_realizados,
+            pagos_totales=pagos_totales,
+            fecha_gasto=fecha_gasto,
+            import_hash=import_hash(fecha_gasto, monto, vendedor, self._occurrences[key]),
+        )
+
+    def _flush(self, chunk):
+        hashes = [gasto.import_hash for gasto in chunk]
+        with transaction.atomic():
+            # Imports of one user take turns on the user row, so the hashes read
+            # here are exactly the rows already stored: the deltas below count
+            # only the gastos this chunk inserts
+            list(User.objects.select_for_update().filter(pk=self.user.pk).values_list('pk', flat=True))
+            existing = set(
+                Gasto.objects.filter(user=self.user, import_hash__in=hashes).values_list('import_hash', flat=True)
+            )
+            new_gastos = [gasto for gasto in chunk if gasto.import_hash not in existing]
+            Gasto.objects.bulk_create(new_gastos)
+            deltas = RollupDeltas()
+            deltas.add_all(new_gastos)
+            deltas.apply()
+            categories = CategoryDeltas()
+            categories.add_all(new_gastos)
+            categories.apply()
+            gastos_changed(self.user.id)
+        self.summary['created'] += len(new_gastos)
+        self.summary['duplicates'] += len(chunk) - len(new_gastos)
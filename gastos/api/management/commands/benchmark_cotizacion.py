@@ -0,0 +1,99 @@
+import asyncio
+import time
+from contextlib import contextmanager
+
+import httpx
+from django.contrib.auth.models import User
+from django.core.asgi import get_asgi_application
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.urls import reverse
+from rest_framework_simplejwt.tokens import AccessToken
+
+from api.fake_dolarapi import FakeDolarapi
+from api.outbound import async_dolarapi, dolarapi
+from api.rates import DOLARES
+
+
+# (label, url name) of the endpoint variants under test
+VARIANTS = (
+    ('sync', 'cotizacion'),
+    ('async', 'cotizacion_async'),
+)
+
+
+@contextmanager
+def _upstream(url):
+    """Point both dolarapi clients at ``url`` with a closed circuit."""
+    previous = dolarapi.base_url, async_dolarapi.base_url
+    dolarapi.base_url = async_dolarapi.base_url = url
+    dolarapi.breaker.reset()
+    try:
+        yield
+    finally:
+        dolarapi.base_url, async_dolarapi.base_url = previous
+        dolarapi.breaker.reset()
+
+
+class Command(BaseCommand):
+    help = 'Load test the sync and async cotizacion endpoints through the ASGI app, against a local fake dolarapi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=100,
+            help='Concurrent requests per burst (default: 100)',
+        )
+        parser.add_argument(
+            '--bursts',
+            type=int,
+            default=5,
+            help='Bursts per variant; the quotes cache is emptied before each one (default: 5)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.2,
+            help='Seconds the fake dolarapi takes to answer (default: 0.2)',
+        )
+
+    def handle(self, *args, **options):
+        user = User.objects.create_user(username='__benchmark_cotizacion__')
+        try:
+            token = str(AccessToken.for_user(user))
+            with FakeDolarapi(latency=options['latency']) as fake, _upstream(fake.url):
+                asyncio.run(self._run(token, options))
+        finally:
+            # Also removes the token activity rows the requests created
+            user.delete()
+
+    async def _run(self, token, options):
+        transport = httpx.ASGITransport(app=get_asgi_application())
+        headers = {'Authorization': f'Bearer {token}'}
+        self.stdout.write(f"{'variant':<8} {'total s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7}")
+        async with httpx.AsyncClient(transport=transport, base_url='http://testserver', headers=headers, timeout=60) as client:
+            for label, url_name in VARIANTS:
+                await self._variant(client, label, reverse(url_name), options)
+
+    async def _variant(self, client, label, path, options):
+        timings, errors = [], 0
+
+        async def one():
+            started = time.perf_counter()
+            response = await client.get(path)
+            return (time.perf_counter() - started) * 1000, response.status_code
+
+        started = time.perf_counter()
+        for _ in range(options['bursts']):
+            # Cold cache: every burst waits for one upstream fetch
+            await cache.adelete_many([DOLARES.cache_key, DOLARES.lock_key])
+            for timing, status_code in await asyncio.gather(*(one() for _ in range(options['requests']))):
+                timings.append(timing)
+                errors += status_code != 200
+        elapsed = time.perf_counter() - started
+
+        timings.sort()
+        p50 = timings[len(timings) // 2]
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        self.stdout.write(f'{label:<8} {elapsed:>8.2f} {p50:>8.2f} {p99:>8.2f} {errors:>7}')
@@ -0,0 +1,120 @@
+import random
+import time
+from datetime import date, timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from api.filters import filter_gastos, order_gastos
+from api.models import Gasto, MedioPago
+
+
+# (label, query params) pairs exercised by the benchmark; one per list filter
+SCENARIOS = (
+    ('default order', {}),
+    ('date range', {'fecha_desde': '2024-01-01', 'fecha_hasta': '2024-03-31'}),
+    ('categoria', {'categoria': 'comida'}),
+    ('moneda', {'moneda': 'USD'}),
+    ('grupo', {'grupo': '{grupo}'}),
+    ('medio_pago', {'medio_pago': '{medio_pago}'}),
+    ('is_shared', {'is_shared': 'true'}),
+    ('pendiente', {'pendiente': 'true'}),
+    ('amount range', {'monto_min': '1000', 'monto_max': '5000'}),
+    ('order by monto', {'ordering': '-monto'}),
+)
+
+
+class Command(BaseCommand):
+    help = 'Time the gasto list filters and report which index serves each query.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Username whose gastos are queried (default: seed a throwaway user)',
+        )
+        parser.add_argument(
+            '--rows',
+            type=int,
+            default=50000,
+            help='Synthetic gastos to seed when no --user is given (default: 50000)',
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Executions per scenario, the median is reported (default: 20)',
+        )
+        parser.add_argument(
+            '--page-size',
+            type=int,
+            default=50,
+            help='Rows fetched per query, like one list page (default: 50)',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            if options['user']:
+                try:
+                    user = User.objects.get(username=options['user'])
+                except User.DoesNotExist:
+                    raise CommandError(f"User {options['user']} does not exist")
+            else:
+                user = self._seed(options['rows'])
+            self._run(user, options['repeat'], options['page_size'])
+            # Seeded rows are never kept
+            transaction.set_rollback(True)
+
+    def _seed(self, rows):
+        self.stdout.write(f'Seeding {rows} synthetic gastos (rolled back afterwards)...')
+        user = User.objects.create_user(username='__benchmark__')
+        other = User.objects.create_user(username='__benchmark_other__')
+        medios = [
+            MedioPago.objects.create(user=user, ente_emisor=f'Banco {i}', tipo='credito')
+            for i in range(5)
+        ]
+        other_medio = MedioPago.objects.create(user=other, ente_emisor='Banco', tipo='credito')
+        categorias = [key for key, _ in Gasto.CATEGORIAS_CHOICES]
+        monedas = [key for key, _ in Gasto.MONEDAS_CHOICES]
+        rng = random.Random(42)
+        start = date(2020, 1, 1)
+
+        def build(owner, medio):
+            # Roughly one in six gastos still has installments left
+            pagos_totales = rng.choice((1, 1, 1, 1, 3, 12))
+            return Gasto(
+                user=owner, medio_pago=medio, titulo='Benchmark', vendedor='Vendedor',
+                monto=round(rng.uniform(10, 10000), 2), moneda=rng.choice(monedas),
+                categoria=rng.choice(categorias), pagos_totales=pagos_totales,
+                pagos_realizados=pagos_totales if rng.random() < 0.5 else rng.randrange(pagos_totales),
+                fecha_gasto=start + timedelta(days=rng.randrange(2000)), is_shared=rng.random() < 0.1,
+            )
+
+        Gasto.objects.bulk_create((build(user, rng.choice(medios)) for _ in range(rows)), batch_size=5000)
+        # Other users' rows make the user prefix of each index selective
+        Gasto.objects.bulk_create((build(other, other_medio) for _ in range(rows)), batch_size=5000)
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute('ANALYZE api_gasto')
+        return user
+
+    def _run(self, user, repeat, page_size):
+        medio_pago = MedioPago.objects.filter(user=user).values_list('id', flat=True).first()
+        grupo = Gasto.objects.filter(user=user, grupo__isnull=False).values_list('grupo_id', flat=True).first()
+        index_names = [index.name for index in Gasto._meta.indexes]
+
+        self.stdout.write(f"{'scenario':<16} {'median ms':>10}  index")
+        for label, params in SCENARIOS:
+            params = {key: value.format(grupo=grupo or 0, medio_pago=medio_pago or 0) for key, value in params.items()}
+            queryset = order_gastos(filter_gastos(Gasto.objects.filter(user=user), params), params)[:page_size]
+
+            timings = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                list(queryset.values_list('id', flat=True))
+                timings.append((time.perf_counter() - started) * 1000)
+            timings.sort()
+
+            plan = queryset.explain()
+            used = [name for name in index_names if name in plan] or ['(none: sequential scan)']
+            self.stdout.write(f"{label:<16} {timings[len(timings) // 2]:>10.2f}  {', '.join(used)}")
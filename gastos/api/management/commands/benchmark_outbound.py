@@ -0,0 +1,75 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.core.management.base import BaseCommand
+
+from api.fake_dolarapi import FakeDolarapi
+from api.outbound import CircuitBreaker, OutboundClient
+
+
+class Command(BaseCommand):
+    help = 'Compare one connection per call against the pooled outbound client, against a local fake dolarapi.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=500,
+            help='Calls per variant (default: 500)',
+        )
+        parser.add_argument(
+            '--concurrency',
+            type=int,
+            default=8,
+            help='Threads issuing the calls (default: 8)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Seconds the fake adds to every response (default: 0)',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of fake responses that fail, from 0 to 1 (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        with FakeDolarapi(latency=options['latency'], error_rate=options['error_rate'], seed=42) as fake:
+            self.stdout.write(f"{'variant':<18} {'total s':>8} {'p50 ms':>8} {'p99 ms':>8} {'errors':>7} {'connections':>12}")
+            unpooled = lambda: requests.get(f'{fake.url}/dolares', timeout=(3, 5)).raise_for_status()
+            self._run('per-call requests', unpooled, fake, options)
+
+            # A breaker that never opens, so both variants make every call
+            client = OutboundClient(
+                'benchmark', fake.url, pool_size=options['concurrency'],
+                breaker=CircuitBreaker('benchmark', failure_threshold=float('inf')),
+            )
+            self._run('pooled client', lambda: client.get('/dolares'), fake, options)
+
+    def _run(self, label, call, fake, options):
+        fake.requests = fake.connections = 0
+        errors = 0
+
+        def timed(_):
+            started = time.perf_counter()
+            try:
+                call()
+                failed = False
+            except requests.RequestException:
+                failed = True
+            return (time.perf_counter() - started) * 1000, failed
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=options['concurrency']) as executor:
+            results = list(executor.map(timed, range(options['requests'])))
+        elapsed = time.perf_counter() - started
+
+        timings = sorted(timing for timing, _ in results)
+        errors = sum(failed for _, failed in results)
+        p50 = timings[len(timings) // 2]
+        p99 = timings[min(len(timings) - 1, int(len(timings) * 0.99))]
+        self.stdout.write(f'{label:<18} {elapsed:>8.2f} {p50:>8.2f} {p99:>8.2f} {errors:>7} {fake.connections:>12}')
@@ -0,0 +1,60 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from api.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, stream_export
+from api.filters import filter_gastos, order_gastos
+from api.models import Gasto
+
+
+# Command option -> list filter parameter (see api.filters.filter_gastos)
+FILTER_OPTIONS = (
+    'fecha_desde', 'fecha_hasta', 'categoria', 'moneda', 'grupo',
+    'medio_pago', 'is_shared', 'monto_min', 'monto_max', 'ordering',
+)
+
+
+class Command(BaseCommand):
+    help = "Stream a user's gastos to CSV or NDJSON using the list endpoint filters."
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Owner of the gastos to export')
+        parser.add_argument(
+            '--formato',
+            choices=sorted(EXPORT_FORMATS),
+            default='csv',
+            help='Output format (default: csv)',
+        )
+        parser.add_argument(
+            '--output',
+            help='File to write (default: stdout)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=EXPORT_CHUNK_SIZE,
+            help=f'Rows fetched from the database per round trip (default: {EXPORT_CHUNK_SIZE})',
+        )
+        for name in FILTER_OPTIONS:
+            parser.add_argument(f"--{name.replace('_', '-')}", dest=name, help=f'Same as ?{name}= on /api/gastos/')
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+
+        params = {name: options[name] for name in FILTER_OPTIONS if options[name]}
+        try:
+            queryset = order_gastos(filter_gastos(Gasto.objects.filter(user=user), params), params)
+        except ValidationError as e:
+            raise CommandError(f'Invalid filters: {e.detail}')
+
+        chunks = stream_export(queryset, options['formato'], chunk_size=options['chunk_size'])
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as output:
+                output.writelines(chunks)
+            self.stderr.write(self.style.SUCCESS(f"Exported gastos of {user.username} to {options['output']}"))
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+
+from api.fake_dolarapi import FakeDolarapi
+
+
+class Command(BaseCommand):
+    help = 'Serve a local fake of dolarapi with configurable latency and failures (set DOLARAPI_URL to its URL).'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--port',
+            type=int,
+            default=8081,
+            help='Port to listen on (default: 8081)',
+        )
+        parser.add_argument(
+            '--latency',
+            type=float,
+            default=0.0,
+            help='Seconds added to every response (default: 0)',
+        )
+        parser.add_argument(
+            '--error-rate',
+            type=float,
+            default=0.0,
+            help='Fraction of responses that fail, from 0 to 1 (default: 0)',
+        )
+        parser.add_argument(
+            '--error-status',
+            type=int,
+            default=503,
+            help='HTTP status of failed responses (default: 503)',
+        )
+
+    def handle(self, *args, **options):
+        fake = FakeDolarapi(
+            port=options['port'], latency=options['latency'], error_rate=options['error_rate'],
+            error_status=options['error_status'], verbose=True,
+        )
+        self.stdout.write(self.style.SUCCESS(f'Fake dolarapi listening on {fake.url} (Ctrl+C to stop)'))
+        try:
+            fake.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            fake.server.server_close()
@@ -0,0 +1,77 @@
+import json
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import IMPORT_CHUNK_SIZE, StatementImporter, StatementImportError
+
+
+class Command(BaseCommand):
+    help = 'Import a bank/card statement CSV as gastos, skipping rows that were already imported.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('username', help='Owner of the imported gastos')
+        parser.add_argument('path', help='CSV file to import')
+        parser.add_argument(
+            '--medio-pago',
+            type=int,
+            help='Medio de pago id used when the CSV has no ente_emisor column',
+        )
+        parser.add_argument(
+            '--moneda',
+            default='ARS',
+            help='Currency for rows without a moneda column (default: ARS)',
+        )
+        parser.add_argument(
+            '--delimiter',
+            help='CSV delimiter (default: sniffed from the file)',
+        )
+        parser.add_argument(
+            '--mapping',
+            help='JSON object mapping gasto fields to CSV headers, e.g. \'{"monto": "Importe $"}\'',
+        )
+        parser.add_argument(
+            '--encoding',
+            default='utf-8-sig',
+            help='File encoding (default: utf-8-sig)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=IMPORT_CHUNK_SIZE,
+            help=f'Rows inserted per batch (default: {IMPORT_CHUNK_SIZE})',
+        )
+
+    def handle(self, *args, **options):
+        try:
+            user = User.objects.get(username=options['username'])
+        except User.DoesNotExist:
+            raise CommandError(f"User {options['username']} does not exist")
+        try:
+            mapping = json.loads(options['mapping']) if options['mapping'] else None
+        except ValueError:
+            raise CommandError('--mapping must be a JSON object')
+
+        started = time.perf_counter()
+        try:
+            importer = StatementImporter(
+                user,
+                mapping=mapping,
+                default_medio_pago=options['medio_pago'],
+                moneda=options['moneda'],
+                delimiter=options['delimiter'],
+                chunk_size=options['chunk_size'],
+            )
+            with open(options['path'], encoding=options['encoding'], newline='') as statement:
+                summary = importer.run(statement)
+        except (OSError, StatementImportError, UnicodeDecodeError) as e:
+            raise CommandError(str(e))
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {summary['created']} gastos from {summary['rows']} rows in {elapsed:.2f}s "
+            f"({summary['duplicates']} already imported, {summary['error_count']} with errors)"
+        ))
+        for error in summary['errors']:
+            self.stdout.write(f"  line {error['line']}: {error['errors']}")
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from api.models import GastoTombstone
+from api.sync import TOMBSTONE_RETENTION
+
+
+class Command(BaseCommand):
+    help = 'Purge gasto tombstones older than the delta sync retention window.'
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - TOMBSTONE_RETENTION
+        deleted, _ = GastoTombstone.objects.filter(deleted_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Purged {deleted} gasto tombstones older than {TOMBSTONE_RETENTION.days} days.'
+        ))
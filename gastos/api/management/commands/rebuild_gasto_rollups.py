@@ -0,0 +1,93 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.models import Gasto, GastoMonthlyRollup
+from api.rollups import ROLLUP_KEY_FIELDS, expected_rollups
+
+
+# Totals that differ by less than this are float noise, not drift
+TOTAL_TOLERANCE = 0.005
+
+
+class Command(BaseCommand):
+    help = 'Verify the monthly gasto rollups against api_gasto and repair them, a batch of users at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only check this username (default: every user)',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report differences without repairing them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Users checked per query and transaction (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by('id')
+        if options['user']:
+            users = users.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"User {options['user']} does not exist")
+        repair = not options['verify']
+
+        checked = 0
+        totals = {'missing': 0, 'wrong': 0, 'extra': 0}
+        last_id = 0
+        while True:
+            user_ids = list(users.filter(id__gt=last_id).values_list('id', flat=True)[:options['batch_size']])
+            if not user_ids:
+                break
+            last_id = user_ids[-1]
+            checked += len(user_ids)
+            for name, count in self._check(user_ids, repair).items():
+                totals[name] += count
+
+        result = f"Checked {checked} users: {totals['missing']} missing, {totals['wrong']} wrong, {totals['extra']} extra rollup rows"
+        if not any(totals.values()):
+            self.stdout.write(self.style.SUCCESS(result))
+        elif repair:
+            self.stdout.write(self.style.SUCCESS(f'{result} (repaired)'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{result} (not repaired, --verify)'))
+
+    def _check(self, user_ids, repair):
+        with transaction.atomic():
+            # Locking the batch makes concurrent gasto writes wait for the
+            # repair and then apply their deltas on top of the fixed rows
+            actual = {
+                tuple(row[name] for name in ROLLUP_KEY_FIELDS): row
+                for row in GastoMonthlyRollup.objects.filter(user_id__in=user_ids)
+                .select_for_update()
+                .values('id', 'total', 'count', *ROLLUP_KEY_FIELDS)
+            }
+            expected = {
+                tuple(row[name] for name in ROLLUP_KEY_FIELDS): row
+                for row in expected_rollups(Gasto.objects.filter(user_id__in=user_ids))
+            }
+
+            missing = [key for key in expected if key not in actual]
+            extra = [actual[key]['id'] for key in actual if key not in expected]
+            wrong = [
+                GastoMonthlyRollup(id=actual[key]['id'], total=row['total'], count=row['count'])
+                for key, row in expected.items()
+                if key in actual and (
+                    actual[key]['count'] != row['count']
+                    or abs(actual[key]['total'] - row['total']) >= TOTAL_TOLERANCE
+                )
+            ]
+
+            if repair:
+                GastoMonthlyRollup.objects.filter(id__in=extra).delete()
+                GastoMonthlyRollup.objects.bulk_update(wrong, ['total', 'count'], batch_size=1000)
+                GastoMonthlyRollup.objects.bulk_create(
+                    (GastoMonthlyRollup(**expected[key]) for key in missing), batch_size=1000
+                )
+        return {'missing': len(missing), 'wrong': len(wrong), 'extra': len(extra)}
@@ -0,0 +1,95 @@
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from api.caching import gastos_changed
+from api.categorization import (
+    CATEGORY_SOURCE_FIELDS,
+    RECATEGORIZE_MIN_CONFIDENCE,
+    UNCATEGORIZED,
+    category_table,
+    classify,
+)
+from api.models import Gasto, VendorCategoryCount
+from api.rollups import ROLLUP_SOURCE_FIELDS, RollupDeltas
+
+
+UPDATE_BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = (
+        "Move uncategorized gastos ('otros', e.g. statement imports) to the categoria "
+        'their user most often chose for the same vendor.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--user',
+            help='Only recategorize this username (default: every user)',
+        )
+        parser.add_argument(
+            '--min-confidence',
+            type=float,
+            default=RECATEGORIZE_MIN_CONFIDENCE,
+            help=f'Share of the vendor\'s gastos the categoria needs (default: {RECATEGORIZE_MIN_CONFIDENCE})',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without saving it',
+        )
+
+    def handle(self, *args, **options):
+        # Only users with categorized history can get suggestions
+        users = User.objects.filter(
+            id__in=VendorCategoryCount.objects.values('user_id')
+        ).order_by('id')
+        if options['user']:
+            users = User.objects.filter(username=options['user'])
+            if not users.exists():
+                raise CommandError(f"User {options['user']} does not exist")
+
+        checked = changed = 0
+        for user in users.iterator():
+            user_checked, user_changed = self._recategorize(user, options['min_confidence'], options['dry_run'])
+            checked += user_checked
+            changed += user_changed
+
+        verb = 'Would recategorize' if options['dry_run'] else 'Recategorized'
+        self.stdout.write(self.style.SUCCESS(f'{verb} {changed} of {checked} uncategorized gastos'))
+
+    def _recategorize(self, user, min_confidence, dry_run):
+        # One query for the user's table, one for the rows and one UPDATE per
+        # categoria and batch, however many rows there are
+        table = category_table(user)
+        with transaction.atomic():
+            rows = list(
+                Gasto.objects.filter(user=user, categoria=UNCATEGORIZED)
+                .order_by('id')
+                .select_for_update()
+                .values('id', *{*ROLLUP_SOURCE_FIELDS, *CATEGORY_SOURCE_FIELDS})
+            )
+            classified = classify(rows, table, min_confidence)
+            if dry_run or not classified:
+                return len(rows), sum(map(len, classified.values()))
+
+            # The moved gastos are flagged categoria_automatica and left out of
+            # the VendorCategoryCount rows: only the user's choices count, so
+            # a run never reinforces its own guesses. Uncategorized rows were
+            # not counted either, so the counts need no update.
+            deltas = RollupDeltas()
+            now = timezone.now()
+            for categoria, matches in classified.items():
+                deltas.add_all(matches, sign=-1)
+                deltas.add_all({**row, 'categoria': categoria} for row in matches)
+                ids = [row['id'] for row in matches]
+                for start in range(0, len(ids), UPDATE_BATCH_SIZE):
+                    # queryset.update() skips auto_now; delta sync reads updated_at
+                    Gasto.objects.filter(id__in=ids[start:start + UPDATE_BATCH_SIZE]).update(
+                        categoria=categoria, categoria_automatica=True, updated_at=now
+                    )
+            deltas.apply()
+            gastos_changed(user.id)
+        return len(rows), sum(map(len, classified.values()))
@@ -0,0 +1,122 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from api.grupos import expected_currency_totals, expected_member_counts
+from api.models import Grupo, GrupoCurrencyTotal
+
+
+# Totals that differ by less than this are float noise, not drift
+TOTAL_TOLERANCE = 0.005
+
+
+class Command(BaseCommand):
+    help = 'Verify the grupo member/expense counters and currency totals against the source tables and repair them, a batch of grupos at a time.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--grupo',
+            type=int,
+            help='Only check this grupo id (default: every grupo)',
+        )
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Report differences without repairing them',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='Grupos checked per query and transaction (default: 200)',
+        )
+
+    def handle(self, *args, **options):
+        grupos = Grupo.objects.order_by('id')
+        if options['grupo']:
+            grupos = grupos.filter(id=options['grupo'])
+            if not grupos.exists():
+                raise CommandError(f"Grupo {options['grupo']} does not exist")
+        repair = not options['verify']
+
+        checked = 0
+        totals = {'members': 0, 'expenses': 0, 'currency_totals': 0}
+        last_id = 0
+        while True:
+            grupo_ids = list(grupos.filter(id__gt=last_id).values_list('id', flat=True)[:options['batch_size']])
+            if not grupo_ids:
+                break
+            last_id = grupo_ids[-1]
+            checked += len(grupo_ids)
+            for name, count in self._check(grupo_ids, repair).items():
+                totals[name] += count
+
+        result = (
+            f"Checked {checked} grupos: {totals['members']} member counts, {totals['expenses']} expense counts "
+            f"and {totals['currency_totals']} currency totals drifted"
+        )
+        if not any(totals.values()):
+            self.stdout.write(self.style.SUCCESS(result))
+        elif repair:
+            self.stdout.write(self.style.SUCCESS(f'{result} (repaired)'))
+        else:
+            self.stdout.write(self.style.WARNING(f'{result} (not repaired, --verify)'))
+
+    def _check(self, grupo_ids, repair):
+        with transaction.atomic():
+            # Lock in the order gasto writes do (currency totals, then grupos),
+            # so concurrent writes wait for the repair and apply on top of it
+            actual_totals = {
+                (row['grupo_id'], row['moneda']): row
+                for row in GrupoCurrencyTotal.objects.filter(grupo_id__in=grupo_ids)
+                .select_for_update()
+                .values('id', 'grupo_id', 'moneda', 'total', 'count')
+            }
+            counters = list(
+                Grupo.objects.filter(id__in=grupo_ids).order_by('id').select_for_update()
+                .values_list('id', 'member_count', 'expense_count')
+            )
+            member_counts = expected_member_counts(grupo_ids)
+            currency_totals = expected_currency_totals(grupo_ids)
+            expense_counts = {}
+            for (grupo_id, _), (_, count) in currency_totals.items():
+                expense_counts[grupo_id] = expense_counts.get(grupo_id, 0) + count
+
+            wrong_members = [
+                Grupo(id=grupo_id, member_count=member_counts.get(grupo_id, 0))
+                for grupo_id, member_count, _ in counters
+                if member_count != member_counts.get(grupo_id, 0)
+            ]
+            wrong_expenses = [
+                Grupo(id=grupo_id, expense_count=expense_counts.get(grupo_id, 0))
+                for grupo_id, _, expense_count in counters
+                if expense_count != expense_counts.get(grupo_id, 0)
+            ]
+            missing = [key for key in currency_totals if key not in actual_totals]
+            extra = [actual_totals[key]['id'] for key in actual_totals if key not in currency_totals]
+            wrong_totals = [
+                GrupoCurrencyTotal(id=actual_totals[key]['id'], total=total, count=count)
+                for key, (total, count) in currency_totals.items()
+                if key in actual_totals and (
+                    actual_totals[key]['count'] != count
+                    or abs(actual_totals[key]['total'] - total) >= TOTAL_TOLERANCE
+                )
+            ]
+
+            if repair:
+                Grupo.objects.bulk_update(wrong_members, ['member_count'], batch_size=1000)
+                Grupo.objects.bulk_update(wrong_expenses, ['expense_count'], batch_size=1000)
+                GrupoCurrencyTotal.objects.filter(id__in=extra).delete()
+                GrupoCurrencyTotal.objects.bulk_update(wrong_totals, ['total', 'count'], batch_size=1000)
+                GrupoCurrencyTotal.objects.bulk_create(
+                    (
+                        GrupoCurrencyTotal(grupo_id=grupo_id, moneda=moneda, total=currency_totals[grupo_id, moneda][0],
+                                           count=currency_totals[grupo_id, moneda][1])
+                        for grupo_id, moneda in missing
+                    ),
+                    batch_size=1000,
+                )
+        return {
+            'members': len(wrong_members),
+            'expenses': len(wrong_expenses),
+            'currency_totals': len(missing) + len(extra) + len(wrong_totals),
+        }
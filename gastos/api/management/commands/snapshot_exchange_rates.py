@@ -0,0 +1,31 @@
+import requests
+from django.core.management.base import BaseCommand, CommandError
+
+from api.models import ExchangeRateSnapshot
+from api.rate_history import parse_snapshots
+from api.outbound import dolarapi
+from api.rates import COTIZACIONES, DOLARES, fetch_quotes
+
+
+class Command(BaseCommand):
+    help = 'Store the current dolarapi quotes (every dollar rate and every currency) as exchange rate snapshots.'
+
+    def handle(self, *args, **options):
+        snapshots = []
+        failed = []
+        for source in (DOLARES, COTIZACIONES):
+            try:
+                snapshots.extend(parse_snapshots(fetch_quotes(source)))
+            except (requests.RequestException, ValueError) as e:
+                failed.append(source.name)
+                self.stderr.write(self.style.WARNING(f'Could not fetch {dolarapi.url(source.path)}: {e}'))
+        if len(failed) == 2:
+            raise CommandError('dolarapi is unreachable, no snapshots stored')
+
+        before = ExchangeRateSnapshot.objects.count()
+        # Quotes dolarapi has not updated since the last run are already stored
+        ExchangeRateSnapshot.objects.bulk_create(snapshots, ignore_conflicts=True)
+        stored = ExchangeRateSnapshot.objects.count() - before
+        self.stdout.write(self.style.SUCCESS(
+            f'Stored {stored} new exchange rate snapshots ({len(snapshots) - stored} unchanged)'
+        ))
@@ -1,3 +1,5 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.db import close_old_connections
 from django.utils import timezone
 from django.http import JsonResponse
 from rest_framework import status
@@ -5,6 +7,7 @@ from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from datetime import timedelta
+from whitenoise.middleware import WhiteNoiseMiddleware
 
 # LOGGING DISABLED FOR PRODUCTION
 # import logging
@@ -21,15 +24,48 @@ class AutoSessionManagementMiddleware:
     - Automatic session limits (max 3 per user)
     - Background cleanup
     - Token activity tracking
+
+    Supports both sync and async requests. Under ASGI the bookkeeping runs
+    on the shared thread pool, so an async view then holds neither a thread
+    nor a database connection while it awaits.
     """
+    sync_capable = True
+    async_capable = True
     
     def __init__(self, get_response):
         self.get_response = get_response
         self.timeout_minutes = 60  # 1 hour timeout
         self.max_sessions_per_user = 3  # Limit concurrent sessions
         self.cleanup_counter = 0  # Counter for background cleanup
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
         
     def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        rejection = self._manage_session(request)
+        if rejection is not None:
+            return rejection
+        response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        rejection = await sync_to_async(self._manage_session_pooled, thread_sensitive=False)(request)
+        if rejection is not None:
+            return rejection
+        return await self.get_response(request)
+
+    def _manage_session_pooled(self, request):
+        # Pool threads outlive requests: recycle their connection the way
+        # request_started/request_finished do (CONN_MAX_AGE, health checks)
+        close_old_connections()
+        try:
+            return self._manage_session(request)
+        finally:
+            close_old_connections()
+
+    def _manage_session(self, request):
+        """Track the request's token; returns the 401 response of an expired session, else None."""
         # Skip middleware for certain paths that don't require authentication
         skip_paths = [
             '/api/token/',
@@ -43,21 +79,21 @@ class AutoSessionManagementMiddleware:
         ]
         
         if any(request.path.startswith(path) for path in skip_paths):
-            return self.get_response(request)
+            return None
         
         jwt_auth = JWTAuthentication()
         
         try:
             raw_token = jwt_auth.get_raw_token(jwt_auth.get_header(request))
             if raw_token is None:
-                return self.get_response(request)
+                return None
             
             validated_token = jwt_auth.get_validated_token(raw_token)
             user = jwt_auth.get_user(validated_token)
             token_jti = validated_token.payload.get('jti')
             
             if not token_jti:
-                return self.get_response(request)
+                return None
             
             # 1. Check if token is expired
             if self._is_token_expired(token_jti, user, request):
@@ -87,8 +123,7 @@ class AutoSessionManagementMiddleware:
             # logger.error(f"Error in AutoSessionManagementMiddleware: {str(e)}")
             pass
         
-        response = self.get_response(request)
-        return response
+        return None
     
     def _is_token_expired(self, token_jti, user, request):
         """Check if the token has been inactive for more than the timeout duration."""
@@ -236,4 +271,38 @@ class AutoSessionManagementMiddleware:
             ip = x_forwarded_for.split(',')[0]
         else:
             ip = request.META.get('REMOTE_ADDR')
-        return ip
\ No newline at end of file
+        return ip
+
+
+class AsyncWhiteNoiseMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware that lets async requests through without a thread.
+
+    WhiteNoise is sync-only, and one sync middleware makes Django run every
+    ASGI request in a thread. Here only static files are served from a
+    thread; other requests are awaited directly.
+
+    It reuses WhiteNoiseMiddleware internals (``autorefresh``, ``find_file``,
+    ``files``, ``serve``), so whitenoise is pinned to an exact version and
+    test_async_whitenoise_serves_static_files must pass before bumping it.
+    """
+    async_capable = True
+
+    def __init__(self, get_response=None, **kwargs):
+        super().__init__(get_response, **kwargs)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
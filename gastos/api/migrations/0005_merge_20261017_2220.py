@@ -0,0 +1,14 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:20
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_gasto_monto_pendiente_gasto_titulo'),
+        ('api', '0004_cleanup_project_tables'),
+    ]
+
+    operations = [
+    ]
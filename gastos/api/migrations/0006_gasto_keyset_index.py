@@ -0,0 +1,23 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:23
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_merge_20261017_2220'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='gasto',
+            options={'ordering': ['-fecha_gasto', '-created_at', 'id']},
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', '-fecha_gasto', '-created_at', 'id'], name='gasto_user_keyset_idx'),
+        ),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:24
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0006_gasto_keyset_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'categoria', '-fecha_gasto'], name='gasto_user_categoria_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'moneda', '-fecha_gasto'], name='gasto_user_moneda_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'grupo', '-fecha_gasto'], name='gasto_user_grupo_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'medio_pago', '-fecha_gasto'], name='gasto_user_medio_pago_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'is_shared', '-fecha_gasto'], name='gasto_user_is_shared_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'monto', 'id'], name='gasto_user_monto_idx'),
+        ),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:33
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0007_gasto_filter_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gasto',
+            name='import_hash',
+            field=models.CharField(blank=True, default='', editable=False, help_text='Hash del contenido de la fila importada (ver api.imports)', max_length=64),
+        ),
+        migrations.AddConstraint(
+            model_name='gasto',
+            constraint=models.UniqueConstraint(condition=models.Q(('import_hash', ''), _negated=True), fields=('user', 'import_hash'), name='gasto_user_import_hash_uniq'),
+        ),
+    ]
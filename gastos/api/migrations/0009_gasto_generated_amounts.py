@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:37
+
+import django.db.models.expressions
+import django.db.models.functions.math
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_gasto_import_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gasto',
+            name='monto_total',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.expressions.CombinedExpression(models.F('monto'), '*', models.F('pagos_totales')), help_text='Monto total incluyendo todas las cuotas', output_field=models.FloatField()),
+        ),
+        # A plain column cannot be altered into a generated one; re-adding it
+        # also recomputes the values the old code left stale
+        migrations.RemoveField(
+            model_name='gasto',
+            name='monto_pendiente',
+        ),
+        migrations.AddField(
+            model_name='gasto',
+            name='monto_pendiente',
+            field=models.GeneratedField(db_persist=True, expression=django.db.models.functions.math.Round(django.db.models.expressions.CombinedExpression(models.F('monto'), '*', django.db.models.expressions.CombinedExpression(models.F('pagos_totales'), '-', models.F('pagos_realizados'))), 2), help_text='Monto de las cuotas que faltan pagar', output_field=models.FloatField()),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(condition=models.Q(('pagos_realizados__lt', models.F('pagos_totales'))), fields=['user', '-fecha_gasto'], name='gasto_user_pending_idx'),
+        ),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncMonth
+
+
+def build_rollups(apps, schema_editor):
+    Gasto = apps.get_model('api', 'Gasto')
+    GastoMonthlyRollup = apps.get_model('api', 'GastoMonthlyRollup')
+    rows = (
+        Gasto.objects.order_by()
+        .annotate(month=TruncMonth('fecha_gasto'))
+        .values('user_id', 'grupo_id', 'month', 'categoria', 'moneda')
+        .annotate(total=Sum('monto'), count=Count('id'))
+    )
+    GastoMonthlyRollup.objects.bulk_create(
+        (GastoMonthlyRollup(**row) for row in rows.iterator()), batch_size=1000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_gasto_generated_amounts'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GastoMonthlyRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(help_text='Primer día del mes')),
+                ('categoria', models.CharField(choices=[('finanzas', 'Finanzas'), ('salud', 'Salud'), ('transporte', 'Transporte'), ('comida', 'Comida'), ('indumentaria', 'Indumentaria'), ('tecnologia', 'Tecnologia'), ('inversiones', 'Inversiones'), ('alojamiento', 'Alojamiento'), ('entretenimiento', 'Entretenimiento'), ('otros', 'Otros')], max_length=24)),
+                ('moneda', models.CharField(choices=[('ARS', 'Peso Argentino'), ('USD', 'Dolar Americano'), ('EUR', 'Euro'), ('BRL', 'Real Brasileño'), ('CLP', 'Peso Chileno'), ('NA', 'Otros')], max_length=3)),
+                ('total', models.FloatField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('grupo', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='gasto_rollups', to='api.grupo')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gasto_rollups', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'api_gasto_monthly_rollup',
+                'ordering': ['-month', 'categoria', 'moneda'],
+                'indexes': [models.Index(fields=['user', '-month'], name='gasto_rollup_user_month_idx')],
+                'constraints': [models.UniqueConstraint(condition=models.Q(('grupo__isnull', False)), fields=('user', 'grupo', 'month', 'categoria', 'moneda'), name='gasto_rollup_grupo_uniq'), models.UniqueConstraint(condition=models.Q(('grupo__isnull', True)), fields=('user', 'month', 'categoria', 'moneda'), name='gasto_rollup_personal_uniq')],
+            },
+        ),
+        migrations.RunPython(build_rollups, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:46
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0010_gasto_monthly_rollup'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mediopago',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True),
+        ),
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(fields=['user', 'updated_at'], name='gasto_user_updated_idx'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:50
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_list_validators'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GastoTombstone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('gasto_id', models.IntegerField(help_text='Id del gasto eliminado')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='gasto_tombstones', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'api_gasto_tombstone',
+                'ordering': ['deleted_at', 'id'],
+                'indexes': [models.Index(fields=['user', 'deleted_at', 'id'], name='gasto_tombstone_user_idx'), models.Index(fields=['deleted_at'], name='api_gasto_t_deleted_209cb3_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,86 @@
+from django.db import migrations
+
+
+# PostgreSQL: a stored tsvector column computed by the database on every
+# write, weighted vendedor > titulo > comentarios, behind a GIN index.
+# Accents are folded with translate() (immutable, unlike the unaccent
+# extension, which is not always installed); api.search folds queries alike.
+FOLD = "translate(coalesce({column}, ''), 'ÁÉÍÓÚÜáéíóúü', 'AEIOUUaeiouu')"
+POSTGRES_FORWARD = [
+    f"""
+    ALTER TABLE api_gasto ADD COLUMN search_vector tsvector GENERATED ALWAYS AS (
+        setweight(to_tsvector('spanish', {FOLD.format(column='vendedor')}), 'A')
+        || setweight(to_tsvector('spanish', {FOLD.format(column='titulo')}), 'B')
+        || setweight(to_tsvector('spanish', {FOLD.format(column='comentarios')}), 'C')
+    ) STORED
+    """,
+    'CREATE INDEX gasto_search_idx ON api_gasto USING gin (search_vector)',
+]
+POSTGRES_REVERSE = [
+    'DROP INDEX IF EXISTS gasto_search_idx',
+    'ALTER TABLE api_gasto DROP COLUMN IF EXISTS search_vector',
+]
+
+# SQLite: an external content FTS5 table over api_gasto kept in sync by triggers
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE api_gasto_fts USING fts5(
+        vendedor, titulo, comentarios, user_id UNINDEXED,
+        content='api_gasto', content_rowid='id', tokenize='unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER api_gasto_fts_insert AFTER INSERT ON api_gasto BEGIN
+        INSERT INTO api_gasto_fts (rowid, vendedor, titulo, comentarios, user_id)
+        VALUES (new.id, new.vendedor, new.titulo, new.comentarios, new.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER api_gasto_fts_delete AFTER DELETE ON api_gasto BEGIN
+        INSERT INTO api_gasto_fts (api_gasto_fts, rowid, vendedor, titulo, comentarios, user_id)
+        VALUES ('delete', old.id, old.vendedor, old.titulo, old.comentarios, old.user_id);
+    END
+    """,
+    """
+    CREATE TRIGGER api_gasto_fts_update AFTER UPDATE OF vendedor, titulo, comentarios, user_id ON api_gasto BEGIN
+        INSERT INTO api_gasto_fts (api_gasto_fts, rowid, vendedor, titulo, comentarios, user_id)
+        VALUES ('delete', old.id, old.vendedor, old.titulo, old.comentarios, old.user_id);
+        INSERT INTO api_gasto_fts (rowid, vendedor, titulo, comentarios, user_id)
+        VALUES (new.id, new.vendedor, new.titulo, new.comentarios, new.user_id);
+    END
+    """,
+    "INSERT INTO api_gasto_fts (api_gasto_fts) VALUES ('rebuild')",
+]
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS api_gasto_fts_insert',
+    'DROP TRIGGER IF EXISTS api_gasto_fts_delete',
+    'DROP TRIGGER IF EXISTS api_gasto_fts_update',
+    'DROP TABLE IF EXISTS api_gasto_fts',
+]
+
+STATEMENTS = {
+    'postgresql': (POSTGRES_FORWARD, POSTGRES_REVERSE),
+    'sqlite': (SQLITE_FORWARD, SQLITE_REVERSE),
+}
+
+
+def create_search_index(apps, schema_editor):
+    # Other backends fall back to unindexed scans (see api.search)
+    for sql in STATEMENTS.get(schema_editor.connection.vendor, ((), ()))[0]:
+        schema_editor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    for sql in STATEMENTS.get(schema_editor.connection.vendor, ((), ()))[1]:
+        schema_editor.execute(sql)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_gasto_tombstone'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
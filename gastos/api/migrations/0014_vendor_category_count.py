@@ -0,0 +1,64 @@
+# Generated by Django 5.2.6 on 2026-10-18 01:59
+
+import unicodedata
+from collections import Counter
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def _vendor_key(vendedor):
+    # Frozen copy of api.autocomplete.normalize_vendor
+    decomposed = unicodedata.normalize('NFKD', vendedor.casefold())
+    return ' '.join(''.join(char for char in decomposed if not unicodedata.combining(char)).split())[:128]
+
+
+def count_vendor_categories(apps, schema_editor):
+    Gasto = apps.get_model('api', 'Gasto')
+    VendorCategoryCount = apps.get_model('api', 'VendorCategoryCount')
+    counts = Counter()
+    rows = (
+        Gasto.objects.exclude(categoria='otros').order_by()
+        .values_list('user_id', 'vendedor', 'categoria')
+        .annotate(count=Count('id'))
+    )
+    for user_id, vendedor, categoria, count in rows.iterator():
+        key = _vendor_key(vendedor)
+        if key:
+            counts[(user_id, key, categoria)] += count
+    VendorCategoryCount.objects.bulk_create(
+        (
+            VendorCategoryCount(user_id=user_id, vendedor=vendedor, categoria=categoria, count=count)
+            for (user_id, vendedor, categoria), count in counts.items()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_gasto_search_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VendorCategoryCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('vendedor', models.CharField(help_text='Vendedor normalizado', max_length=128)),
+                ('categoria', models.CharField(choices=[('finanzas', 'Finanzas'), ('salud', 'Salud'), ('transporte', 'Transporte'), ('comida', 'Comida'), ('indumentaria', 'Indumentaria'), ('tecnologia', 'Tecnologia'), ('inversiones', 'Inversiones'), ('alojamiento', 'Alojamiento'), ('entretenimiento', 'Entretenimiento'), ('otros', 'Otros')], max_length=24)),
+                ('count', models.IntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='vendor_category_counts', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'api_vendor_category_count',
+                'ordering': ['vendedor', '-count'],
+                'constraints': [models.UniqueConstraint(fields=('user', 'vendedor', 'categoria'), name='vendor_category_uniq')],
+            },
+        ),
+        migrations.RunPython(count_vendor_categories, migrations.RunPython.noop),
+    ]
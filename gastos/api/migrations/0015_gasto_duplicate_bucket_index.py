@@ -0,0 +1,20 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:01
+
+import django.db.models.functions.math
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_vendor_category_count'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='gasto',
+            index=models.Index(models.F('user'), models.F('moneda'), django.db.models.functions.math.Round('monto', 2), models.F('fecha_gasto'), name='gasto_duplicate_bucket_idx'),
+        ),
+    ]
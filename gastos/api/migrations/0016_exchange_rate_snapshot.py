@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0015_gasto_duplicate_bucket_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ExchangeRateSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moneda', models.CharField(help_text='Moneda cotizada (USD, EUR, ...)', max_length=3)),
+                ('casa', models.CharField(help_text='Tipo de cotización (oficial, blue, tarjeta, ...)', max_length=32)),
+                ('compra', models.FloatField(blank=True, help_text='Pesos por unidad, compra', null=True)),
+                ('venta', models.FloatField(blank=True, help_text='Pesos por unidad, venta', null=True)),
+                ('fecha', models.DateTimeField(help_text='Fecha de actualización informada por dolarapi')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'db_table': 'api_exchange_rate_snapshot',
+                'ordering': ['moneda', 'casa', 'fecha'],
+                'constraints': [models.UniqueConstraint(fields=('moneda', 'casa', 'fecha'), name='exchange_rate_snapshot_uniq')],
+            },
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.6 on 2026-10-18 02:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce
+
+
+def count_grupo_members_and_gastos(apps, schema_editor):
+    Grupo = apps.get_model('api', 'Grupo')
+    GrupoMembership = apps.get_model('api', 'GrupoMembership')
+    Gasto = apps.get_model('api', 'Gasto')
+    GrupoCurrencyTotal = apps.get_model('api', 'GrupoCurrencyTotal')
+
+    def counted(queryset):
+        counts = queryset.filter(grupo_id=OuterRef('pk')).order_by().values('grupo_id').annotate(count=Count('id'))
+        return Coalesce(Subquery(counts.values('count'), output_field=IntegerField()), 0)
+
+    Grupo.objects.update(
+        member_count=counted(GrupoMembership.objects.filter(is_active=True)),
+        expense_count=counted(Gasto.objects.all()),
+    )
+    rows = (
+        Gasto.objects.filter(grupo__isnull=False).order_by()
+        .values_list('grupo_id', 'moneda')
+        .annotate(total=Sum('monto'), count=Count('id'))
+    )
+    GrupoCurrencyTotal.objects.bulk_create(
+        (
+            GrupoCurrencyTotal(grupo_id=grupo_id, moneda=moneda, total=total, count=count)
+            for grupo_id, moneda, total, count in rows.iterator()
+        ),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0016_exchange_rate_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='grupo',
+            name='expense_count',
+            field=models.IntegerField(default=0, help_text='Gastos del grupo'),
+        ),
+        migrations.AddField(
+            model_name='grupo',
+            name='member_count',
+            field=models.IntegerField(default=0, help_text='Miembros activos'),
+        ),
+        migrations.CreateModel(
+            name='GrupoCurrencyTotal',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moneda', models.CharField(choices=[('ARS', 'Peso Argentino'), ('USD', 'Dolar Americano'), ('EUR', 'Euro'), ('BRL', 'Real Brasileño'), ('CLP', 'Peso Chileno'), ('NA', 'Otros')], max_length=3)),
+                ('total', models.FloatField(default=0)),
+                ('count', models.IntegerField(default=0)),
+                ('grupo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='currency_totals', to='api.grupo')),
+            ],
+            options={
+                'db_table': 'api_grupo_currency_total',
+                'ordering': ['moneda'],
+                'constraints': [models.UniqueConstraint(fields=('grupo', 'moneda'), name='grupo_currency_total_uniq')],
+            },
+        ),
+        migrations.RunPython(count_grupo_members_and_gastos, migrations.RunPython.noop),
+    ]
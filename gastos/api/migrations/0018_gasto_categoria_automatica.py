@@ -0,0 +1,18 @@
+# Generated by Django 5.2.6 on 2026-10-18 03:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0017_grupo_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='gasto',
+            name='categoria_automatica',
+            field=models.BooleanField(default=False, editable=False, help_text='Categoría asignada por recategorize_gastos, no elegida por el usuario'),
+        ),
+    ]
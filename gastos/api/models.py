@@ -1,7 +1,7 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.utils import timezone
-from django.db.models.functions import Lower
+from django.db.models.functions import Lower, Round
 
 
 class Grupo(models.Model):
@@ -32,6 +32,10 @@ class Grupo(models.Model):
     # Membership management
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='owned_grupos')
     members = models.ManyToManyField(User, through='GrupoMembership', related_name='grupos')
+    # Counters kept current by every membership and gasto write (see
+    # api.grupos); reconcile_grupo_counters repairs drift
+    member_count = models.IntegerField(default=0, help_text="Miembros activos")
+    expense_count = models.IntegerField(default=0, help_text="Gastos del grupo")
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -47,9 +51,40 @@ class Grupo(models.Model):
         ]
     def __str__(self):
         return f"{self.name} ({self.get_grupo_type_display()})"
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self.members_changed()
+
+    def delete(self, *args, **kwargs):
+        from .caching import gastos_changed
+        from .categorization import CategoryDeltas
+
+        with transaction.atomic():
+            # Read the members before the cascade removes their memberships
+            self.members_changed()
+            # The cascade removes the grupo's gastos, possibly of several users
+            gastos = Gasto.objects.filter(grupo=self)
+            gastos_changed(*gastos.values_list('user_id', flat=True).distinct())
+            GastoTombstone.record_deletion(gastos)
+            categories = CategoryDeltas()
+            categories.subtract_queryset(gastos)
+            result = super().delete(*args, **kwargs)
+            categories.apply()
+            return result
+
+    def members_changed(self):
+        """Invalidate the grupo lists of every member (see api.caching)"""
+        from .caching import GRUPOS, versions_changed
+
+        member_ids = GrupoMembership.objects.filter(grupo_id=self.pk).values_list('user_id', flat=True)
+        versions_changed(GRUPOS, self.owner_id, *member_ids)
+
     def get_total_expenses(self):
-        """Get total amount of all expenses in this grupo"""
-        return self.gastos.aggregate(total=models.Sum('monto'))['total'] or 0
+        """Get total amount of all expenses in this grupo, in its default_currency (None if not convertible)"""
+        from .grupos import grupo_totals
+
+        return grupo_totals([self])[self.pk]['total']
     def get_member_count(self):
         """Get number of active members"""
         return self.members.filter(grupomembership__is_active=True).count()
@@ -57,8 +92,10 @@ class Grupo(models.Model):
         """Check if user is an active member of this grupo"""
         return self.members.filter(id=user.id, grupomembership__is_active=True).exists()
     def can_add_expense(self, user):
-        """Check if user can add expenses to this grupo"""
-        return self.is_member(user) and self.is_active
+        """Check if user's role and flags allow adding expenses to this grupo (see api.permissions)"""
+        from .permissions import load_grupo_permissions, membership_allows
+
+        return membership_allows(load_grupo_permissions(user.pk, [self.pk]).get(self.pk), 'add_expenses')
 
 
 class GrupoMembership(models.Model):
@@ -91,6 +128,43 @@ class GrupoMembership(models.Model):
     def __str__(self):
         return f"{self.user.username} - {self.grupo.name} ({self.role})"
 
+    def save(self, *args, **kwargs):
+        from .caching import GRUPOS, versions_changed
+        from .grupos import adjust_member_counts
+
+        with transaction.atomic():
+            changes = {}
+            if not self._state.adding:
+                # The membership may have been deactivated or moved to another grupo or user
+                previous = (
+                    GrupoMembership.objects.filter(pk=self.pk).select_for_update()
+                    .values('grupo_id', 'user_id', 'is_active').first()
+                )
+                if previous is not None and previous['is_active']:
+                    changes[previous['grupo_id']] = -1
+                if previous is not None and previous['user_id'] != self.user_id:
+                    # Its previous user lost the membership (and its permissions)
+                    versions_changed(GRUPOS, previous['user_id'])
+            super().save(*args, **kwargs)
+            if self.is_active:
+                changes[self.grupo_id] = changes.get(self.grupo_id, 0) + 1
+            adjust_member_counts(changes)
+            self.grupo.members_changed()
+
+    def delete(self, *args, **kwargs):
+        from .caching import GRUPOS, versions_changed
+        from .grupos import adjust_member_counts
+
+        with transaction.atomic():
+            grupo = self.grupo
+            result = super().delete(*args, **kwargs)
+            if self.is_active:
+                adjust_member_counts({grupo.pk: -1})
+            grupo.members_changed()
+            # The removed member is no longer among the grupo's memberships
+            versions_changed(GRUPOS, self.user_id)
+        return result
+
 
 
 class MedioPago(models.Model):
@@ -101,6 +175,7 @@ class MedioPago(models.Model):
     tipo: str = models.CharField(max_length=8)
     tipo_tarjeta: str = models.CharField(max_length=16, blank=True)
     extra: str = models.CharField(max_length=64, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'api_medio_pago'
@@ -113,6 +188,34 @@ class MedioPago(models.Model):
         grupo_info = f" - {self.grupo.name}" if self.grupo else ""
         return f"Medio de Pago {self.id} - {self.ente_emisor} - {self.tipo}{grupo_info}"
 
+    def save(self, *args, **kwargs):
+        from .caching import MEDIOS_PAGO, gastos_changed, versions_changed
+
+        # Data derived from gastos (projections, ...) shows the medio de pago
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            versions_changed(MEDIOS_PAGO, self.user_id)
+            gastos_changed(self.user_id)
+
+    def delete(self, *args, **kwargs):
+        from .caching import MEDIOS_PAGO, gastos_changed, versions_changed
+        from .categorization import CategoryDeltas
+        from .rollups import RollupDeltas
+
+        # The cascade removes the gastos without calling Gasto.delete()
+        with transaction.atomic():
+            deltas = RollupDeltas()
+            deltas.subtract_queryset(Gasto.objects.filter(medio_pago=self))
+            categories = CategoryDeltas()
+            categories.subtract_queryset(Gasto.objects.filter(medio_pago=self))
+            GastoTombstone.record_deletion(Gasto.objects.filter(medio_pago=self))
+            result = super().delete(*args, **kwargs)
+            deltas.apply()
+            categories.apply()
+            versions_changed(MEDIOS_PAGO, self.user_id)
+            gastos_changed(self.user_id)
+        return result
+
 class Gasto(models.Model):
     CATEGORIAS_CHOICES = (
         ('finanzas', 'Finanzas'),
@@ -150,13 +253,26 @@ class Gasto(models.Model):
     # Basic expense info
     titulo: str = models.CharField(max_length=32, default='')
     monto: float = models.FloatField()
-    monto_pendiente: float = models.FloatField(default=0)
+    # Computed by the database on every write, so they can be filtered and summed in SQL
+    monto_pendiente: float = models.GeneratedField(
+        expression=Round(models.F('monto') * (models.F('pagos_totales') - models.F('pagos_realizados')), 2),
+        output_field=models.FloatField(),
+        db_persist=True,
+        help_text="Monto de las cuotas que faltan pagar",
+    )
+    monto_total: float = models.GeneratedField(
+        expression=models.F('monto') * models.F('pagos_totales'),
+        output_field=models.FloatField(),
+        db_persist=True,
+        help_text="Monto total incluyendo todas las cuotas",
+    )
     moneda: str = models.CharField(max_length=3, choices=MONEDAS_CHOICES, default='ARS')
     pagos_realizados: int = models.IntegerField()
     pagos_totales: int = models.IntegerField()
     medio_pago: int = models.ForeignKey(MedioPago, on_delete=models.CASCADE)
     vendedor: str = models.CharField(max_length=128)
     categoria: str = models.CharField(max_length=24, choices=CATEGORIAS_CHOICES, default='otros')
+    categoria_automatica = models.BooleanField(default=False, editable=False, help_text="Categoría asignada por recategorize_gastos, no elegida por el usuario")
     comentarios: str = models.TextField(max_length=256, blank=True)
     fecha_gasto = models.DateField()
     
@@ -164,6 +280,9 @@ class Gasto(models.Model):
     is_shared = models.BooleanField(default=False, help_text="Si es un gasto compartido entre miembros del proyecto")
     split_type = models.CharField(max_length=15, choices=SPLIT_TYPES, default='equal', help_text="Tipo de división del gasto")
     paid_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gastos_pagados', null=True, blank=True, help_text="Quien pagó realmente el gasto")
+
+    # Statement imports
+    import_hash = models.CharField(max_length=64, blank=True, default='', editable=False, help_text="Hash del contenido de la fila importada (ver api.imports)")
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
@@ -171,28 +290,114 @@ class Gasto(models.Model):
 
     class Meta:
         db_table = 'api_gasto'
-        ordering = ['-fecha_gasto', '-created_at']
+        ordering = ['-fecha_gasto', '-created_at', 'id']
         indexes = [
+            # Keyset pagination of a user's gastos (see api.pagination.GastoCursorPagination)
+            models.Index(fields=['user', '-fecha_gasto', '-created_at', 'id'], name='gasto_user_keyset_idx'),
+            # Server-side list filters (see api.filters.filter_gastos)
+            models.Index(fields=['user', 'categoria', '-fecha_gasto'], name='gasto_user_categoria_idx'),
+            models.Index(fields=['user', 'moneda', '-fecha_gasto'], name='gasto_user_moneda_idx'),
+            models.Index(fields=['user', 'grupo', '-fecha_gasto'], name='gasto_user_grupo_idx'),
+            models.Index(fields=['user', 'medio_pago', '-fecha_gasto'], name='gasto_user_medio_pago_idx'),
+            models.Index(fields=['user', 'is_shared', '-fecha_gasto'], name='gasto_user_is_shared_idx'),
+            models.Index(fields=['user', 'monto', 'id'], name='gasto_user_monto_idx'),
+            # Newest change per user: list validators (see api.conditional)
+            models.Index(fields=['user', 'updated_at'], name='gasto_user_updated_idx'),
+            # Duplicate candidates: same bucket, nearby dates (see api.duplicates)
+            models.Index(
+                models.F('user'), models.F('moneda'), Round('monto', 2), models.F('fecha_gasto'),
+                name='gasto_duplicate_bucket_idx',
+            ),
+            # Pending debt: only gastos with installments left (see ?pendiente=true)
+            models.Index(
+                fields=['user', '-fecha_gasto'],
+                condition=models.Q(pagos_realizados__lt=models.F('pagos_totales')),
+                name='gasto_user_pending_idx',
+            ),
             models.Index(fields=['user']),
             models.Index(fields=['grupo']),
             models.Index(fields=['fecha_gasto']),
             models.Index(fields=['categoria']),
             models.Index(fields=['is_shared']),
         ]
+        constraints = [
+            # Dedupe of statement imports; manually created gastos have no hash
+            models.UniqueConstraint(
+                fields=['user', 'import_hash'],
+                condition=~models.Q(import_hash=''),
+                name='gasto_user_import_hash_uniq',
+            ),
+        ]
 
     def __str__(self):
         grupo_info = f" - {self.grupo.name}" if self.grupo else ""
         shared_info = " (Compartido)" if self.is_shared else ""
         return f"Gasto {self.id} - {self.categoria} - {self.monto} {self.moneda}{grupo_info}{shared_info}"
     
+    def save(self, *args, **kwargs):
+        from .caching import gastos_changed
+        from .categorization import CATEGORY_SOURCE_FIELDS, CategoryDeltas, keep_suggestion, touches_categories
+        from .rollups import ROLLUP_SOURCE_FIELDS, RollupDeltas, touches_rollup
+
+        adding = self._state.adding
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            deltas = RollupDeltas()
+            categories = CategoryDeltas()
+            if adding:
+                deltas.add(self)
+                categories.add(self)
+            elif touches_rollup(update_fields) or touches_categories(update_fields):
+                # Move the gasto from the rows it was counted in; changes that
+                # cancel out cost no query
+                previous = (
+                    Gasto.objects.filter(pk=self.pk).select_for_update()
+                    .values(*{*ROLLUP_SOURCE_FIELDS, *CATEGORY_SOURCE_FIELDS}).first()
+                )
+                if previous is not None:
+                    deltas.add(previous, -1)
+                    categories.add(previous, -1)
+                    gastos_changed(previous['user_id'])
+                    if update_fields is None or 'categoria' in update_fields:
+                        if keep_suggestion(self, previous) and update_fields is not None:
+                            kwargs['update_fields'] = [*update_fields, 'categoria_automatica']
+                deltas.add(self)
+                categories.add(self)
+            super().save(*args, **kwargs)
+            deltas.apply()
+            categories.apply()
+            gastos_changed(self.user_id)
+        if not adding:
+            # UPDATE does not return the generated columns: defer them so the
+            # next access reloads the values computed by the database
+            for field in self._meta.concrete_fields:
+                if field.generated:
+                    self.__dict__.pop(field.attname, None)
+
+    def delete(self, *args, **kwargs):
+        from .caching import gastos_changed
+        from .categorization import CategoryDeltas
+        from .rollups import RollupDeltas
+
+        with transaction.atomic():
+            deltas = RollupDeltas()
+            deltas.add(self, -1)
+            categories = CategoryDeltas()
+            categories.add(self, -1)
+            GastoTombstone.objects.create(user_id=self.user_id, gasto_id=self.pk)
+            result = super().delete(*args, **kwargs)
+            deltas.apply()
+            categories.apply()
+            gastos_changed(self.user_id)
+        return result
+
     def get_total_amount(self):
-        """Get total amount including all installments"""
+        """Get total amount including all installments (also for unsaved instances)"""
         return self.monto * self.pagos_totales
     
     def get_remaining_amount(self):
-        """Get remaining amount to be paid"""
-        self.monto_pendiente = round(self.monto * (self.pagos_totales - self.pagos_realizados), 2)
-        return self.monto_pendiente
+        """Get remaining amount to be paid (also for unsaved instances)"""
+        return round(self.monto * (self.pagos_totales - self.pagos_realizados), 2)
 
     def get_splits(self):
         """Get all expense splits for this shared expense"""
@@ -201,6 +406,122 @@ class Gasto(models.Model):
         return []
 
 
+class GastoMonthlyRollup(models.Model):
+    """
+    Monthly spend per user, grupo, categoria and moneda.
+
+    Maintained incrementally on every gasto write (see api.rollups) so the
+    summary endpoint never scans api_gasto; ``rebuild_gasto_rollups`` verifies
+    and repairs it.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gasto_rollups')
+    grupo = models.ForeignKey(Grupo, on_delete=models.CASCADE, related_name='gasto_rollups', null=True, blank=True)
+    month = models.DateField(help_text="Primer día del mes")
+    categoria = models.CharField(max_length=24, choices=Gasto.CATEGORIAS_CHOICES)
+    moneda = models.CharField(max_length=3, choices=Gasto.MONEDAS_CHOICES)
+    total = models.FloatField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_gasto_monthly_rollup'
+        ordering = ['-month', 'categoria', 'moneda']
+        indexes = [
+            models.Index(fields=['user', '-month'], name='gasto_rollup_user_month_idx'),
+        ]
+        constraints = [
+            # NULL grupos never collide in a unique index, so personal rows get their own
+            models.UniqueConstraint(
+                fields=['user', 'grupo', 'month', 'categoria', 'moneda'],
+                condition=models.Q(grupo__isnull=False),
+                name='gasto_rollup_grupo_uniq',
+            ),
+            models.UniqueConstraint(
+                fields=['user', 'month', 'categoria', 'moneda'],
+                condition=models.Q(grupo__isnull=True),
+                name='gasto_rollup_personal_uniq',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.month:%Y-%m} {self.categoria} {self.total} {self.moneda} ({self.count})"
+
+
+class GrupoCurrencyTotal(models.Model):
+    """
+    Spend of a grupo in one moneda.
+
+    Maintained together with the gasto rollups (see api.rollups) so grupo
+    responses never scan api_gasto; ``reconcile_grupo_counters`` verifies and
+    repairs it.
+    """
+    grupo = models.ForeignKey(Grupo, on_delete=models.CASCADE, related_name='currency_totals')
+    moneda = models.CharField(max_length=3, choices=Gasto.MONEDAS_CHOICES)
+    total = models.FloatField(default=0)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_grupo_currency_total'
+        ordering = ['moneda']
+        constraints = [
+            models.UniqueConstraint(fields=['grupo', 'moneda'], name='grupo_currency_total_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.grupo_id} {self.total} {self.moneda} ({self.count})"
+
+
+class GastoTombstone(models.Model):
+    """
+    Marker left by a deleted gasto so delta sync (api.sync) can report it.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='gasto_tombstones')
+    gasto_id = models.IntegerField(help_text="Id del gasto eliminado")
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_gasto_tombstone'
+        ordering = ['deleted_at', 'id']
+        indexes = [
+            models.Index(fields=['user', 'deleted_at', 'id'], name='gasto_tombstone_user_idx'),
+            models.Index(fields=['deleted_at']),
+        ]
+
+    def __str__(self):
+        return f"Gasto {self.gasto_id} eliminado @ {self.deleted_at:%Y-%m-%d %H:%M:%S}"
+
+    @classmethod
+    def record_deletion(cls, gastos):
+        """Write one tombstone per gasto of ``gastos``; call it before deleting them."""
+        cls.objects.bulk_create(
+            cls(user_id=user_id, gasto_id=gasto_id) for user_id, gasto_id in gastos.values_list('user_id', 'id')
+        )
+
+
+class VendorCategoryCount(models.Model):
+    """
+    How many of a user's gastos of a vendor are in each categoria.
+
+    ``vendedor`` is the normalized vendor name (see api.categorization); gastos
+    left in the default categoria are not counted. Maintained incrementally on
+    every gasto write and read to suggest a categoria for new gastos.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='vendor_category_counts')
+    vendedor = models.CharField(max_length=128, help_text="Vendedor normalizado")
+    categoria = models.CharField(max_length=24, choices=Gasto.CATEGORIAS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'api_vendor_category_count'
+        ordering = ['vendedor', '-count']
+        constraints = [
+            # Also the index of the per-vendor lookups
+            models.UniqueConstraint(fields=['user', 'vendedor', 'categoria'], name='vendor_category_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} {self.vendedor} → {self.categoria} ({self.count})"
+
+
 class ExpenseSplit(models.Model):
     """
     Model to handle how shared expenses are split among project members.
@@ -401,6 +722,31 @@ class LoginAttempt(models.Model):
         status = 'OK' if self.successful else 'FAIL'
         return f"{self.identifier} ({status}) @ {self.created_at:%Y-%m-%d %H:%M:%S}"
 
+
+class ExchangeRateSnapshot(models.Model):
+    """A dolarapi quote as published at ``fecha``, kept to convert gastos at the rate of their date.
+
+    Written by ``snapshot_exchange_rates``; read in bulk through api.rate_history.
+    """
+    moneda = models.CharField(max_length=3, help_text="Moneda cotizada (USD, EUR, ...)")
+    casa = models.CharField(max_length=32, help_text="Tipo de cotización (oficial, blue, tarjeta, ...)")
+    compra = models.FloatField(null=True, blank=True, help_text="Pesos por unidad, compra")
+    venta = models.FloatField(null=True, blank=True, help_text="Pesos por unidad, venta")
+    fecha = models.DateTimeField(help_text="Fecha de actualización informada por dolarapi")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        db_table = 'api_exchange_rate_snapshot'
+        ordering = ['moneda', 'casa', 'fecha']
+        constraints = [
+            # Also the index of the per-quote range scans; repeated snapshots of
+            # an unchanged quote are skipped
+            models.UniqueConstraint(fields=['moneda', 'casa', 'fecha'], name='exchange_rate_snapshot_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.moneda} {self.casa} {self.venta} @ {self.fecha:%Y-%m-%d %H:%M}"
+
 # NOTE: Enforcing a DB-level unique constraint on the built-in User.email field
 # directly requires a custom migration altering auth_user.
 # Because we are still using Django's default User model, we will generate
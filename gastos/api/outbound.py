@@ -0,0 +1,223 @@
+import asyncio
+import threading
+import time
+import weakref
+
+import httpx
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+# (connect, read) seconds of one attempt
+OUTBOUND_TIMEOUT = (3, 5)
+OUTBOUND_POOL_SIZE = 10
+# Retries of idempotent requests on connection errors and these statuses,
+# sleeping backoff * 2 ** (retry - 1) seconds in between
+OUTBOUND_RETRIES = 2
+OUTBOUND_BACKOFF = 0.2
+OUTBOUND_RETRY_STATUSES = (502, 503, 504)
+# Consecutive failed calls that open the circuit, and seconds it stays open
+BREAKER_FAILURE_THRESHOLD = 5
+BREAKER_RESET_TIMEOUT = 30
+
+
+class CircuitOpen(requests.RequestException):
+    """The upstream failed repeatedly; calls fail fast until the breaker lets one through."""
+
+
+class CircuitBreaker:
+    """Fails fast after ``failure_threshold`` consecutive failures.
+
+    Once open, calls raise CircuitOpen without touching the network for
+    ``reset_timeout`` seconds; then a single trial call is let through
+    (half-open) and its outcome closes or reopens the circuit. The state is
+    per process.
+    """
+    CLOSED, OPEN, HALF_OPEN = 'closed', 'open', 'half-open'
+
+    def __init__(self, name, failure_threshold=BREAKER_FAILURE_THRESHOLD, reset_timeout=BREAKER_RESET_TIMEOUT):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self.trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self.opened_at < self.reset_timeout:
+            return self.OPEN
+        return self.HALF_OPEN
+
+    def before_call(self):
+        """Raise CircuitOpen or let the call through; True if it is the half-open trial.
+
+        The caller must pass that value to ``after_call()`` in a ``finally``
+        block, so a trial that ends in any other way (cancelled, unexpected
+        exception) cannot leave the breaker waiting for it forever.
+        """
+        with self._lock:
+            state = self.state
+            if state == self.OPEN or (state == self.HALF_OPEN and self.trial_running):
+                raise CircuitOpen(f'{self.name}: circuit open after {self.failures} failures')
+            if state == self.HALF_OPEN:
+                self.trial_running = True
+                return True
+            return False
+
+    def after_call(self, trial):
+        """End the call started by ``before_call()``, however it finished."""
+        if trial:
+            with self._lock:
+                self.trial_running = False
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self.trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def reset(self):
+        self.record_success()
+
+
+class OutboundClient:
+    """Shared HTTP client of one upstream: keep-alive pool, retries, timeouts and a circuit breaker.
+
+    One instance per upstream lives for the whole process, so consecutive
+    calls reuse open TCP/TLS connections instead of opening one each.
+    """
+
+    def __init__(self, name, base_url, timeout=OUTBOUND_TIMEOUT, retries=OUTBOUND_RETRIES,
+                 backoff=OUTBOUND_BACKOFF, pool_size=OUTBOUND_POOL_SIZE, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.breaker = breaker or CircuitBreaker(name)
+        retry = Retry(
+            total=retries,
+            connect=retries,
+            read=retries,
+            status=retries,
+            backoff_factor=backoff,
+            status_forcelist=OUTBOUND_RETRY_STATUSES,
+            allowed_methods=frozenset({'GET', 'HEAD'}),
+            # The final 5xx response is returned to the caller, not an exception
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+    def url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def get(self, path, **kwargs):
+        """GET ``path``; raises requests.RequestException on failure, CircuitOpen when failing fast."""
+        trial = self.breaker.before_call()
+        try:
+            response = self.session.get(self.url(path), timeout=kwargs.pop('timeout', self.timeout), **kwargs)
+            response.raise_for_status()
+        except requests.RequestException:
+            self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            self.breaker.after_call(trial)
+        return response
+
+    def get_json(self, path, **kwargs):
+        return self.get(path, **kwargs).json()
+
+
+class AsyncOutboundClient:
+    """Async counterpart of OutboundClient for ASGI views, on ``httpx.AsyncClient``.
+
+    An ``httpx.AsyncClient`` (and its connection pool) is bound to the event
+    loop that opened it, so one is kept per running loop: under an ASGI
+    server every request of a worker shares the same pool. Pass the sync
+    client's ``breaker`` so both stop calling a failing upstream together.
+    """
+
+    def __init__(self, name, base_url, timeout=OUTBOUND_TIMEOUT, retries=OUTBOUND_RETRIES,
+                 backoff=OUTBOUND_BACKOFF, pool_size=OUTBOUND_POOL_SIZE, breaker=None):
+        self.name = name
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.pool_size = pool_size
+        self.breaker = breaker or CircuitBreaker(name)
+        self._clients = weakref.WeakKeyDictionary()
+
+    def url(self, path):
+        return f'{self.base_url}/{path.lstrip("/")}'
+
+    def _client(self):
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            connect, read = self.timeout
+            client = self._clients[loop] = httpx.AsyncClient(
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size),
+            )
+        return client
+
+    async def get(self, path, **kwargs):
+        """GET ``path``; raises httpx.HTTPError on failure, CircuitOpen when failing fast."""
+        trial = self.breaker.before_call()
+        try:
+            client = self._client()
+            for attempt in range(self.retries + 1):
+                if attempt > 1:
+                    await asyncio.sleep(self.backoff * 2 ** (attempt - 1))
+                try:
+                    response = await client.get(self.url(path), **kwargs)
+                except httpx.TransportError:
+                    if attempt == self.retries:
+                        raise
+                    continue
+                if response.status_code not in OUTBOUND_RETRY_STATUSES or attempt == self.retries:
+                    break
+            response.raise_for_status()
+        except httpx.HTTPError:
+            self.breaker.record_failure()
+            raise
+        else:
+            self.breaker.record_success()
+        finally:
+            # Also when the request is cancelled (client disconnect)
+            self.breaker.after_call(trial)
+        return response
+
+    async def get_json(self, path, **kwargs):
+        return (await self.get(path, **kwargs)).json()
+
+    async def aclose(self):
+        """Close the running loop's connections (e.g. before the loop itself closes)."""
+        client = self._clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+
+# Short timeouts and a single retry keep one fetch (about 10 s at worst)
+# within the quotes refresh lock (see api.rates)
+dolarapi = OutboundClient('dolarapi', settings.DOLARAPI_URL, timeout=(2, 3), retries=1)
+async_dolarapi = AsyncOutboundClient(
+    'dolarapi', settings.DOLARAPI_URL, timeout=(2, 3), retries=1, breaker=dolarapi.breaker,
+)
@@ -0,0 +1,182 @@
+import json
+import operator
+from base64 import b64decode, b64encode
+from functools import reduce
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetCursorPagination(BasePagination):
+    """Cursor pagination keyed on the full ordering tuple instead of an offset.
+
+    The cursor stores the ordering values of the row at the edge of the page,
+    so every page is a single index range scan that starts right after it:
+    page N costs the same as page 1. An explicit ``order_by()`` on the incoming
+    queryset (e.g. from a filter backend) replaces the default ``ordering``.
+    Either must end in a unique field and should match a composite index.
+
+    Clients that still need the whole collection can pass ``?paginate=false``.
+    """
+    ordering = ('-pk',)
+    page_size = 50
+    max_page_size = 500
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    unpaginated_query_param = 'paginate'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get(self.unpaginated_query_param, '').lower() in ('false', '0', 'no'):
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.model = queryset.model
+        self.ordering_fields = tuple(queryset.query.order_by) or tuple(self.ordering)
+        position, reverse = self.decode_cursor(request)
+
+        ordering = [self._flip(field) for field in self.ordering_fields] if reverse else list(self.ordering_fields)
+        queryset = queryset.order_by(*ordering)
+        if position is not None:
+            queryset = queryset.filter(self._after(position, ordering))
+
+        # Fetch one extra row to learn whether there is another page
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        page = rows[:self.page_size]
+
+        if reverse:
+            page.reverse()
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+
+        self.page = page
+        return page
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                'name': self.cursor_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Opaque pagination cursor taken from next/previous',
+                'schema': {'type': 'string'},
+            },
+            {
+                'name': self.page_size_query_param,
+                'required': False,
+                'in': 'query',
+                'description': f'Rows per page (max {self.max_page_size})',
+                'schema': {'type': 'integer'},
+            },
+            {
+                'name': self.unpaginated_query_param,
+                'required': False,
+                'in': 'query',
+                'description': 'Pass "false" to receive the whole collection as a plain list',
+                'schema': {'type': 'boolean'},
+            },
+        ]
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii'), altchars=b'-_', validate=True))
+            values, reverse = payload['p'], bool(payload.get('r'))
+            if len(values) != len(self.ordering_fields):
+                raise ValueError
+            position = [
+                self._field(name).to_python(value)
+                for name, value in zip(self._field_names(), values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': [value.isoformat() if hasattr(value, 'isoformat') else value for value in position]}
+        if reverse:
+            payload['r'] = 1
+        encoded = b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'), altchars=b'-_').decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def _field_names(self):
+        return [field.lstrip('-') for field in self.ordering_fields]
+
+    def _field(self, name):
+        if name == 'pk':
+            return self.model._meta.pk
+        return self.model._meta.get_field(name)
+
+    def _position(self, instance):
+        return [getattr(instance, name) for name in self._field_names()]
+
+    @staticmethod
+    def _flip(field):
+        return field[1:] if field.startswith('-') else f'-{field}'
+
+    @staticmethod
+    def _after(position, ordering):
+        """Build ``(a, b, c) > (x, y, z)`` for mixed sort directions."""
+        clauses = []
+        equal = Q()
+        for field, value in zip(ordering, position):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            clauses.append(equal & Q(**{f'{name}__{lookup}': value}))
+            equal &= Q(**{name: value})
+        return reduce(operator.or_, clauses)
+
+
+class GastoCursorPagination(KeysetCursorPagination):
+    """Pages through a user's gastos following ``Gasto.Meta.ordering``.
+
+    Served by the ``(user, -fecha_gasto, -created_at, id)`` index.
+    """
+    ordering = ('-fecha_gasto', '-created_at', 'id')
@@ -0,0 +1,125 @@
+from django.core.cache import cache
+from rest_framework.permissions import SAFE_METHODS, BasePermission
+
+from .caching import GRUPOS, get_version
+from .models import Grupo, GrupoMembership
+
+
+# Membership writes bump the grupos version; the timeout only bounds writes
+# that skip the model (``grupo.members.add()``, queryset updates)
+GRUPO_PERMISSIONS_CACHE_TIMEOUT = 60 * 60
+GRUPO_PERMISSIONS_CACHE_KEY = 'grupos:permissions:{user_id}:{version}'
+
+# Columns cached per grupo, in the order of a membership map entry
+MEMBERSHIP_COLUMNS = ('role', 'can_add_expenses', 'can_edit_expenses', 'can_manage_members', 'grupo__is_active')
+
+# Roles allowed every action whatever their flags, and roles that can only read
+MANAGER_ROLES = ('owner', 'admin')
+READ_ONLY_ROLES = ('viewer',)
+
+# Action -> membership flag that grants it to a plain member (None: managers only)
+GRUPO_ACTIONS = {
+    'view': None,
+    'add_expenses': 'can_add_expenses',
+    'edit_expenses': 'can_edit_expenses',
+    'manage_members': 'can_manage_members',
+    'manage_grupo': None,
+    'delete_grupo': None,
+}
+# Actions that also need the grupo to be active
+EXPENSE_ACTIONS = ('add_expenses', 'edit_expenses')
+
+
+def load_grupo_permissions(user_id, grupo_ids=None):
+    """``{grupo id: membership entry}`` of ``user_id``'s active memberships; one query.
+
+    An entry holds the MEMBERSHIP_COLUMNS of the membership. The grupo's
+    owner is treated as role 'owner' even when its membership says
+    otherwise (grupos created before memberships carried the role).
+    ``grupo_ids`` limits the map to those grupos.
+    """
+    rows = GrupoMembership.objects.filter(user_id=user_id, is_active=True).order_by()
+    if grupo_ids is not None:
+        rows = rows.filter(grupo_id__in=grupo_ids)
+    rows = rows.values_list('grupo_id', 'grupo__owner_id', *MEMBERSHIP_COLUMNS)
+    permissions = {}
+    for grupo_id, owner_id, role, *flags in rows:
+        permissions[grupo_id] = ('owner' if owner_id == user_id else role, *flags)
+    return permissions
+
+
+def get_grupo_permissions(user):
+    """Membership map of ``user`` (see load_grupo_permissions), cached under the grupos version."""
+    key = GRUPO_PERMISSIONS_CACHE_KEY.format(user_id=user.pk, version=get_version(GRUPOS, user.pk))
+    permissions = cache.get(key)
+    if permissions is None:
+        permissions = load_grupo_permissions(user.pk)
+        cache.set(key, permissions, GRUPO_PERMISSIONS_CACHE_TIMEOUT)
+    return permissions
+
+
+def request_grupo_permissions(request):
+    """Membership map of ``request.user``, resolved once per request."""
+    permissions = getattr(request, '_grupo_permissions', None)
+    if permissions is None:
+        permissions = request._grupo_permissions = get_grupo_permissions(request.user)
+    return permissions
+
+
+def membership_allows(entry, action):
+    """Whether a membership map entry (None: not a member) allows ``action`` (see GRUPO_ACTIONS)."""
+    if entry is None:
+        return False
+    role, can_add_expenses, can_edit_expenses, can_manage_members, grupo_is_active = entry
+    if action in EXPENSE_ACTIONS and not grupo_is_active:
+        return False
+    if action == 'view' or role in MANAGER_ROLES:
+        return action != 'delete_grupo' or role == 'owner'
+    flag = GRUPO_ACTIONS[action]
+    if flag is None or role in READ_ONLY_ROLES:
+        return False
+    return {
+        'can_add_expenses': can_add_expenses,
+        'can_edit_expenses': can_edit_expenses,
+        'can_manage_members': can_manage_members,
+    }[flag]
+
+
+def has_grupo_permission(request, grupo_id, action):
+    """Whether ``request.user`` may perform ``action`` in grupo ``grupo_id``, without a query once cached."""
+    return membership_allows(request_grupo_permissions(request).get(grupo_id), action)
+
+
+class GrupoRolePermission(BasePermission):
+    """
+    Checks the user's role and ``can_*`` flags in the grupo a write targets.
+
+    Views map HTTP methods to actions (see GRUPO_ACTIONS):
+
+    - ``grupo_body_actions``: checked against the ``grupo`` id in the request
+      body, for creates and for writes that move an object to a grupo.
+    - ``grupo_object_actions``: checked against the grupo of the object
+      (the object itself for a Grupo).
+
+    Reads are left to the view's queryset. The membership map is loaded once
+    per request and cached across requests (see get_grupo_permissions).
+    """
+    message = 'No tenés permiso para esta acción en el grupo.'
+
+    def has_permission(self, request, view):
+        action = getattr(view, 'grupo_body_actions', {}).get(request.method)
+        if action is None or not hasattr(request.data, 'get'):
+            return True
+        try:
+            grupo_id = int(request.data.get('grupo'))
+        except (TypeError, ValueError):
+            # No grupo (or an invalid one, which the serializer rejects)
+            return True
+        return has_grupo_permission(request, grupo_id, action)
+
+    def has_object_permission(self, request, view, obj):
+        action = getattr(view, 'grupo_object_actions', {}).get(request.method)
+        if action is None or request.method in SAFE_METHODS:
+            return True
+        grupo_id = obj.pk if isinstance(obj, Grupo) else obj.grupo_id
+        return has_grupo_permission(request, grupo_id, action)
@@ -0,0 +1,106 @@
+from array import array
+from itertools import accumulate
+
+from django.core.cache import cache
+from django.utils import timezone
+
+from .caching import gasto_version
+from .filters import PENDING_GASTOS
+from .models import Gasto
+
+
+PROJECTION_DEFAULT_MONTHS = 12
+PROJECTION_MAX_MONTHS = 60
+# Writes bump the gasto version; the timeout only bounds writes made by other
+# processes (management commands) when the cache is not shared
+PROJECTION_CACHE_TIMEOUT = 60 * 60
+PROJECTION_CACHE_KEY = 'gastos:projection:{user_id}:{version}:{month}:{months}'
+
+# Columns of the open installment plans, in the order they are loaded
+PLAN_COLUMNS = ('medio_pago_id', 'medio_pago__ente_emisor', 'moneda', 'monto', 'fecha_gasto', 'pagos_realizados', 'pagos_totales')
+
+
+def _month_index(day):
+    return day.year * 12 + day.month - 1
+
+
+def _month_label(index):
+    return f'{index // 12}-{index % 12 + 1:02d}'
+
+
+def load_open_plans(user):
+    """Return the user's open installment plans as one tuple per column."""
+    rows = Gasto.objects.filter(PENDING_GASTOS, user=user).order_by().values_list(*PLAN_COLUMNS)
+    return tuple(zip(*rows)) or tuple(() for _ in PLAN_COLUMNS)
+
+
+def project_installments(columns, start, months):
+    """Per-month installment schedule of ``columns`` (see load_open_plans).
+
+    Installment ``n`` of a plan falls ``n - 1`` months after its fecha_gasto;
+    unpaid installments already due are added to the first projected month.
+    Each plan writes two entries of a difference array of its
+    ``(medio_pago, moneda)`` group, so the cost is one pass over the plans
+    plus one running sum of ``months`` entries per group.
+    """
+    medio_pago_ids, emisores, monedas, montos, fechas, realizados, totales = columns
+    start_index = _month_index(start)
+    groups = {}
+    names = {}
+    for medio_pago_id, emisor, moneda, monto, fecha, paid, total in zip(
+        medio_pago_ids, emisores, monedas, montos, fechas, realizados, totales
+    ):
+        diff = groups.get((medio_pago_id, moneda))
+        if diff is None:
+            # One spare slot takes the end marker of plans reaching the horizon
+            diff = groups[(medio_pago_id, moneda)] = array('d', bytes(8 * (months + 1)))
+            names[medio_pago_id] = emisor
+        first = _month_index(fecha) + paid - start_index
+        remaining = total - paid
+        if first < 0:
+            overdue = min(remaining, -first)
+            diff[0] += overdue * monto
+            diff[1] -= overdue * monto
+            remaining -= overdue
+            first = 0
+        if remaining > 0 and first < months:
+            diff[first] += monto
+            diff[min(first + remaining, months)] -= monto
+
+    series = []
+    for (medio_pago_id, moneda), diff in sorted(groups.items(), key=lambda item: (item[0][1], names[item[0][0]], item[0][0])):
+        cuotas = [round(value, 2) for value in accumulate(diff[:months])]
+        series.append({
+            'medio_pago': medio_pago_id,
+            'medio_pago_name': names[medio_pago_id],
+            'moneda': moneda,
+            'cuotas': cuotas,
+            'total': round(sum(cuotas), 2),
+        })
+
+    totales = {}
+    for row in series:
+        current = totales.setdefault(row['moneda'], array('d', bytes(8 * months)))
+        for month, value in enumerate(row['cuotas']):
+            current[month] += value
+    return {
+        'months': [_month_label(start_index + month) for month in range(months)],
+        'series': series,
+        'totales': [
+            {'moneda': moneda, 'cuotas': [round(value, 2) for value in values], 'total': round(sum(values), 2)}
+            for moneda, values in sorted(totales.items())
+        ],
+    }
+
+
+def installment_projection(user, months=PROJECTION_DEFAULT_MONTHS):
+    """Cached projection of ``user``'s installments for the next ``months`` months."""
+    start = timezone.localdate().replace(day=1)
+    key = PROJECTION_CACHE_KEY.format(
+        user_id=user.id, version=gasto_version(user.id), month=f'{start:%Y-%m}', months=months
+    )
+    projection = cache.get(key)
+    if projection is None:
+        projection = project_installments(load_open_plans(user), start, months)
+        cache.set(key, projection, PROJECTION_CACHE_TIMEOUT)
+    return projection
@@ -0,0 +1,116 @@
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db.models import OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import ExchangeRateSnapshot
+from .rates import BASE_CURRENCY
+
+
+DEFAULT_CASA = 'oficial'
+
+
+def _day_end(day):
+    """First instant after ``day`` in the local time zone."""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+def parse_snapshots(quotes):
+    """ExchangeRateSnapshot instances for a dolarapi quote list; malformed quotes are skipped."""
+    snapshots = []
+    for quote in quotes:
+        try:
+            fecha = parse_datetime(quote['fechaActualizacion'])
+            snapshot = ExchangeRateSnapshot(
+                moneda=quote['moneda'],
+                casa=quote['casa'],
+                compra=None if quote.get('compra') is None else float(quote['compra']),
+                venta=None if quote.get('venta') is None else float(quote['venta']),
+                fecha=fecha,
+            )
+        except (KeyError, TypeError, ValueError):
+            continue
+        if fecha is not None:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def latest_rates(monedas, casa=DEFAULT_CASA):
+    """``{moneda: pesos per unit}`` of the last snapshot of each of ``monedas``, plus ARS; one query."""
+    latest = (
+        ExchangeRateSnapshot.objects.filter(casa=casa, moneda=OuterRef('moneda'))
+        .order_by('-fecha').values('fecha')[:1]
+    )
+    rows = ExchangeRateSnapshot.objects.filter(
+        casa=casa, moneda__in=set(monedas) - {BASE_CURRENCY}, venta__isnull=False, fecha=Subquery(latest),
+    ).values_list('moneda', 'venta')
+    return {**dict(rows), BASE_CURRENCY: 1.0}
+
+
+class RateHistory:
+    """Quotes of several monedas over a range of dates, loaded with one query.
+
+    ``RateHistory.load(dates, monedas)`` reads, for each moneda, every
+    snapshot from the last one before the earliest date up to the latest
+    date; each lookup is then a ``bisect`` over that moneda's snapshot
+    times. A date resolves to the last snapshot published before the end of
+    that day, or to None when there is none.
+    """
+
+    def __init__(self, rows):
+        # rows: (moneda, fecha, compra, venta) ordered by moneda and fecha
+        self.fechas = defaultdict(list)
+        self.quotes = defaultdict(list)
+        for moneda, fecha, compra, venta in rows:
+            self.fechas[moneda].append(fecha)
+            self.quotes[moneda].append((fecha, compra, venta))
+        # Gastos share dates: compute each day boundary once
+        self._day_ends = {}
+
+    @classmethod
+    def load(cls, dates, monedas, casa=DEFAULT_CASA):
+        dates = set(dates)
+        monedas = set(monedas) - {BASE_CURRENCY}
+        if not dates or not monedas:
+            return cls(())
+        first, last = _day_end(min(dates)), _day_end(max(dates))
+        snapshots = ExchangeRateSnapshot.objects.filter(casa=casa)
+        condition = Q()
+        for moneda in monedas:
+            # Uncorrelated subqueries: the database resolves each floor once
+            floor = snapshots.filter(moneda=moneda, fecha__lt=first).order_by('-fecha').values('fecha')[:1]
+            condition |= Q(moneda=moneda, fecha__gte=Coalesce(Subquery(floor), Value(first)))
+        rows = (
+            snapshots.filter(condition, fecha__lt=last)
+            .order_by('moneda', 'fecha')
+            .values_list('moneda', 'fecha', 'compra', 'venta')
+        )
+        return cls(rows)
+
+    def quote(self, moneda, day):
+        """``(fecha, compra, venta)`` of the snapshot in effect on ``day``, or None."""
+        end = self._day_ends.get(day)
+        if end is None:
+            end = self._day_ends[day] = _day_end(day)
+        index = bisect_left(self.fechas.get(moneda, ()), end) - 1
+        return self.quotes[moneda][index] if index >= 0 else None
+
+    def rate(self, moneda, day):
+        """Pesos per unit of ``moneda`` (selling rate) on ``day``, or None."""
+        if moneda == BASE_CURRENCY:
+            return 1.0
+        quote = self.quote(moneda, day)
+        return None if quote is None else quote[2]
+
+    def convert(self, amount, moneda, target, day):
+        """``amount`` in ``moneda`` expressed in ``target`` at the rates of ``day``, or None."""
+        if moneda == target:
+            return amount
+        source_rate, target_rate = self.rate(moneda, day), self.rate(target, day)
+        if not source_rate or not target_rate:
+            return None
+        return amount * source_rate / target_rate
@@ -0,0 +1,200 @@
+import asyncio
+import threading
+import time
+
+import httpx
+import requests
+from django.core.cache import cache
+
+from .outbound import CircuitOpen, async_dolarapi, dolarapi
+
+
+# How long a request waits for another one's fetch of an uncached source;
+# the upstream call itself is bounded by the outbound client's timeouts
+QUOTES_TIMEOUT = 5
+# A copy older than its source's TTL is still served while a refresh runs,
+# and while dolarapi is failing, for up to this long
+QUOTES_STALE_TIMEOUT = 24 * 60 * 60
+# At most one refresh per source every this many seconds, across workers
+QUOTES_LOCK_TIMEOUT = 2 * QUOTES_TIMEOUT
+# After a failed refresh nobody retries for this long
+QUOTES_RETRY_AFTER = 30
+QUOTES_CACHE_KEY = 'quotes:{name}'
+QUOTES_LOCK_KEY = 'quotes:{name}:lock'
+QUOTES_FAILED = 'failed'
+# Pesos per unit; gastos in 'NA' (otros) cannot be converted
+BASE_CURRENCY = 'ARS'
+
+
+class QuotesUnavailable(Exception):
+    """dolarapi could not be reached and there is no copy to serve."""
+
+
+class QuoteSource:
+    def __init__(self, name, path, ttl):
+        self.name = name
+        self.path = path
+        # Seconds a fetched copy is served without refreshing it
+        self.ttl = ttl
+        self.cache_key = QUOTES_CACHE_KEY.format(name=name)
+        self.lock_key = QUOTES_LOCK_KEY.format(name=name)
+
+
+# Every dollar rate (oficial, blue, tarjeta, ...), shown by /api/cotizacion/
+DOLARES = QuoteSource('dolares', '/dolares', ttl=5 * 60)
+# One rate per currency, used for conversions
+COTIZACIONES = QuoteSource('cotizaciones', '/cotizaciones', ttl=60 * 60)
+
+
+def fetch_quotes(source):
+    """Current quotes of ``source``; raises requests.RequestException (CircuitOpen while dolarapi is down)."""
+    return dolarapi.get_json(source.path)
+
+
+def _refresh(source):
+    """Fetch ``source`` and cache it; call only while holding its lock."""
+    try:
+        data = fetch_quotes(source)
+    except (requests.RequestException, ValueError):
+        # Keep serving the stale copy and hold off the next attempt
+        cache.set(source.lock_key, QUOTES_FAILED, QUOTES_RETRY_AFTER)
+        return None
+    entry = {'data': data, 'fetched_at': time.time()}
+    cache.set(source.cache_key, entry, QUOTES_STALE_TIMEOUT)
+    cache.delete(source.lock_key)
+    return entry
+
+
+def _refresh_in_background(source):
+    # cache.add() is atomic: only the request that takes the lock refreshes
+    if cache.add(source.lock_key, 'refreshing', QUOTES_LOCK_TIMEOUT):
+        threading.Thread(target=_refresh, args=(source,), daemon=True).start()
+
+
+def get_quotes(source):
+    """Return ``(data, age in seconds)`` of ``source`` from the cache, fetching it at most once at a time.
+
+    A fresh copy is returned as is. A copy older than ``source.ttl`` is
+    returned too, while one background thread refreshes it
+    (stale-while-revalidate). Only with nothing cached does a request wait
+    for dolarapi; concurrent requests then wait for that single fetch instead
+    of starting their own (single-flight). Raises QuotesUnavailable when no
+    copy can be had within QUOTES_TIMEOUT.
+    """
+    entry = cache.get(source.cache_key)
+    if entry is not None:
+        age = time.time() - entry['fetched_at']
+        if age >= source.ttl:
+            _refresh_in_background(source)
+        return entry['data'], age
+
+    if cache.add(source.lock_key, 'refreshing', QUOTES_LOCK_TIMEOUT):
+        entry = _refresh(source)
+    else:
+        deadline = time.monotonic() + QUOTES_TIMEOUT
+        while entry is None and time.monotonic() < deadline:
+            if cache.get(source.lock_key) == QUOTES_FAILED:
+                break
+            time.sleep(0.05)
+            entry = cache.get(source.cache_key)
+    if entry is None:
+        raise QuotesUnavailable(source.name)
+    return entry['data'], time.time() - entry['fetched_at']
+
+
+async def afetch_quotes(source):
+    """Async fetch_quotes(); raises httpx.HTTPError, or CircuitOpen while dolarapi is down."""
+    return await async_dolarapi.get_json(source.path)
+
+
+async def _arefresh(source):
+    """Async _refresh(): the same cache entry and lock, shared with sync requests."""
+    try:
+        data = await afetch_quotes(source)
+    except (httpx.HTTPError, CircuitOpen, ValueError):
+        await cache.aset(source.lock_key, QUOTES_FAILED, QUOTES_RETRY_AFTER)
+        return None
+    entry = {'data': data, 'fetched_at': time.time()}
+    await cache.aset(source.cache_key, entry, QUOTES_STALE_TIMEOUT)
+    await cache.adelete(source.lock_key)
+    return entry
+
+
+# The event loop only keeps weak references to tasks
+_background_refreshes = set()
+
+
+async def aget_quotes(source):
+    """Async get_quotes(): waits on the event loop instead of holding a thread.
+
+    The background refresh is a task on the running loop, and requests
+    waiting for another one's fetch sleep with ``asyncio.sleep``.
+    """
+    entry = await cache.aget(source.cache_key)
+    if entry is not None:
+        age = time.time() - entry['fetched_at']
+        if age >= source.ttl and await cache.aadd(source.lock_key, 'refreshing', QUOTES_LOCK_TIMEOUT):
+            task = asyncio.create_task(_arefresh(source))
+            _background_refreshes.add(task)
+            task.add_done_callback(_background_refreshes.discard)
+        return entry['data'], age
+
+    if await cache.aadd(source.lock_key, 'refreshing', QUOTES_LOCK_TIMEOUT):
+        entry = await _arefresh(source)
+    else:
+        deadline = time.monotonic() + QUOTES_TIMEOUT
+        while entry is None and time.monotonic() < deadline:
+            if await cache.aget(source.lock_key) == QUOTES_FAILED:
+                break
+            await asyncio.sleep(0.05)
+            entry = await cache.aget(source.cache_key)
+    if entry is None:
+        raise QuotesUnavailable(source.name)
+    return entry['data'], time.time() - entry['fetched_at']
+
+
+async def arelease_loop():
+    """Finish the running loop's quote refreshes and close its dolarapi connections.
+
+    For event loops that end with the request: under WSGI, Django runs an
+    async view on a new loop per request (``async_to_sync``), so the loop's
+    client would never be reused and its sockets would leak.
+    """
+    loop = asyncio.get_running_loop()
+    pending = [task for task in _background_refreshes if task.get_loop() is loop]
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    await async_dolarapi.aclose()
+
+
+def _parse_rates(quotes):
+    try:
+        rates = {quote['moneda']: float(quote['venta']) for quote in quotes if quote.get('venta')}
+    except (KeyError, TypeError, ValueError):
+        return None
+    rates[BASE_CURRENCY] = 1.0
+    return rates
+
+
+def get_rates():
+    """``{moneda: pesos per unit}`` including ARS itself, or None when dolarapi is unreachable."""
+    try:
+        quotes, _ = get_quotes(COTIZACIONES)
+    except QuotesUnavailable:
+        return None
+    return _parse_rates(quotes)
+
+
+def cached_rates():
+    """Like get_rates() from whatever copy is cached, however old, or None; never calls dolarapi."""
+    entry = cache.get(COTIZACIONES.cache_key)
+    return None if entry is None else _parse_rates(entry['data'])
+
+
+def convert(amount, moneda, target, rates):
+    """``amount`` in ``moneda`` expressed in ``target``, or None without a rate for either."""
+    if moneda == target:
+        return amount
+    if not rates or moneda not in rates or target not in rates:
+        return None
+    return amount * rates[moneda] / rates[target]
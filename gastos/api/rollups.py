@@ -0,0 +1,184 @@
+from collections import defaultdict
+from datetime import date
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from rest_framework.exceptions import ValidationError
+
+from .grupos import apply_grupo_changes
+from .models import Gasto, GastoMonthlyRollup
+
+
+# Gasto attributes that decide which rollup row a gasto counts towards
+ROLLUP_SOURCE_FIELDS = ('user_id', 'grupo_id', 'fecha_gasto', 'categoria', 'moneda', 'monto')
+ROLLUP_KEY_FIELDS = ('user_id', 'grupo_id', 'month', 'categoria', 'moneda')
+
+_fecha_gasto = Gasto._meta.get_field('fecha_gasto')
+
+
+def touches_rollup(update_fields):
+    """Whether a ``save(update_fields=...)`` can move a gasto between rollup rows."""
+    if update_fields is None:
+        return True
+    # update_fields may name either the field (grupo) or its column (grupo_id)
+    return any(Gasto._meta.get_field(name).attname in ROLLUP_SOURCE_FIELDS for name in update_fields)
+
+
+def rollup_key(values):
+    """Return ``(key, monto)`` for a gasto instance or a ``values()`` dict."""
+    if not isinstance(values, dict):
+        values = {name: getattr(values, name) for name in ROLLUP_SOURCE_FIELDS}
+    month = _fecha_gasto.to_python(values['fecha_gasto']).replace(day=1)
+    key = (values['user_id'], values['grupo_id'], month, values['categoria'], values['moneda'])
+    return key, float(values['monto'])
+
+
+def expected_rollups(queryset):
+    """Group ``queryset`` the way the rollup table does; one query."""
+    return (
+        queryset.order_by()
+        .annotate(month=TruncMonth('fecha_gasto'))
+        .values(*ROLLUP_KEY_FIELDS)
+        .annotate(total=Sum('monto'), count=Count('id'))
+    )
+
+
+def upsert_counters(model, keyed_deltas):
+    """Add ``[(lookup, {field: change})]`` to the counter rows of ``model``.
+
+    Each row matching ``lookup`` gets its fields increased with one atomic
+    F() update, is created when missing and deleted once its ``count``
+    drops to zero. A negative change to a missing row is dropped: only the
+    rebuild commands (rebuild_gasto_rollups, reconcile_grupo_counters) can
+    repair it. Callers pass the keys in a stable order, which keeps
+    concurrent writers from deadlocking on the rows.
+    """
+    for lookup, changes in keyed_deltas:
+        rows = model.objects.filter(**lookup)
+        increments = {field: F(field) + change for field, change in changes.items()}
+        if rows.update(**increments):
+            if changes['count'] < 0:
+                rows.filter(count__lte=0).delete()
+            continue
+        if changes['count'] <= 0:
+            continue
+        try:
+            with transaction.atomic():
+                model.objects.create(**lookup, **changes)
+        except IntegrityError:
+            # Another transaction created the row first
+            rows.update(**increments)
+
+
+class RollupDeltas:
+    """Collects per-key (total, count) changes of a write and applies them once.
+
+    Callers add the old version of every touched gasto with ``sign=-1`` and
+    the new one with ``sign=1``; keys whose changes cancel out (an edit of the
+    comentarios, say) cost no query. ``apply()`` also updates the grupo
+    counters (api.grupos.apply_grupo_changes) and must run in the transaction
+    of the gasto write so they all commit or roll back together.
+    """
+
+    def __init__(self):
+        self.changes = defaultdict(lambda: [0.0, 0])
+
+    def add(self, gasto, sign=1):
+        key, monto = rollup_key(gasto)
+        change = self.changes[key]
+        change[0] += sign * monto
+        change[1] += sign
+
+    def add_all(self, gastos, sign=1):
+        for gasto in gastos:
+            self.add(gasto, sign)
+
+    def subtract_queryset(self, queryset):
+        """Remove the gastos of ``queryset`` (about to be deleted) with one grouped query."""
+        for row in expected_rollups(queryset):
+            change = self.changes[tuple(row[name] for name in ROLLUP_KEY_FIELDS)]
+            change[0] -= row['total']
+            change[1] -= row['count']
+
+    def apply(self):
+        # The grupo counters take the same changes, per grupo and moneda
+        grupo_changes = defaultdict(lambda: [0.0, 0])
+        for (_, grupo_id, _, _, moneda), (total, count) in self.changes.items():
+            if grupo_id is not None:
+                grupo_changes[grupo_id, moneda][0] += total
+                grupo_changes[grupo_id, moneda][1] += count
+
+        # grupo_id may be None, which does not sort against ids
+        keys = sorted(self.changes, key=lambda key: (key[0], key[1] or 0, *key[2:]))
+        upsert_counters(GastoMonthlyRollup, (
+            (dict(zip(ROLLUP_KEY_FIELDS, key)), {'total': total, 'count': count})
+            for key, (total, count) in ((key, self.changes[key]) for key in keys)
+            if count or abs(total) >= 0.005
+        ))
+        apply_grupo_changes(grupo_changes)
+        self.changes.clear()
+
+
+def _parse_month(value):
+    try:
+        year, month = (int(part) for part in value.split('-'))
+        return date(year, month, 1)
+    except ValueError:
+        return None
+
+
+def summarize_gastos(user, params):
+    """Monthly totals of ``user`` per categoria and moneda, read from the rollup table.
+
+    ``params`` accepts ``desde`` / ``hasta`` (``AAAA-MM``, inclusive) and the
+    comma separated ``grupo``, ``categoria`` and ``moneda`` filters of the
+    gasto list. Rows of different grupos are added together.
+    """
+    filters = {}
+    errors = {}
+    for param, lookup in (('desde', 'month__gte'), ('hasta', 'month__lte')):
+        value = params.get(param)
+        if not value:
+            continue
+        month = _parse_month(value)
+        if month is None:
+            errors[param] = 'Mes inválido, usar formato AAAA-MM.'
+        else:
+            filters[lookup] = month
+    for param, choices in (('categoria', Gasto.CATEGORIAS_CHOICES), ('moneda', Gasto.MONEDAS_CHOICES)):
+        value = params.get(param)
+        if not value:
+            continue
+        values = [item.strip() for item in value.split(',') if item.strip()]
+        invalid = [item for item in values if item not in {key for key, _ in choices}]
+        if invalid:
+            errors[param] = f'Valores inválidos: {", ".join(invalid)}.'
+        else:
+            filters[f'{param}__in'] = values
+    value = params.get('grupo')
+    if value:
+        try:
+            filters['grupo_id__in'] = [int(item) for item in value.split(',') if item.strip()]
+        except ValueError:
+            errors['grupo'] = 'Debe ser un id numérico o una lista separada por comas.'
+    if errors:
+        raise ValidationError(errors)
+
+    rows = (
+        GastoMonthlyRollup.objects.filter(user=user, **filters)
+        .values('month', 'categoria', 'moneda')
+        .annotate(total=Sum('total'), count=Sum('count'))
+        .order_by('-month', 'categoria', 'moneda')
+    )
+    return [
+        {
+            'month': f"{row['month']:%Y-%m}",
+            'categoria': row['categoria'],
+            'moneda': row['moneda'],
+            # Incremental float sums drift by fractions of a cent
+            'total': round(row['total'], 2),
+            'count': row['count'],
+        }
+        for row in rows
+    ]
@@ -0,0 +1,86 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from rest_framework.exceptions import ValidationError
+
+from .models import Gasto
+
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+# Longer queries only make the index lookup slower, not the results better
+SEARCH_MAX_TERMS = 8
+
+# Maintained by the database itself, see migration 0013_gasto_search_index
+POSTGRES_SEARCH_SQL = """
+    SELECT id, ts_rank_cd(search_vector, query) AS rank
+    FROM api_gasto, to_tsquery('spanish', translate(%s, 'áéíóúü', 'aeiouu')) AS query
+    WHERE user_id = %s AND search_vector @@ query
+    ORDER BY rank DESC, fecha_gasto DESC, id DESC
+    LIMIT %s
+"""
+# bm25() is lower for better matches; the weights follow the column order
+SQLITE_SEARCH_SQL = """
+    SELECT rowid, -bm25(api_gasto_fts, 4.0, 2.0, 1.0) AS rank
+    FROM api_gasto_fts
+    WHERE api_gasto_fts MATCH %s AND user_id = %s
+    ORDER BY rank DESC, rowid DESC
+    LIMIT %s
+"""
+
+
+def search_terms(query):
+    """Words of ``query``, lowercased; raises a ValidationError when there are none."""
+    terms = re.findall(r'\w+', (query or '').lower())[:SEARCH_MAX_TERMS]
+    if not terms:
+        raise ValidationError({'q': 'Ingresar al menos una palabra para buscar.'})
+    return terms
+
+
+def _ranked_ids(user, terms, limit):
+    if connection.vendor == 'postgresql':
+        # Every word must match, as a prefix too ("merc" finds "Mercado")
+        sql, match = POSTGRES_SEARCH_SQL, ' & '.join(f'{term}:*' for term in terms)
+    elif connection.vendor == 'sqlite':
+        sql, match = SQLITE_SEARCH_SQL, ' '.join(f'"{term}"*' for term in terms)
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [match, user.id, limit])
+        return cursor.fetchall()
+
+
+def search_gastos(user, query, limit=SEARCH_DEFAULT_LIMIT, queryset=None):
+    """The user's gastos matching every word of ``query`` in vendedor, titulo or comentarios.
+
+    Returns up to ``limit`` Gasto instances from ``queryset``, best match
+    first, each with a ``search_rank``. Matches in vendedor weigh more than
+    in titulo, and those more than in comentarios. The lookup runs on the
+    full-text index of the database (a tsvector column with a GIN index on
+    PostgreSQL, an FTS5 table on SQLite); other backends get an unranked
+    ``icontains`` scan.
+    """
+    terms = search_terms(query)
+    if queryset is None:
+        queryset = Gasto.objects.all()
+
+    ranked = _ranked_ids(user, terms, limit)
+    if ranked is None:
+        condition = Q()
+        for term in terms:
+            condition &= Q(vendedor__icontains=term) | Q(titulo__icontains=term) | Q(comentarios__icontains=term)
+        gastos = list(queryset.filter(condition, user=user).order_by('-fecha_gasto', '-id')[:limit])
+        for gasto in gastos:
+            gasto.search_rank = None
+        return gastos
+
+    gastos = queryset.filter(user=user).in_bulk([gasto_id for gasto_id, _ in ranked])
+    results = []
+    for gasto_id, rank in ranked:
+        # Deleted between both queries
+        if gasto_id in gastos:
+            gasto = gastos[gasto_id]
+            gasto.search_rank = rank
+            results.append(gasto)
+    return results
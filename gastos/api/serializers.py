@@ -8,7 +8,9 @@ from .models import *
 from django.utils import timezone
 from datetime import timedelta
 from django.conf import settings
+from django.db.models import Prefetch
 from .utils import check_attempts
+from .grupos import grupo_totals
 
 
 
@@ -160,14 +162,122 @@ class EmailOrUsernameTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class EagerLoadingMixin:
+    """Declare the relations a serializer reads so views can load them up front.
+
+    Nested serializers list their own relations; parents compose them with the
+    nested source as prefix. ``setup_eager_loading`` applies both lists to a
+    queryset so the serializer never triggers per-row queries.
+    """
+    select_related_fields = ()
+    prefetch_related_fields = ()
+
+    @classmethod
+    def setup_eager_loading(cls, queryset):
+        if cls.select_related_fields:
+            queryset = queryset.select_related(*cls.select_related_fields)
+        if cls.prefetch_related_fields:
+            queryset = queryset.prefetch_related(*cls.prefetch_related_fields)
+        return queryset
+
+
+class SparseFieldsetMixin(EagerLoadingMixin):
+    """Render only the fields a client asks for and load only what they need.
+
+    ``?fields=a,b`` limits the representation to those fields and
+    ``?expand=c`` adds fields listed in ``expandable_fields``, which are left
+    out by default. Only read requests are trimmed.
+
+    ``field_requirements`` maps every field that is not a plain model column
+    to the columns (``only``), joins (``select_related``) and prefetches it
+    reads; ``setup_sparse_loading`` combines them for the selected fields.
+    """
+    expandable_fields = ()
+    field_requirements = {}
+    fields_query_param = 'fields'
+    expand_query_param = 'expand'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is not None and request.method not in ('GET', 'HEAD', 'OPTIONS'):
+            return
+        params = request.query_params if request is not None else {}
+        requested = self._split_param(params.get(self.fields_query_param))
+        expand = self._split_param(params.get(self.expand_query_param))
+        if requested:
+            keep = requested | expand
+        else:
+            keep = (set(self.fields) - set(self.expandable_fields)) | expand
+        for name in list(self.fields):
+            if name not in keep:
+                self.fields.pop(name)
+
+    @staticmethod
+    def _split_param(value):
+        return {item.strip() for item in (value or '').split(',') if item.strip()}
+
+    def setup_sparse_loading(self, queryset):
+        model = queryset.model
+        columns = {field.name for field in model._meta.concrete_fields}
+        # Keyset pagination reads the ordering columns of every row
+        only = {model._meta.pk.name}
+        only.update(field.lstrip('-') for field in (queryset.query.order_by or model._meta.ordering))
+        select_related = set()
+        prefetch_related = []
+        for name, field in self.fields.items():
+            requirements = self.field_requirements.get(name)
+            if requirements is None:
+                if field.source not in columns:
+                    # Unknown dependencies: fall back to loading everything
+                    return self.setup_eager_loading(queryset)
+                only.add(field.source)
+                continue
+            only.update(requirements.get('only', ()))
+            select_related.update(requirements.get('select_related', ()))
+            for lookup in requirements.get('prefetch_related', ()):
+                if lookup not in prefetch_related:
+                    prefetch_related.append(lookup)
+
+        if select_related:
+            queryset = queryset.select_related(*sorted(select_related))
+        if prefetch_related:
+            queryset = queryset.prefetch_related(*prefetch_related)
+        return queryset.only(*only)
+
+
+class GrupoListSerializer(serializers.ListSerializer):
+    """Computes the spend totals of every grupo of the list with one query."""
+
+    def to_representation(self, data):
+        grupos = list(data.all() if hasattr(data, 'all') else data)
+        self.child.totals = grupo_totals(grupos)
+        return super().to_representation(grupos)
+
+
 class GrupoSerializer(serializers.ModelSerializer):
-    member_count = serializers.ReadOnlyField(source='get_member_count')
-    total_expenses = serializers.ReadOnlyField(source='get_total_expenses')
+    # Converted to default_currency; null when some moneda has no exchange rate
+    total_expenses = serializers.SerializerMethodField()
+    totales_por_moneda = serializers.SerializerMethodField()
     
     class Meta:
         model = Grupo
         fields = '__all__'
-        read_only_fields = ('owner', 'created_at', 'updated_at')
+        read_only_fields = ('owner', 'member_count', 'expense_count', 'created_at', 'updated_at')
+        list_serializer_class = GrupoListSerializer
+
+    def _totals(self, grupo):
+        totals = getattr(self, 'totals', None)
+        if totals is None or grupo.pk not in totals:
+            # Single grupo (detail, create): compute it alone, once for both fields
+            self.totals = totals = {**(totals or {}), **grupo_totals([grupo])}
+        return totals[grupo.pk]
+
+    def get_total_expenses(self, grupo):
+        return self._totals(grupo)['total']
+
+    def get_totales_por_moneda(self, grupo):
+        return self._totals(grupo)['totales_por_moneda']
 
 
 class GrupoMembershipSerializer(serializers.ModelSerializer):
@@ -190,7 +300,10 @@ class GrupoInvitationSerializer(serializers.ModelSerializer):
         read_only_fields = ('invitation_token', 'created_at', 'responded_at')
 
 
-class ExpenseSplitSerializer(serializers.ModelSerializer):
+class ExpenseSplitSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    # expense_info renders Gasto.__str__, which reads expense.grupo.name
+    select_related_fields = ('user', 'expense__grupo')
+
     user_info = UserSerializer(source='user', read_only=True)
     expense_info = serializers.StringRelatedField(source='expense', read_only=True)
     remaining_amount = serializers.ReadOnlyField(source='get_remaining_amount')
@@ -202,7 +315,9 @@ class ExpenseSplitSerializer(serializers.ModelSerializer):
         read_only_fields = ('created_at', 'updated_at')
 
 
-class MedioPagoSerializer(serializers.ModelSerializer):
+class MedioPagoSerializer(EagerLoadingMixin, serializers.ModelSerializer):
+    select_related_fields = ('grupo',)
+
     grupo_name = serializers.CharField(source='grupo.name', read_only=True)
     
     class Meta:
@@ -210,15 +325,68 @@ class MedioPagoSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class GastoSerializer(serializers.ModelSerializer):
+class GastoDetailSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related_fields = (
+        'grupo',
+        'paid_by',
+        'medio_pago',
+        *(f'medio_pago__{field}' for field in MedioPagoSerializer.select_related_fields),
+    )
+    # Splits reach their expense through the prefetch cache, so only the
+    # split user needs joining here.
+    prefetch_related_fields = (
+        Prefetch('expense_splits', queryset=ExpenseSplit.objects.select_related('user')),
+    )
+    field_requirements = {
+        'grupo_name': {'only': ('grupo', 'grupo__name'), 'select_related': ('grupo',)},
+        'paid_by_username': {'only': ('paid_by', 'paid_by__username'), 'select_related': ('paid_by',)},
+        'medio_pago_info': {
+            'only': ('medio_pago',),
+            'select_related': ('medio_pago', *(f'medio_pago__{field}' for field in MedioPagoSerializer.select_related_fields)),
+        },
+        'total_amount': {'only': ('monto_total',)},
+        'remaining_amount': {'only': ('monto_pendiente',)},
+        # get_splits checks is_shared; expense_info renders Gasto.__str__
+        'splits': {
+            'only': ('is_shared', 'categoria', 'monto', 'moneda', 'grupo', 'grupo__name'),
+            'select_related': ('grupo',),
+            'prefetch_related': prefetch_related_fields,
+        },
+    }
+
     grupo_name = serializers.CharField(source='grupo.name', read_only=True)
     medio_pago_info = MedioPagoSerializer(source='medio_pago', read_only=True)
     paid_by_username = serializers.CharField(source='paid_by.username', read_only=True)
-    total_amount = serializers.ReadOnlyField(source='get_total_amount')
-    remaining_amount = serializers.ReadOnlyField(source='get_remaining_amount')
+    total_amount = serializers.ReadOnlyField(source='monto_total')
+    remaining_amount = serializers.ReadOnlyField(source='monto_pendiente')
     splits = ExpenseSplitSerializer(source='get_splits', many=True, read_only=True)
     
     class Meta:
         model = Gasto
-        fields = '__all__'
+        exclude = ('import_hash',)
         read_only_fields = ('created_at', 'updated_at')
+
+
+class GastoListSerializer(GastoDetailSerializer):
+    """Compact gasto row for list views.
+
+    The nested and computed fields of the detail representation are only
+    rendered when requested with ``?expand=``.
+    """
+    expandable_fields = ('medio_pago_info', 'splits', 'total_amount', 'remaining_amount')
+
+
+class GastoBulkItemSerializer(serializers.ModelSerializer):
+    """Validates one gasto of a bulk write without touching the database.
+
+    Relations are plain ids here; ``api.bulk.apply_gasto_batch`` resolves and
+    checks ownership for every item with a few set-based queries.
+    """
+    id = serializers.IntegerField(required=False)
+    medio_pago = serializers.IntegerField()
+    grupo = serializers.IntegerField(required=False, allow_null=True)
+    paid_by = serializers.IntegerField(required=False, allow_null=True)
+
+    class Meta:
+        model = Gasto
+        exclude = ('user', 'import_hash', 'created_at', 'updated_at')
@@ -0,0 +1,96 @@
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime, timedelta
+
+from django.db.models import Q
+from django.utils import timezone
+from rest_framework.exceptions import ValidationError
+
+from .models import Gasto, GastoTombstone
+
+
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 2000
+# Changes stamped this close to "now" are sent again on the next sync: a
+# transaction that started earlier may still commit rows with older stamps
+CHANGES_OVERLAP = timedelta(seconds=30)
+# Tombstones older than this are purged (purge_gasto_tombstones); cursors
+# older than that can no longer learn about deletions and must resync
+TOMBSTONE_RETENTION = timedelta(days=90)
+
+
+def encode_sync_cursor(positions):
+    """Opaque cursor for ``{'g': (updated_at, id), 't': (deleted_at, id)}``."""
+    data = {stream: [stamp.isoformat(), row_id] for stream, (stamp, row_id) in positions.items()}
+    return urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode()).decode()
+
+
+def decode_sync_cursor(cursor):
+    try:
+        data = json.loads(urlsafe_b64decode(cursor.encode()))
+        positions = {stream: (datetime.fromisoformat(data[stream][0]), int(data[stream][1])) for stream in ('g', 't')}
+    except (ValueError, KeyError, TypeError, IndexError):
+        raise ValidationError({'since': 'Cursor inválido.'})
+    # encode_sync_cursor only writes aware stamps; a naive one was edited by hand
+    if any(timezone.is_naive(stamp) for stamp, _ in positions.values()):
+        raise ValidationError({'since': 'Cursor inválido.'})
+    return positions
+
+
+def _after(queryset, stamp_field, position):
+    stamp, row_id = position
+    return queryset.filter(Q(**{f'{stamp_field}__gt': stamp}) | Q(**{stamp_field: stamp, 'id__gt': row_id}))
+
+
+def _page(queryset, stamp_field, position, limit, horizon):
+    """Next ``limit`` rows after ``position`` and the position to resume from."""
+    if position is not None:
+        queryset = _after(queryset, stamp_field, position)
+    rows = list(queryset.order_by(stamp_field, 'id')[:limit + 1])
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    if has_more:
+        last = rows[-1]
+        return rows, (getattr(last, stamp_field), last.id), True
+    # Caught up: resume at the start of the overlap window, never behind the cursor
+    resume = (horizon, 0)
+    if position is not None and position > resume:
+        resume = position
+    return rows, resume, False
+
+
+def gasto_changes(user, since=None, limit=CHANGES_PAGE_SIZE, queryset=None):
+    """Gastos created or updated and ids of gastos deleted after the ``since`` cursor.
+
+    Returns a dict with ``upserts`` (Gasto instances from ``queryset``,
+    ordered by ``updated_at``), ``deleted`` (ids), the ``cursor`` to send on
+    the next call, ``has_more`` when a page was cut at ``limit`` and ``reset``
+    when ``since`` is older than the tombstone retention, in which case the
+    client must drop its copy and sync from scratch. Both streams are keyset
+    scans on ``(user, updated_at)`` / ``(user, deleted_at)`` indexes.
+    """
+    now = timezone.now()
+    positions = decode_sync_cursor(since) if since else {'g': None, 't': None}
+    if since and positions['t'][0] < now - TOMBSTONE_RETENTION:
+        return {'upserts': [], 'deleted': [], 'cursor': None, 'has_more': False, 'reset': True}
+
+    horizon = now - CHANGES_OVERLAP
+    if queryset is None:
+        queryset = Gasto.objects.all()
+    upserts, gasto_position, more_gastos = _page(
+        queryset.filter(user=user), 'updated_at', positions['g'], limit, horizon
+    )
+    if since:
+        tombstones, tombstone_position, more_tombstones = _page(
+            GastoTombstone.objects.filter(user=user), 'deleted_at', positions['t'], limit, horizon
+        )
+    else:
+        # A full sync has nothing to delete on the client
+        tombstones, tombstone_position, more_tombstones = [], (horizon, 0), False
+    return {
+        'upserts': upserts,
+        'deleted': [tombstone.gasto_id for tombstone in tombstones],
+        'cursor': encode_sync_cursor({'g': gasto_position, 't': tombstone_position}),
+        'has_more': more_gastos or more_tombstones,
+        'reset': False,
+    }
@@ -1,11 +1,42 @@
 from django.urls import reverse
 from rest_framework.test import APITestCase
+from django.contrib import admin
 from django.contrib.auth.models import User
-from django.test import override_settings
+from django.http import HttpResponse
+from django.test import RequestFactory, override_settings
+from django.core.files.uploadedfile import SimpleUploadedFile
 from django.utils import timezone
 from datetime import timedelta
 from django.core.management import call_command
-from .models import LoginAttempt
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import F
+from django.test.utils import CaptureQueriesContext
+from datetime import date, datetime, time as dt_time
+from io import StringIO
+import os
+import shutil
+import tempfile
+from unittest import mock, skipUnless
+import csv
+import json
+import asyncio
+import threading
+import time
+import httpx
+import requests
+from asgiref.sync import async_to_sync
+from rest_framework_simplejwt.tokens import AccessToken
+from .admin import GastoAdmin, GrupoAdmin, GrupoMembershipAdmin
+from .models import LoginAttempt, Gasto, MedioPago, Grupo, GrupoMembership, GrupoCurrencyTotal, ExpenseSplit, GastoMonthlyRollup, GastoTombstone, VendorCategoryCount, ExchangeRateSnapshot
+from .rates import COTIZACIONES, DOLARES, aget_quotes, fetch_quotes, get_quotes, get_rates
+from .outbound import AsyncOutboundClient, CircuitBreaker, CircuitOpen, OutboundClient, async_dolarapi, dolarapi
+from .middleware import AsyncWhiteNoiseMiddleware
+from .fake_dolarapi import FakeDolarapi
+from .rate_history import RateHistory
+from .balances import grupo_balances, settle
+from .permissions import load_grupo_permissions
+from .sync import encode_sync_cursor
 
 
 class AuthEmailOrUsernameTests(APITestCase):
@@ -165,3 +196,1645 @@ class PurgeLoginAttemptsCommandTests(APITestCase):
 		self.assertEqual(LoginAttempt.objects.count(), 2)
 		call_command('purge_login_attempts')
 		self.assertEqual(LoginAttempt.objects.count(), 1)
+
+
+class GastoEagerLoadingTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='eager', password='EagerPass123', email='eager@example.com')
+		self.partner = User.objects.create_user(username='partner', password='PartnerPass123', email='partner@example.com')
+		self.grupo = Grupo.objects.create(name='Viaje', owner=self.user)
+		self.medio_pago = MedioPago.objects.create(user=self.user, grupo=self.grupo, ente_emisor='Banco', tipo='credito')
+		self.client.force_authenticate(user=self.user)
+
+	def _create_gastos(self, count):
+		for i in range(count):
+			gasto = Gasto.objects.create(
+				user=self.user, grupo=self.grupo, titulo=f'Gasto {i}', monto=100, pagos_realizados=0,
+				pagos_totales=3, medio_pago=self.medio_pago, vendedor='Super', fecha_gasto=date(2025, 1, 1),
+				is_shared=True, paid_by=self.user,
+			)
+			ExpenseSplit.objects.create(expense=gasto, user=self.user, amount=50)
+			ExpenseSplit.objects.create(expense=gasto, user=self.partner, amount=50)
+		return gasto
+
+	def _count_queries(self, url, params=None):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(url, params)
+		self.assertEqual(resp.status_code, 200)
+		return len(ctx.captured_queries)
+
+	def test_list_query_count_does_not_grow_with_rows(self):
+		url = reverse('gastos_list_create')
+		expanded = {'expand': 'medio_pago_info,splits,total_amount,remaining_amount'}
+		self._create_gastos(1)
+		baseline = self._count_queries(url)
+		expanded_baseline = self._count_queries(url, expanded)
+		self._create_gastos(20)
+		self.assertEqual(self._count_queries(url), baseline)
+		self.assertEqual(self._count_queries(url, expanded), expanded_baseline)
+		# The ETag aggregate plus one joined query for compact rows; expanding
+		# splits adds their prefetch
+		self.assertEqual(baseline, 2)
+		self.assertEqual(expanded_baseline, 3)
+
+	def test_detail_renders_nested_data_in_constant_queries(self):
+		gasto = self._create_gastos(1)
+		url = reverse('gastos_detail', kwargs={'id': gasto.id})
+		with self.assertNumQueries(2):
+			resp = self.client.get(url)
+		self.assertEqual(resp.data['medio_pago_info']['grupo_name'], 'Viaje')
+		usernames = {split['user_info']['username'] for split in resp.data['splits']}
+		self.assertEqual(usernames, {'eager', 'partner'})
+
+
+class GastoCursorPaginationTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='pager', password='PagerPass123', email='pager@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		# Several gastos share a fecha_gasto so the tie-breakers are exercised
+		for i in range(7):
+			Gasto.objects.create(
+				user=self.user, titulo=f'Gasto {i}', monto=10 + i, pagos_realizados=1, pagos_totales=1,
+				medio_pago=self.medio_pago, vendedor='Kiosco', fecha_gasto=date(2025, 3, 1 + i // 3),
+			)
+		self.url = reverse('gastos_list_create')
+		self.client.force_authenticate(user=self.user)
+
+	def _expected_ids(self):
+		return list(Gasto.objects.filter(user=self.user).values_list('id', flat=True))
+
+	def test_walks_all_pages_in_model_order(self):
+		ids = []
+		resp = self.client.get(self.url, {'page_size': 3})
+		self.assertIsNone(resp.data['previous'])
+		while True:
+			ids.extend(g['id'] for g in resp.data['results'])
+			if resp.data['next'] is None:
+				break
+			resp = self.client.get(resp.data['next'])
+		self.assertEqual(ids, self._expected_ids())
+
+	def test_previous_link_returns_prior_page(self):
+		first = self.client.get(self.url, {'page_size': 3})
+		second = self.client.get(first.data['next'])
+		back = self.client.get(second.data['previous'])
+		self.assertEqual([g['id'] for g in back.data['results']], [g['id'] for g in first.data['results']])
+		self.assertIsNone(back.data['previous'])
+
+	def test_unpaginated_opt_in_returns_plain_list(self):
+		resp = self.client.get(self.url, {'paginate': 'false'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([g['id'] for g in resp.data], self._expected_ids())
+
+	def test_invalid_cursor_is_not_found(self):
+		resp = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+		self.assertEqual(resp.status_code, 404)
+
+
+class GastoFilterTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='filtros', password='FiltrosPass123', email='filtros@example.com')
+		self.grupo = Grupo.objects.create(name='Casa', owner=self.user)
+		self.debito = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.credito = MedioPago.objects.create(user=self.user, ente_emisor='Tarjeta', tipo='credito')
+		self.almuerzo = self._gasto('Almuerzo', 1500, 'comida', 'ARS', date(2025, 1, 10), self.debito)
+		self.taxi = self._gasto('Taxi', 30, 'transporte', 'USD', date(2025, 2, 5), self.credito)
+		self.cena = self._gasto('Cena', 9000, 'comida', 'ARS', date(2025, 3, 1), self.credito, grupo=self.grupo, is_shared=True)
+		self.url = reverse('gastos_list_create')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, titulo, monto, categoria, moneda, fecha, medio_pago, **extra):
+		return Gasto.objects.create(
+			user=self.user, titulo=titulo, monto=monto, categoria=categoria, moneda=moneda, fecha_gasto=fecha,
+			medio_pago=medio_pago, pagos_realizados=1, pagos_totales=1, vendedor='Local', **extra,
+		)
+
+	def _ids(self, **params):
+		resp = self.client.get(self.url, {'paginate': 'false', **params})
+		self.assertEqual(resp.status_code, 200, resp.data)
+		return [g['id'] for g in resp.data]
+
+	def test_filters(self):
+		self.assertEqual(self._ids(fecha_desde='2025-02-01', fecha_hasta='2025-02-28'), [self.taxi.id])
+		self.assertEqual(self._ids(categoria='comida'), [self.cena.id, self.almuerzo.id])
+		self.assertEqual(self._ids(categoria='comida,transporte', moneda='USD'), [self.taxi.id])
+		self.assertEqual(self._ids(grupo=self.grupo.id), [self.cena.id])
+		self.assertEqual(self._ids(medio_pago=self.debito.id), [self.almuerzo.id])
+		self.assertEqual(self._ids(is_shared='false'), [self.taxi.id, self.almuerzo.id])
+		self.assertEqual(self._ids(monto_min='100', monto_max='2000'), [self.almuerzo.id])
+
+	def test_ordering_drives_pagination(self):
+		first = self.client.get(self.url, {'ordering': '-monto', 'page_size': 2})
+		self.assertEqual([g['id'] for g in first.data['results']], [self.cena.id, self.almuerzo.id])
+		second = self.client.get(first.data['next'])
+		self.assertEqual([g['id'] for g in second.data['results']], [self.taxi.id])
+
+	def test_invalid_params_are_rejected(self):
+		resp = self.client.get(self.url, {'categoria': 'viajes', 'fecha_desde': '01/02/2025', 'ordering': 'vendedor'})
+		self.assertEqual(resp.status_code, 400)
+		self.assertIn('categoria', resp.data)
+		self.assertIn('fecha_desde', resp.data)
+		resp = self.client.get(self.url, {'ordering': 'vendedor'})
+		self.assertEqual(resp.status_code, 400)
+		self.assertIn('ordering', resp.data)
+		for value in ('nan', 'inf', '-Infinity'):
+			resp = self.client.get(self.url, {'monto_min': value, 'monto_max': value})
+			self.assertEqual(resp.status_code, 400)
+			self.assertEqual(set(resp.data), {'monto_min', 'monto_max'})
+
+	@skipUnless(connection.vendor == 'postgresql', 'Index usage is checked against the PostgreSQL planner')
+	def test_benchmark_reports_composite_indexes(self):
+		out = StringIO()
+		call_command('benchmark_gasto_filters', rows=2000, repeat=1, stdout=out)
+		expected = {
+			'date range': 'gasto_user_keyset_idx',
+			'categoria': 'gasto_user_categoria_idx',
+			'moneda': 'gasto_user_moneda_idx',
+			'medio_pago': 'gasto_user_medio_pago_idx',
+			'is_shared': 'gasto_user_is_shared_idx',
+			'order by monto': 'gasto_user_monto_idx',
+			'pendiente': 'gasto_user_pending_idx',
+		}
+		lines = out.getvalue().splitlines()
+		for label, index in expected.items():
+			line = next(line for line in lines if line.startswith(label))
+			self.assertIn(index, line)
+
+
+class GastoSparseFieldsetTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='sparse', password='SparsePass123', email='sparse@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='credito')
+		self.gasto = Gasto.objects.create(
+			user=self.user, titulo='Zapatillas', monto=5000, pagos_realizados=1, pagos_totales=3,
+			medio_pago=self.medio_pago, vendedor='Tienda', fecha_gasto=date(2025, 5, 2),
+		)
+		self.list_url = reverse('gastos_list_create')
+		self.detail_url = reverse('gastos_detail', kwargs={'id': self.gasto.id})
+		self.client.force_authenticate(user=self.user)
+
+	def test_list_is_compact_by_default(self):
+		row = self.client.get(self.list_url).data['results'][0]
+		for heavy in ('medio_pago_info', 'splits', 'total_amount', 'remaining_amount'):
+			self.assertNotIn(heavy, row)
+		self.assertEqual(row['vendedor'], 'Tienda')
+
+	def test_expand_adds_heavy_fields(self):
+		# ETag aggregate + page
+		with self.assertNumQueries(2):
+			row = self.client.get(self.list_url, {'expand': 'medio_pago_info,remaining_amount'}).data['results'][0]
+		self.assertEqual(row['medio_pago_info']['ente_emisor'], 'Banco')
+		self.assertEqual(row['remaining_amount'], 10000)
+		self.assertNotIn('splits', row)
+
+	def test_fields_limits_payload_and_loaded_columns(self):
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.get(self.list_url, {'fields': 'id,monto,total_amount'})
+		self.assertEqual(resp.data['results'], [{'id': self.gasto.id, 'monto': 5000, 'total_amount': 15000}])
+		# ETag aggregate + page
+		self.assertEqual(len(ctx.captured_queries), 2)
+		self.assertNotIn('vendedor', ctx.captured_queries[-1]['sql'])
+
+	def test_detail_keeps_full_representation(self):
+		resp = self.client.get(self.detail_url)
+		self.assertIn('medio_pago_info', resp.data)
+		self.assertIn('splits', resp.data)
+		resp = self.client.get(self.detail_url, {'fields': 'id,titulo'})
+		self.assertEqual(resp.data, {'id': self.gasto.id, 'titulo': 'Zapatillas'})
+
+	def test_partial_update(self):
+		resp = self.client.patch(self.detail_url, {'pagos_realizados': 2}, format='json')
+		self.assertEqual(resp.status_code, 200, resp.data)
+		self.gasto.refresh_from_db()
+		self.assertEqual(self.gasto.pagos_realizados, 2)
+		self.assertEqual(self.gasto.vendedor, 'Tienda')
+
+	def test_create_returns_full_representation(self):
+		resp = self.client.post(self.list_url, {
+			'titulo': 'Cafe', 'monto': 10, 'pagos_realizados': 1, 'pagos_totales': 1,
+			'medio_pago': self.medio_pago.id, 'vendedor': 'Bar', 'fecha_gasto': '2025-05-03',
+		}, format='json')
+		self.assertEqual(resp.status_code, 201, resp.data)
+		self.assertIn('medio_pago_info', resp.data)
+
+
+class GastoPendingAmountTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='cuotas', password='CuotasPass123', email='cuotas@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='credito')
+		self.tele = Gasto.objects.create(
+			user=self.user, titulo='Tele', monto=100.1, pagos_realizados=1, pagos_totales=4,
+			medio_pago=self.medio_pago, vendedor='Tienda', fecha_gasto=date(2025, 3, 1),
+		)
+		self.pasaje = Gasto.objects.create(
+			user=self.user, titulo='Pasaje', monto=50, pagos_realizados=0, pagos_totales=2, moneda='USD',
+			medio_pago=self.medio_pago, vendedor='Aerolinea', fecha_gasto=date(2025, 3, 2),
+		)
+		self.saldado = Gasto.objects.create(
+			user=self.user, titulo='Cafe', monto=5, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Bar', fecha_gasto=date(2025, 3, 3),
+		)
+		self.client.force_authenticate(user=self.user)
+
+	def test_amounts_are_computed_by_the_database(self):
+		self.assertEqual(self.tele.monto_pendiente, 300.3)
+		self.assertEqual(self.tele.monto_total, 400.4)
+		Gasto.objects.filter(id=self.tele.id).update(pagos_realizados=F('pagos_realizados') + 1)
+		self.tele.refresh_from_db()
+		self.assertEqual(self.tele.monto_pendiente, 200.2)
+
+	def test_update_returns_fresh_amounts(self):
+		url = reverse('gastos_detail', kwargs={'id': self.pasaje.id})
+		resp = self.client.patch(url, {'pagos_realizados': 1}, format='json')
+		self.assertEqual(resp.status_code, 200, resp.data)
+		self.assertEqual(resp.data['monto_pendiente'], 50)
+		self.assertEqual(resp.data['remaining_amount'], 50)
+		self.assertEqual(resp.data['total_amount'], 100)
+
+	def test_pending_filter_and_totals(self):
+		resp = self.client.get(reverse('gastos_list_create'), {'pendiente': 'true'})
+		self.assertEqual({row['id'] for row in resp.data['results']}, {self.tele.id, self.pasaje.id})
+		resp = self.client.get(reverse('gastos_list_create'), {'pendiente': 'false'})
+		self.assertEqual([row['id'] for row in resp.data['results']], [self.saldado.id])
+
+		with self.assertNumQueries(1):
+			resp = self.client.get(reverse('gastos_pending'))
+		self.assertEqual(resp.data['totales'], [
+			{'moneda': 'ARS', 'monto_pendiente': 300.3, 'monto_total': 400.4, 'gastos': 1},
+			{'moneda': 'USD', 'monto_pendiente': 100, 'monto_total': 100, 'gastos': 1},
+		])
+		resp = self.client.get(reverse('gastos_pending'), {'moneda': 'USD'})
+		self.assertEqual([row['moneda'] for row in resp.data['totales']], ['USD'])
+
+
+class GastoExportTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='contador', password='ContadorPass123', email='contador@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco, Sucursal 1', tipo='debito')
+		for i, categoria in enumerate(['comida', 'salud', 'comida']):
+			Gasto.objects.create(
+				user=self.user, titulo=f'Gasto {i}', monto=100 * (i + 1), categoria=categoria, pagos_realizados=1,
+				pagos_totales=1, medio_pago=self.medio_pago, vendedor='Local', fecha_gasto=date(2024, 1, 1 + i),
+			)
+		self.url = reverse('gastos_export')
+		self.client.force_authenticate(user=self.user)
+
+	def _content(self, resp):
+		self.assertEqual(resp.status_code, 200)
+		self.assertTrue(resp.streaming)
+		return b''.join(resp.streaming_content).decode('utf-8')
+
+	def test_csv_export_applies_list_filters(self):
+		resp = self.client.get(self.url, {'categoria': 'comida'})
+		self.assertEqual(resp['Content-Type'], 'text/csv; charset=utf-8')
+		rows = list(csv.DictReader(self._content(resp).splitlines()))
+		self.assertEqual([row['titulo'] for row in rows], ['Gasto 2', 'Gasto 0'])
+		self.assertEqual(rows[0]['medio_pago'], 'Banco, Sucursal 1')
+
+	def test_ndjson_export(self):
+		resp = self.client.get(self.url, {'formato': 'ndjson', 'ordering': 'monto'})
+		rows = [json.loads(line) for line in self._content(resp).splitlines()]
+		self.assertEqual([row['monto'] for row in rows], [100, 200, 300])
+		self.assertEqual(rows[0]['fecha_gasto'], '2024-01-01')
+
+	def test_invalid_format(self):
+		resp = self.client.get(self.url, {'formato': 'xlsx'})
+		self.assertEqual(resp.status_code, 400)
+
+	def test_export_command(self):
+		out = StringIO()
+		call_command('export_gastos', 'contador', formato='ndjson', categoria='salud', stdout=out)
+		rows = [json.loads(line) for line in out.getvalue().splitlines()]
+		self.assertEqual([row['titulo'] for row in rows], ['Gasto 1'])
+
+
+class GastoBulkTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='planilla', password='PlanillaPass123', email='planilla@example.com')
+		self.stranger = User.objects.create_user(username='ajeno', password='AjenoPass123', email='ajeno@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.foreign_medio_pago = MedioPago.objects.create(user=self.stranger, ente_emisor='Otro', tipo='debito')
+		self.grupo = Grupo.objects.create(name='Depto', owner=self.user)
+		GrupoMembership.objects.create(grupo=self.grupo, user=self.user, role='owner')
+		self.existing = Gasto.objects.create(
+			user=self.user, titulo='Luz', monto=100, pagos_realizados=0, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Edesur', fecha_gasto=date(2025, 1, 5),
+		)
+		self.doomed = Gasto.objects.create(
+			user=self.user, titulo='Gas', monto=50, pagos_realizados=0, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Metrogas', fecha_gasto=date(2025, 1, 6),
+		)
+		self.url = reverse('gastos_bulk')
+		self.client.force_authenticate(user=self.user)
+
+	def _item(self, **extra):
+		item = {
+			'titulo': 'Fila', 'monto': 10, 'pagos_realizados': 1, 'pagos_totales': 1,
+			'medio_pago': self.medio_pago.id, 'vendedor': 'Planilla', 'fecha_gasto': '2025-02-01',
+		}
+		item.update(extra)
+		return item
+
+	def test_applies_all_operations_with_constant_queries(self):
+		payload = {
+			'create': [self._item(monto=i, grupo=self.grupo.id) for i in range(50)],
+			'update': [{'id': self.existing.id, 'pagos_realizados': 1}],
+			'delete': [self.doomed.id],
+		}
+		with CaptureQueriesContext(connection) as ctx:
+			resp = self.client.post(self.url, payload, format='json')
+		self.assertEqual(resp.status_code, 200, resp.data)
+		# Constant in the number of items; includes the rollup and grupo counter upkeep
+		self.assertLess(len(ctx.captured_queries), 25)
+		self.assertEqual(len(resp.data['created']), 50)
+		self.assertEqual(resp.data['updated'], [{'index': 0, 'id': self.existing.id}])
+		self.assertEqual(Gasto.objects.filter(user=self.user, grupo=self.grupo).count(), 50)
+		self.existing.refresh_from_db()
+		self.assertEqual(self.existing.pagos_realizados, 1)
+		self.assertFalse(Gasto.objects.filter(id=self.doomed.id).exists())
+
+	def test_invalid_items_reject_the_whole_batch(self):
+		foreign = Gasto.objects.create(
+			user=self.stranger, titulo='Ajeno', monto=1, pagos_realizados=0, pagos_totales=1,
+			medio_pago=self.foreign_medio_pago, vendedor='X', fecha_gasto=date(2025, 1, 1),
+		)
+		payload = {
+			'create': [self._item(), self._item(medio_pago=self.foreign_medio_pago.id)],
+			'update': [{'id': foreign.id, 'monto': 1}],
+			'delete': [self.doomed.id],
+		}
+		resp = self.client.post(self.url, payload, format='json')
+		self.assertEqual(resp.status_code, 400)
+		self.assertEqual(resp.data['create'][0], {})
+		self.assertIn('medio_pago', resp.data['create'][1])
+		self.assertIn('id', resp.data['update'][0])
+		self.assertNotIn('delete', resp.data)
+		self.assertEqual(Gasto.objects.filter(user=self.user).count(), 2)
+
+	def test_field_errors_are_reported_per_item(self):
+		resp = self.client.post(self.url, {'create': [self._item(), self._item(categoria='viajes')]}, format='json')
+		self.assertEqual(resp.status_code, 400)
+		self.assertEqual(resp.data['create'][0], {})
+		self.assertIn('categoria', resp.data['create'][1])
+
+
+class GastoStatementImportTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='resumen', password='ResumenPass123', email='resumen@example.com')
+		self.visa = MedioPago.objects.create(user=self.user, ente_emisor='Visa', tipo='credito', extra='Oro')
+		self.master = MedioPago.objects.create(user=self.user, ente_emisor='Master', tipo='credito')
+		self.url = reverse('gastos_import')
+		self.client.force_authenticate(user=self.user)
+
+	def _upload(self, content, **data):
+		data['file'] = SimpleUploadedFile('resumen.csv', content.encode('utf-8'), content_type='text/csv')
+		return self.client.post(self.url, data, format='multipart')
+
+	def test_reimport_skips_rows_but_keeps_same_day_repeats(self):
+		content = (
+			'Fecha;Descripción;Importe\n'
+			'05/01/2025;Cafe Martinez;1.500,00\n'
+			'05/01/2025;Cafe Martinez;1.500,00\n'
+			'06/01/2025;Supermercado;23.100,50\n'
+		)
+		resp = self._upload(content, medio_pago=self.visa.id)
+		self.assertEqual(resp.status_code, 200, resp.data)
+		self.assertEqual((resp.data['created'], resp.data['duplicates']), (3, 0))
+		self.assertEqual(Gasto.objects.filter(user=self.user, vendedor='Cafe Martinez', monto=1500).count(), 2)
+
+		resp = self._upload(content, medio_pago=self.visa.id)
+		self.assertEqual((resp.data['created'], resp.data['duplicates']), (0, 3))
+		self.assertEqual(Gasto.objects.filter(user=self.user).count(), 3)
+		# Skipped rows are not counted again in the monthly rollup
+		rollup = GastoMonthlyRollup.objects.get(user=self.user)
+		self.assertEqual((rollup.count, rollup.total), (3, 26100.5))
+
+	def test_resolves_medio_pago_columns_and_reports_bad_rows(self):
+		content = (
+			'fecha,vendedor,monto,moneda,emisor,tarjeta\n'
+			'2025-02-01,Libreria,100,ARS,Visa,Oro\n'
+			'2025-02-02,Farmacia,200,USD,master,\n'
+			'2025-02-30,Kiosco,10,ARS,Visa,Oro\n'
+			'2025-02-03,Taxi,-5,ARS,Amex,\n'
+		)
+		resp = self._upload(content)
+		self.assertEqual(resp.status_code, 200, resp.data)
+		self.assertEqual((resp.data['rows'], resp.data['created'], resp.data['error_count']), (4, 2, 2))
+		self.assertEqual(Gasto.objects.get(vendedor='Libreria').medio_pago, self.visa)
+		self.assertEqual(Gasto.objects.get(vendedor='Farmacia').moneda, 'USD')
+		self.assertEqual(resp.data['errors'][0], {'line': 4, 'errors': {'fecha_gasto': 'Fecha inválida.'}})
+		self.assertEqual(set(resp.data['errors'][1]['errors']), {'monto', 'medio_pago'})
+
+	def test_missing_columns_or_foreign_medio_pago_are_rejected(self):
+		resp = self._upload('fecha,monto\n2025-01-01,10\n', medio_pago=self.visa.id)
+		self.assertEqual(resp.status_code, 400)
+		self.assertIn('vendedor', resp.data['error'])
+		stranger = User.objects.create_user(username='otro', password='OtroPass123', email='otro@example.com')
+		foreign = MedioPago.objects.create(user=stranger, ente_emisor='Visa', tipo='credito')
+		resp = self._upload('fecha,vendedor,monto\n2025-01-01,X,10\n', medio_pago=foreign.id)
+		self.assertEqual(resp.status_code, 400)
+		for mapping in ('{"monto": 1}', '{"precio": "Importe"}'):
+			resp = self._upload('fecha,vendedor,monto\n2025-01-01,X,10\n', medio_pago=self.visa.id, mapping=mapping)
+			self.assertEqual(resp.status_code, 400)
+		self.assertFalse(Gasto.objects.exists())
+
+	def test_command_imports_in_chunks(self):
+		fd, path = tempfile.mkstemp(suffix='.csv')
+		self.addCleanup(os.remove, path)
+		with os.fdopen(fd, 'w', encoding='utf-8', newline='') as statement:
+			writer = csv.writer(statement)
+			writer.writerow(['Fecha', 'Comercio', 'Importe'])
+			for day in range(1, 26):
+				writer.writerow([f'{day:02d}/03/2025', f'Comercio {day}', f'{day}.50'])
+		out = StringIO()
+		call_command('import_statement', 'resumen', path, '--medio-pago', str(self.master.id), '--chunk-size', '10', stdout=out)
+		self.assertIn('Imported 25 gastos from 25 rows', out.getvalue())
+		self.assertEqual(Gasto.objects.filter(user=self.user, medio_pago=self.master).count(), 25)
+		self.assertEqual(Gasto.objects.get(vendedor='Comercio 7').fecha_gasto, date(2025, 3, 7))
+
+
+class GastoRollupTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='resumido', password='ResumidoPass123', email='resumido@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='credito')
+		self.grupo = Grupo.objects.create(name='Casa', owner=self.user)
+		GrupoMembership.objects.create(grupo=self.grupo, user=self.user, role='owner')
+		self.url = reverse('gastos_summary')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, **extra):
+		data = {
+			'titulo': 'Super', 'monto': 100, 'pagos_realizados': 1, 'pagos_totales': 1,
+			'medio_pago': self.medio_pago.id, 'vendedor': 'Coto', 'fecha_gasto': '2025-04-10', 'categoria': 'comida',
+		}
+		data.update(extra)
+		return data
+
+	def _summary(self, **params):
+		resp = self.client.get(self.url, params)
+		self.assertEqual(resp.status_code, 200, resp.data)
+		return {(row['month'], row['categoria'], row['moneda']): (row['total'], row['count']) for row in resp.data['summary']}
+
+	def _verify(self):
+		out = StringIO()
+		call_command('rebuild_gasto_rollups', verify=True, stdout=out)
+		return out.getvalue()
+
+	def test_single_writes_update_the_rollup(self):
+		list_url = reverse('gastos_list_create')
+		first = self.client.post(list_url, self._gasto(), format='json').data['id']
+		self.client.post(list_url, self._gasto(monto=50.5), format='json')
+		self.client.post(list_url, self._gasto(fecha_gasto='2025-05-01', moneda='USD'), format='json')
+		self.assertEqual(self._summary(), {
+			('2025-04', 'comida', 'ARS'): (150.5, 2),
+			('2025-05', 'comida', 'USD'): (100, 1),
+		})
+
+		detail_url = reverse('gastos_detail', kwargs={'id': first})
+		self.client.patch(detail_url, {'categoria': 'salud', 'monto': 80}, format='json')
+		self.client.patch(detail_url, {'comentarios': 'sin cambios de resumen'}, format='json')
+		self.assertEqual(self._summary(desde='2025-04', hasta='2025-04'), {
+			('2025-04', 'comida', 'ARS'): (50.5, 1),
+			('2025-04', 'salud', 'ARS'): (80, 1),
+		})
+
+		self.client.delete(detail_url)
+		self.assertNotIn(('2025-04', 'salud', 'ARS'), self._summary())
+		self.assertFalse(GastoMonthlyRollup.objects.filter(categoria='salud').exists())
+		self.assertIn('0 missing, 0 wrong, 0 extra', self._verify())
+
+	def test_admin_bulk_delete_updates_the_rollup(self):
+		list_url = reverse('gastos_list_create')
+		self.client.post(list_url, self._gasto(grupo=self.grupo.id), format='json')
+		self.client.post(list_url, self._gasto(monto=5), format='json')
+		GastoAdmin(Gasto, admin.site).delete_queryset(None, Gasto.objects.filter(user=self.user))
+		self.assertEqual(self._summary(), {})
+		self.assertEqual(GastoTombstone.objects.filter(user=self.user).count(), 2)
+		self.grupo.refresh_from_db()
+		self.assertEqual(self.grupo.expense_count, 0)
+		self.assertIn('0 missing, 0 wrong, 0 extra', self._verify())
+
+	def test_summary_reads_only_the_rollup(self):
+		self.client.post(reverse('gastos_list_create'), self._gasto(grupo=self.grupo.id), format='json')
+		self.client.post(reverse('gastos_list_create'), self._gasto(), format='json')
+		with CaptureQueriesContext(connection) as ctx:
+			summary = self._summary(grupo=str(self.grupo.id))
+		self.assertEqual(summary, {('2025-04', 'comida', 'ARS'): (100, 1)})
+		self.assertNotIn('"api_gasto"', ' '.join(query['sql'] for query in ctx.captured_queries))
+		self.assertEqual(self._summary()[('2025-04', 'comida', 'ARS')], (200, 2))
+		self.assertEqual(self.client.get(self.url, {'desde': 'abril'}).status_code, 400)
+
+	def test_bulk_import_and_cascade_paths_keep_the_rollup_exact(self):
+		gasto = Gasto.objects.create(
+			user=self.user, titulo='Luz', monto=30, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Edesur', fecha_gasto=date(2025, 4, 2), categoria='otros',
+		)
+		doomed = Gasto.objects.create(
+			user=self.user, titulo='Gas', monto=20, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Metrogas', fecha_gasto=date(2025, 4, 3), categoria='otros',
+		)
+		payload = {
+			'create': [self._gasto(), self._gasto(grupo=self.grupo.id, monto=10)],
+			'update': [{'id': gasto.id, 'fecha_gasto': '2025-03-31'}],
+			'delete': [doomed.id],
+		}
+		self.assertEqual(self.client.post(reverse('gastos_bulk'), payload, format='json').status_code, 200)
+		self.assertEqual(self._summary(), {
+			('2025-04', 'comida', 'ARS'): (110, 2),
+			('2025-03', 'otros', 'ARS'): (30, 1),
+		})
+
+		upload = SimpleUploadedFile('resumen.csv', b'fecha,vendedor,monto\n2025-04-20,Coto,40\n', content_type='text/csv')
+		self.client.post(reverse('gastos_import'), {'file': upload, 'medio_pago': self.medio_pago.id}, format='multipart')
+		self.assertEqual(self._summary()[('2025-04', 'otros', 'ARS')], (40, 1))
+
+		other = MedioPago.objects.create(user=self.user, ente_emisor='Otro', tipo='debito')
+		self.client.post(reverse('gastos_list_create'), self._gasto(medio_pago=other.id, monto=5), format='json')
+		other.delete()
+		self.assertEqual(self._summary()[('2025-04', 'comida', 'ARS')], (110, 2))
+		self.assertIn('0 missing, 0 wrong, 0 extra', self._verify())
+
+	def test_rebuild_command_repairs_drift(self):
+		for categoria in ('comida', 'salud', 'otros'):
+			self.client.post(reverse('gastos_list_create'), self._gasto(categoria=categoria), format='json')
+		GastoMonthlyRollup.objects.filter(categoria='comida').update(total=1, count=7)
+		GastoMonthlyRollup.objects.filter(categoria='salud').delete()
+		GastoMonthlyRollup.objects.create(user=self.user, month=date(2020, 1, 1), categoria='otros', moneda='USD', total=9, count=1)
+
+		self.assertIn('1 missing, 1 wrong, 1 extra', self._verify())
+		out = StringIO()
+		call_command('rebuild_gasto_rollups', user='resumido', batch_size=1, stdout=out)
+		self.assertIn('(repaired)', out.getvalue())
+		self.assertEqual(self._summary(), {
+			('2025-04', 'comida', 'ARS'): (100, 1),
+			('2025-04', 'otros', 'ARS'): (100, 1),
+			('2025-04', 'salud', 'ARS'): (100, 1),
+		})
+		self.assertIn('0 missing, 0 wrong, 0 extra', self._verify())
+
+
+@mock.patch('api.projections.timezone.localdate', return_value=date(2025, 6, 15))
+class GastoProjectionTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='cuotista', password='CuotistaPass123', email='cuotista@example.com')
+		self.visa = MedioPago.objects.create(user=self.user, ente_emisor='Visa', tipo='credito')
+		self.master = MedioPago.objects.create(user=self.user, ente_emisor='Master', tipo='credito')
+		self.heladera = Gasto.objects.create(
+			user=self.user, titulo='Heladera', monto=100, pagos_realizados=1, pagos_totales=6,
+			medio_pago=self.visa, vendedor='Fravega', fecha_gasto=date(2025, 4, 10),
+		)
+		Gasto.objects.create(
+			user=self.user, titulo='Curso', monto=10, pagos_realizados=0, pagos_totales=24,
+			medio_pago=self.visa, vendedor='Academia', fecha_gasto=date(2025, 7, 20),
+		)
+		Gasto.objects.create(
+			user=self.user, titulo='Pasaje', monto=30, pagos_realizados=0, pagos_totales=3, moneda='USD',
+			medio_pago=self.master, vendedor='Aerolinea', fecha_gasto=date(2025, 6, 1),
+		)
+		Gasto.objects.create(
+			user=self.user, titulo='Saldado', monto=999, pagos_realizados=2, pagos_totales=2,
+			medio_pago=self.visa, vendedor='Tienda', fecha_gasto=date(2025, 5, 1),
+		)
+		self.url = reverse('gastos_projection')
+		self.client.force_authenticate(user=self.user)
+		cache.clear()
+
+	def test_schedule_per_medio_pago_and_moneda(self, localdate):
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.status_code, 200, resp.data)
+		self.assertEqual(resp.data['months'][0], '2025-06')
+		self.assertEqual(resp.data['months'][-1], '2026-05')
+		visa, master = resp.data['series']
+		# Installment 2 was due in May and is still unpaid: it lands in June
+		self.assertEqual(visa['cuotas'], [200, 110, 110, 110] + [10] * 8)
+		self.assertEqual((visa['medio_pago'], visa['moneda'], visa['total']), (self.visa.id, 'ARS', 610))
+		self.assertEqual(master['cuotas'], [30, 30, 30] + [0] * 9)
+		self.assertEqual([row['moneda'] for row in resp.data['totales']], ['ARS', 'USD'])
+
+		resp = self.client.get(self.url, {'meses': 2})
+		self.assertEqual(resp.data['series'][0]['cuotas'], [200, 110])
+		self.assertEqual(self.client.get(self.url, {'meses': 0}).status_code, 400)
+
+	def test_cached_until_a_gasto_changes(self, localdate):
+		self.client.get(self.url)
+		with self.assertNumQueries(0):
+			cached = self.client.get(self.url)
+		self.assertEqual(cached.data['totales'][0]['total'], 610)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.patch(reverse('gastos_detail', kwargs={'id': self.heladera.id}), {'pagos_realizados': 6}, format='json')
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.data['totales'][0]['total'], 110)
+
+
+class ConditionalListTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='etag', password='EtagPass123', email='etag@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='credito')
+		self.gasto = Gasto.objects.create(
+			user=self.user, titulo='Cine', monto=20, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Cinemark', fecha_gasto=date(2025, 6, 1),
+		)
+		self.grupo = Grupo.objects.create(name='Amigos', owner=self.user)
+		GrupoMembership.objects.create(grupo=self.grupo, user=self.user, role='owner')
+		self.client.force_authenticate(user=self.user)
+		cache.clear()
+
+	def _revalidate(self, url, etag, **params):
+		return self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+
+	def test_unchanged_lists_answer_304_without_serializing(self):
+		for name in ('gastos_list_create', 'medios_pago_list_create', 'grupos_list_create'):
+			url = reverse(name)
+			first = self.client.get(url)
+			self.assertEqual(first.status_code, 200)
+			self.assertEqual(first['Cache-Control'], 'private, no-cache')
+			self.assertIn('Last-Modified', first)
+			# Only the validator aggregate runs
+			with self.assertNumQueries(1):
+				resp = self._revalidate(url, first['ETag'])
+			self.assertEqual(resp.status_code, 304, name)
+			self.assertEqual(resp['ETag'], first['ETag'])
+			resp = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+			self.assertEqual(resp.status_code, 304, name)
+
+	def test_query_string_and_writes_change_the_etag(self):
+		url = reverse('gastos_list_create')
+		etag = self.client.get(url)['ETag']
+		self.assertEqual(self._revalidate(url, etag, categoria='comida').status_code, 200)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.patch(reverse('gastos_detail', kwargs={'id': self.gasto.id}), {'comentarios': 'con pochoclos'}, format='json')
+		resp = self._revalidate(url, etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.data['results'][0]['comentarios'], 'con pochoclos')
+
+		# Deletes do not move max(updated_at) but change the count
+		etag = resp['ETag']
+		Gasto.objects.filter(id=self.gasto.id).delete()
+		self.assertEqual(self._revalidate(url, etag).status_code, 200)
+
+	def test_grupo_list_follows_members_and_gastos(self):
+		url = reverse('grupos_list_create')
+		etag = self.client.get(url)['ETag']
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self._revalidate(url, etag).status_code, 304)
+		# Memberships are aggregated apart and gastos through their counters
+		self.assertNotIn('JOIN', queries[0]['sql'])
+		self.assertNotIn('"api_gasto"', queries[0]['sql'])
+		partner = User.objects.create_user(username='amiga', password='AmigaPass123', email='amiga@example.com')
+		with self.captureOnCommitCallbacks(execute=True):
+			GrupoMembership.objects.create(grupo=self.grupo, user=partner)
+		resp = self._revalidate(url, etag)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.data[0]['member_count'], 2)
+
+		etag = resp['ETag']
+		Gasto.objects.create(
+			user=partner, grupo=self.grupo, titulo='Pizza', monto=30, pagos_realizados=1, pagos_totales=1,
+			medio_pago=MedioPago.objects.create(user=partner, ente_emisor='Otro', tipo='debito'),
+			vendedor='Guerrin', fecha_gasto=date(2025, 6, 2),
+		)
+		resp = self._revalidate(url, etag)
+		self.assertEqual(resp.status_code, 200)
+
+		# Edits only count when they change what the list renders
+		gasto = Gasto.objects.get(grupo=self.grupo)
+		gasto.monto = 45
+		gasto.save()
+		self.assertEqual(self._revalidate(url, resp['ETag']).status_code, 200)
+
+
+class GastoDeltaSyncTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='sync', password='SyncPass123', email='sync@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.gastos = [
+			Gasto.objects.create(
+				user=self.user, titulo=f'Gasto {i}', monto=10 + i, pagos_realizados=1, pagos_totales=1,
+				medio_pago=self.medio_pago, vendedor='Kiosco', fecha_gasto=date(2025, 7, 1),
+			)
+			for i in range(5)
+		]
+		self.url = reverse('gastos_changes')
+		self.client.force_authenticate(user=self.user)
+
+	def _age(self, seconds):
+		# Move every change out of the overlap window
+		past = timezone.now() - timedelta(seconds=seconds)
+		Gasto.objects.update(updated_at=past)
+		GastoTombstone.objects.update(deleted_at=past)
+
+	def test_full_sync_pages_then_returns_only_changes(self):
+		self._age(120)
+		first = self.client.get(self.url, {'limit': 3}).data
+		self.assertTrue(first['has_more'])
+		second = self.client.get(self.url, {'since': first['cursor'], 'limit': 3}).data
+		self.assertFalse(second['has_more'])
+		ids = [row['id'] for row in first['upserts'] + second['upserts']]
+		self.assertEqual(sorted(ids), sorted(gasto.id for gasto in self.gastos))
+
+		changed, doomed = self.gastos[1], self.gastos[2]
+		self.client.patch(reverse('gastos_detail', kwargs={'id': changed.id}), {'monto': 99}, format='json')
+		self.client.delete(reverse('gastos_detail', kwargs={'id': doomed.id}))
+		self.client.post(reverse('gastos_bulk'), {'delete': [self.gastos[3].id]}, format='json')
+		with self.assertNumQueries(2):
+			delta = self.client.get(self.url, {'since': second['cursor']}).data
+		self.assertEqual([row['id'] for row in delta['upserts']], [changed.id])
+		self.assertEqual(delta['upserts'][0]['monto'], 99)
+		self.assertEqual(delta['deleted'], [doomed.id, self.gastos[3].id])
+
+		self._age(60)
+		delta = self.client.get(self.url, {'since': delta['cursor']}).data
+		# Changes inside the overlap window were sent again; now they are past it
+		self.assertEqual((delta['upserts'], delta['deleted']), ([], []))
+		delta = self.client.get(self.url, {'since': delta['cursor']}).data
+		self.assertEqual((delta['upserts'], delta['deleted']), ([], []))
+
+	def test_cascades_leave_tombstones(self):
+		grupo = Grupo.objects.create(name='Casa', owner=self.user)
+		Gasto.objects.filter(id=self.gastos[0].id).update(grupo=grupo)
+		grupo.delete()
+		self.medio_pago.delete()
+		self.assertEqual(
+			sorted(GastoTombstone.objects.filter(user=self.user).values_list('gasto_id', flat=True)),
+			sorted(gasto.id for gasto in self.gastos),
+		)
+
+	def test_stale_or_invalid_cursors(self):
+		cursor = self.client.get(self.url).data['cursor']
+		with mock.patch('api.sync.timezone.now', return_value=timezone.now() + timedelta(days=91)):
+			resp = self.client.get(self.url, {'since': cursor})
+		self.assertTrue(resp.data['reset'])
+		self.assertEqual(self.client.get(self.url, {'since': 'garbage'}).status_code, 400)
+		self.assertEqual(self.client.get(self.url, {'limit': 'x'}).status_code, 400)
+		naive = encode_sync_cursor({'g': (datetime(2025, 7, 1), 0), 't': (datetime(2025, 7, 1), 0)})
+		self.assertEqual(self.client.get(self.url, {'since': naive}).status_code, 400)
+
+
+class GastoSearchTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='search', password='SearchPass123', email='search@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.url = reverse('gastos_search')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, vendedor, titulo='', comentarios='', user=None):
+		return Gasto.objects.create(
+			user=user or self.user, titulo=titulo, monto=10, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor=vendedor, comentarios=comentarios, fecha_gasto=date(2025, 7, 1),
+		)
+
+	def test_ranked_prefix_search(self):
+		in_vendor = self._gasto('Supermercado Día', titulo='Compras')
+		in_note = self._gasto('Kiosco', titulo='Golosinas', comentarios='al lado del supermercado')
+		self._gasto('Farmacia', titulo='Remedios')
+		other = User.objects.create_user(username='other', password='OtherPass123', email='other@example.com')
+		self._gasto('Supermercado Coto', user=other)
+
+		resp = self.client.get(self.url, {'q': 'super'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual([row['id'] for row in resp.data['results']], [in_vendor.id, in_note.id])
+		self.assertGreater(resp.data['results'][0]['rank'], resp.data['results'][1]['rank'])
+
+		# Every word must match
+		resp = self.client.get(self.url, {'q': 'supermercado golosinas'})
+		self.assertEqual([row['id'] for row in resp.data['results']], [in_note.id])
+
+	def test_index_follows_writes(self):
+		gasto = self._gasto('Panadería')
+		self.client.patch(reverse('gastos_detail', kwargs={'id': gasto.id}), {'vendedor': 'Verdulería'}, format='json')
+		self.assertEqual(self.client.get(self.url, {'q': 'panaderia'}).data['count'], 0)
+		self.assertEqual(self.client.get(self.url, {'q': 'verduleria'}).data['count'], 1)
+		gasto.delete()
+		self.assertEqual(self.client.get(self.url, {'q': 'verduleria'}).data['count'], 0)
+
+	def test_invalid_queries(self):
+		self.assertEqual(self.client.get(self.url).status_code, 400)
+		self.assertEqual(self.client.get(self.url, {'q': '%&!'}).status_code, 400)
+		self.assertEqual(self.client.get(self.url, {'q': 'x', 'limit': 'x'}).status_code, 400)
+
+
+class VendorAutocompleteTests(APITestCase):
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='vendors', password='VendorPass123', email='vendors@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.url = reverse('gastos_vendors')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, vendedor, fecha):
+		return Gasto.objects.create(
+			user=self.user, titulo='', monto=10, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor=vendedor, fecha_gasto=fecha,
+		)
+
+	def test_ranked_by_frequency_and_recency(self):
+		today = timezone.localdate()
+		for _ in range(3):
+			self._gasto('Supermercado Coto', today - timedelta(days=400))
+		self._gasto('Súper Día', today)
+		self._gasto('super dia', today)
+		self._gasto('Farmacia', today)
+
+		resp = self.client.get(self.url, {'q': 'SUPER'})
+		self.assertEqual(resp.status_code, 200)
+		# Two recent uses outweigh three old ones; both spellings of Día are merged
+		self.assertEqual([row['vendedor'] for row in resp.data['results']], ['Súper Día', 'Supermercado Coto'])
+		self.assertEqual(resp.data['results'][0]['count'], 2)
+		# Words after the first match too
+		self.assertEqual([row['vendedor'] for row in self.client.get(self.url, {'q': 'cot'}).data['results']], ['Supermercado Coto'])
+		self.assertEqual(len(self.client.get(self.url, {'limit': 1}).data['results']), 1)
+		self.assertEqual(self.client.get(self.url, {'limit': 0}).status_code, 400)
+
+	def test_index_is_served_from_memory_until_a_write(self):
+		self._gasto('Kiosco', timezone.localdate())
+		self.client.get(self.url, {'q': 'k'})
+		with self.assertNumQueries(0):
+			resp = self.client.get(self.url, {'q': 'ki'})
+		self.assertEqual(len(resp.data['results']), 1)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self._gasto('Kiosko', timezone.localdate())
+		self.assertEqual(len(self.client.get(self.url, {'q': 'ki'}).data['results']), 2)
+
+
+class CategorySuggestionTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='categorias', password='CatPass123', email='cat@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, vendedor, categoria, medio_pago=None):
+		return Gasto.objects.create(
+			user=self.user, titulo='', monto=10, pagos_realizados=1, pagos_totales=1, categoria=categoria,
+			medio_pago=medio_pago or self.medio_pago, vendedor=vendedor, fecha_gasto=date(2025, 7, 1),
+		)
+
+	def _counts(self):
+		return dict(
+			((vendedor, categoria), count)
+			for vendedor, categoria, count in VendorCategoryCount.objects.filter(user=self.user).values_list('vendedor', 'categoria', 'count')
+		)
+
+	def test_counts_follow_every_write(self):
+		first = self._gasto('Coto', 'comida')
+		self._gasto(' COTO ', 'comida')
+		self._gasto('Coto', 'otros')
+		self.assertEqual(self._counts(), {('coto', 'comida'): 2})
+
+		self.client.patch(reverse('gastos_detail', kwargs={'id': first.id}), {'categoria': 'salud', 'vendedor': 'Farmacity'}, format='json')
+		self.assertEqual(self._counts(), {('coto', 'comida'): 1, ('farmacity', 'salud'): 1})
+		self.client.post(reverse('gastos_bulk'), {
+			'create': [{
+				'monto': 5, 'pagos_realizados': 1, 'pagos_totales': 1, 'medio_pago': self.medio_pago.id,
+				'vendedor': 'Coto', 'categoria': 'comida', 'fecha_gasto': '2025-07-02',
+			}],
+			'delete': [first.id],
+		}, format='json')
+		self.assertEqual(self._counts(), {('coto', 'comida'): 2})
+
+		other = MedioPago.objects.create(user=self.user, ente_emisor='Tarjeta', tipo='credito')
+		self._gasto('Shell', 'transporte', medio_pago=other)
+		other.delete()
+		self.assertEqual(self._counts(), {('coto', 'comida'): 2})
+
+	def test_suggestion_on_create_and_lookup(self):
+		self._gasto('Coto', 'comida')
+		self._gasto('Coto', 'comida')
+		self._gasto('Coto', 'salud')
+		resp = self.client.post(reverse('gastos_list_create'), {
+			'monto': 5, 'pagos_realizados': 1, 'pagos_totales': 1, 'medio_pago': self.medio_pago.id,
+			'vendedor': 'coto', 'fecha_gasto': '2025-07-02',
+		}, format='json')
+		self.assertEqual(resp.status_code, 201)
+		self.assertEqual(resp.data['categoria_sugerida'], {'categoria': 'comida', 'confidence': 0.67, 'count': 2})
+
+		url = reverse('gastos_categoria_suggestion')
+		self.assertEqual(self.client.get(url, {'vendedor': 'Cotó'}).data['suggestion']['categoria'], 'comida')
+		self.assertIsNone(self.client.get(url, {'vendedor': 'Nuevo'}).data['suggestion'])
+		self.assertEqual(self.client.get(url).status_code, 400)
+
+	def test_recategorize_command(self):
+		for _ in range(3):
+			self._gasto('YPF', 'transporte')
+		self._gasto('Kiosco', 'comida')
+		self._gasto('Kiosco', 'entretenimiento')
+		imported = [self._gasto(vendedor, 'otros') for vendedor in ('ypf', 'YPF', 'Kiosco', 'Nuevo')]
+
+		out = StringIO()
+		call_command('recategorize_gastos', '--dry-run', stdout=out)
+		self.assertIn('Would recategorize 2 of 4', out.getvalue())
+		self.assertEqual(Gasto.objects.filter(categoria='otros').count(), 4)
+
+		out = StringIO()
+		# Users, counts, rows, one UPDATE for both ypf rows and the rollup deltas
+		with self.assertNumQueries(9):
+			call_command('recategorize_gastos', stdout=out)
+		self.assertIn('Recategorized 2 of 4', out.getvalue())
+		self.assertEqual(
+			[Gasto.objects.get(id=gasto.id).categoria for gasto in imported],
+			['transporte', 'transporte', 'otros', 'otros'],
+		)
+		# Guesses are not counted, so they cannot outweigh the user's choices
+		self.assertEqual(self._counts()[('ypf', 'transporte')], 3)
+		url = reverse('gastos_detail', kwargs={'id': imported[0].id})
+		self.client.patch(url, {'comentarios': 'nafta'}, format='json')
+		self.assertEqual(self._counts()[('ypf', 'transporte')], 3)
+		# Once the user picks a categoria it is theirs
+		resp = self.client.patch(url, {'categoria': 'comida'}, format='json')
+		self.assertFalse(resp.data['categoria_automatica'])
+		self.assertEqual(self._counts()[('ypf', 'comida')], 1)
+		Gasto.objects.get(id=imported[1].id).delete()
+		self.assertEqual(self._counts()[('ypf', 'transporte')], 3)
+		out = StringIO()
+		call_command('rebuild_gasto_rollups', '--verify', stdout=out)
+		self.assertIn('0 missing, 0 wrong, 0 extra', out.getvalue())
+
+
+class DuplicateGastoTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='dupes', password='DupesPass123', email='dupes@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, vendedor, monto, fecha, moneda='ARS'):
+		return Gasto.objects.create(
+			user=self.user, titulo='', monto=monto, moneda=moneda, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor=vendedor, fecha_gasto=fecha,
+		)
+
+	def test_create_warns_about_possible_duplicates(self):
+		original = self._gasto('Supermercado Coto', 1520.5, date(2025, 7, 1))
+		self._gasto('Supermercado Coto', 1520.5, date(2025, 7, 5))
+		self._gasto('Farmacity', 1520.5, date(2025, 7, 2))
+		self._gasto('Supermercado Coto', 1520.5, date(2025, 7, 2), moneda='USD')
+		data = {
+			'monto': 1520.5, 'pagos_realizados': 1, 'pagos_totales': 1, 'medio_pago': self.medio_pago.id,
+			'vendedor': 'SUPERMERCADO COTO 123', 'fecha_gasto': '2025-07-02',
+		}
+		resp = self.client.post(reverse('gastos_list_create'), data, format='json')
+		self.assertEqual(resp.status_code, 201)
+		self.assertEqual([row['id'] for row in resp.data['posibles_duplicados']], [original.id])
+
+		data['monto'] = 99
+		resp = self.client.post(reverse('gastos_list_create'), data, format='json')
+		self.assertEqual(resp.data['posibles_duplicados'], [])
+
+	def test_create_and_scan_bucket_half_cents_alike(self):
+		original = self._gasto('Kiosco', 2.675, date(2025, 7, 1))
+		data = {
+			'monto': 2.6751, 'pagos_realizados': 1, 'pagos_totales': 1, 'medio_pago': self.medio_pago.id,
+			'vendedor': 'Kiosco', 'fecha_gasto': '2025-07-01',
+		}
+		resp = self.client.post(reverse('gastos_list_create'), data, format='json')
+		self.assertEqual([row['id'] for row in resp.data['posibles_duplicados']], [original.id])
+		self.assertEqual(self.client.get(reverse('gastos_duplicates')).data['count'], 1)
+
+	def test_scan_returns_clusters(self):
+		day = date(2025, 7, 10)
+		chain = [
+			self._gasto('Shell', 30000, day),
+			self._gasto('shell', 30000.001, day + timedelta(days=1)),
+			self._gasto('Shell Av. Libertador', 30000, day + timedelta(days=2)),
+		]
+		pair = [self._gasto('Kiosco', 500, date(2025, 6, 1)), self._gasto('Kiosko', 500, date(2025, 6, 1))]
+		self._gasto('Shell', 30000, day + timedelta(days=4))
+		self._gasto('Verdulería', 500, date(2025, 6, 1))
+
+		with self.assertNumQueries(2):
+			resp = self.client.get(reverse('gastos_duplicates'))
+		self.assertEqual(resp.data['count'], 2)
+		self.assertEqual(
+			[sorted(row['id'] for row in cluster) for cluster in resp.data['clusters']],
+			[[gasto.id for gasto in chain], [gasto.id for gasto in pair]],
+		)
+
+
+class GrupoTotalsTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='viajera', password='ViajePass123', email='viaje@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.client.force_authenticate(user=self.user)
+
+	def _grupo(self, name, currency, gastos):
+		grupo = Grupo.objects.create(name=name, owner=self.user, default_currency=currency)
+		GrupoMembership.objects.create(grupo=grupo, user=self.user, role='owner')
+		for monto, moneda in gastos:
+			Gasto.objects.create(
+				user=self.user, grupo=grupo, titulo='', monto=monto, moneda=moneda, pagos_realizados=1, pagos_totales=1,
+				medio_pago=self.medio_pago, vendedor='Hotel', fecha_gasto=date(2025, 7, 1),
+			)
+		return grupo
+
+	@mock.patch('api.grupos.stored_rates', return_value={'ARS': 1.0, 'USD': 1000.0, 'EUR': 1100.0})
+	def test_list_totals_are_converted_in_bulk(self, stored_rates):
+		self._grupo('Brasil', 'USD', [(10, 'USD'), (2000, 'ARS'), (100, 'EUR')])
+		self._grupo('Casa', 'ARS', [(500, 'ARS'), (250.5, 'ARS')])
+		self._grupo('Raro', 'ARS', [(1, 'NA')])
+
+		with CaptureQueriesContext(connection) as queries:
+			resp = self.client.get(reverse('grupos_list_create'))
+		grupos = {grupo['name']: grupo for grupo in resp.data}
+		self.assertEqual(grupos['Brasil']['total_expenses'], 122.0)
+		self.assertEqual(grupos['Brasil']['totales_por_moneda'], {'ARS': 2000.0, 'EUR': 100.0, 'USD': 10.0})
+		self.assertEqual(grupos['Casa']['total_expenses'], 750.5)
+		self.assertIsNone(grupos['Raro']['total_expenses'])
+		# One query over the persisted totals (plus the list validator's), none
+		# over the gastos, and the rates read once
+		self.assertEqual(sum('"api_grupo_currency_total"' in query['sql'] for query in queries), 2)
+		self.assertEqual(sum('"api_gasto"' in query['sql'] and 'GROUP BY' in query['sql'] for query in queries), 0)
+		self.assertEqual(stored_rates.call_count, 1)
+
+	@mock.patch('api.grupos.stored_rates', return_value={'ARS': 1.0, 'USD': 1000.0})
+	def test_list_queries_do_not_grow_with_grupos(self, stored_rates):
+		friend = User.objects.create_user(username='amiga', password='AmigaPass123', email='amiga@example.com')
+
+		def list_grupos():
+			with CaptureQueriesContext(connection) as queries:
+				resp = self.client.get(reverse('grupos_list_create'))
+			return resp.data, len(queries)
+
+		def add_grupos(count):
+			for i in range(count):
+				grupo = self._grupo(f'Grupo {i}', 'ARS', [(100, 'ARS'), (1, 'USD')])
+				GrupoMembership.objects.create(grupo=grupo, user=friend, is_active=i % 2 == 0)
+
+		add_grupos(2)
+		_, few = list_grupos()
+		add_grupos(8)
+		grupos, many = list_grupos()
+		self.assertEqual(len(grupos), 10)
+		self.assertEqual(few, many)
+		counts = {grupo['name']: grupo['member_count'] for grupo in grupos}
+		self.assertEqual(counts['Grupo 0'], 2)
+		self.assertEqual(counts['Grupo 1'], 1)
+		self.assertEqual(grupos[0]['total_expenses'], 1100.0)
+
+	@mock.patch('api.grupos.stored_rates', return_value=None)
+	def test_detail_without_rates(self, stored_rates):
+		grupo = self._grupo('Casa', 'ARS', [(500, 'ARS')])
+		resp = self.client.get(reverse('grupos_detail', kwargs={'id': grupo.id}))
+		self.assertEqual(resp.data['total_expenses'], 500.0)
+		stored_rates.assert_not_called()
+		self.assertIsNone(self._grupo('Viaje', 'ARS', [(5, 'USD')]).get_total_expenses())
+
+	@mock.patch('api.rates.fetch_quotes')
+	def test_totals_never_fetch_rates(self, fetch_quotes):
+		cache.delete(COTIZACIONES.cache_key)
+		self.addCleanup(cache.delete, COTIZACIONES.cache_key)
+		grupo = self._grupo('Viaje', 'ARS', [(500, 'ARS'), (2, 'USD')])
+		for venta, fecha in ((900, datetime(2025, 7, 1, 12)), (1000, datetime(2025, 7, 2, 12))):
+			ExchangeRateSnapshot.objects.create(
+				moneda='USD', casa='oficial', compra=venta - 50, venta=venta, fecha=timezone.make_aware(fecha),
+			)
+		ExchangeRateSnapshot.objects.create(
+			moneda='USD', casa='blue', compra=1200, venta=1300, fecha=timezone.make_aware(datetime(2025, 7, 3)),
+		)
+
+		resp = self.client.get(reverse('grupos_detail', kwargs={'id': grupo.id}))
+		# Cold cache: the latest oficial snapshot
+		self.assertEqual(resp.data['total_expenses'], 2500.0)
+		cache.set(COTIZACIONES.cache_key, {'data': [{'moneda': 'USD', 'venta': 1100}], 'fetched_at': 0})
+		resp = self.client.get(reverse('grupos_detail', kwargs={'id': grupo.id}))
+		# A cached copy, however old, is used as is
+		self.assertEqual(resp.data['total_expenses'], 2700.0)
+		fetch_quotes.assert_not_called()
+
+
+class GrupoCounterTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='contadora', password='CuentaPass123', email='cuenta@example.com')
+		self.friend = User.objects.create_user(username='socia', password='SociaPass123', email='socia@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.user, ente_emisor='Banco', tipo='debito')
+		self.client.force_authenticate(user=self.user)
+
+	def _gasto(self, grupo, monto, moneda='ARS'):
+		return Gasto.objects.create(
+			user=self.user, grupo=grupo, titulo='', monto=monto, moneda=moneda, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Hotel', fecha_gasto=date(2025, 7, 1),
+		)
+
+	def _counters(self, grupo):
+		grupo.refresh_from_db()
+		totals = {row.moneda: (round(row.total, 2), row.count) for row in grupo.currency_totals.all()}
+		return grupo.member_count, grupo.expense_count, totals
+
+	def test_counters_follow_writes(self):
+		resp = self.client.post(reverse('grupos_list_create'), {'name': 'Brasil'}, format='json')
+		grupo = Grupo.objects.get(id=resp.data['id'])
+		other = Grupo.objects.create(name='Casa', owner=self.user)
+		self.assertEqual(self._counters(grupo), (1, 0, {}))
+
+		membership = GrupoMembership.objects.create(grupo=grupo, user=self.friend)
+		self.assertEqual(self._counters(grupo)[0], 2)
+		membership.is_active = False
+		membership.save()
+		self.assertEqual(self._counters(grupo)[0], 1)
+		membership.is_active = True
+		membership.save()
+		membership.delete()
+		self.assertEqual(self._counters(grupo)[0], 1)
+
+		hotel = self._gasto(grupo, 100)
+		self._gasto(grupo, 10, 'USD')
+		self._gasto(grupo, 5, 'USD')
+		self.assertEqual(self._counters(grupo), (1, 3, {'ARS': (100.0, 1), 'USD': (15.0, 2)}))
+
+		hotel.monto = 150
+		hotel.save()
+		self.assertEqual(self._counters(grupo)[2]['ARS'], (150.0, 1))
+		hotel.grupo = other
+		hotel.save()
+		self.assertEqual(self._counters(grupo), (1, 2, {'USD': (15.0, 2)}))
+		self.assertEqual(self._counters(other), (0, 1, {'ARS': (150.0, 1)}))
+		hotel.delete()
+		self.assertEqual(self._counters(other), (0, 0, {}))
+
+		resp = self.client.get(reverse('grupos_detail', kwargs={'id': grupo.id}))
+		self.assertEqual((resp.data['member_count'], resp.data['expense_count']), (1, 2))
+		self.assertEqual(resp.data['totales_por_moneda'], {'USD': 15.0})
+
+	def test_reconcile_reports_and_repairs_drift(self):
+		grupo = Grupo.objects.create(name='Viaje', owner=self.user)
+		GrupoMembership.objects.create(grupo=grupo, user=self.user, role='owner')
+		self._gasto(grupo, 100)
+		self._gasto(grupo, 10, 'USD')
+		expected = self._counters(grupo)
+		Grupo.objects.filter(id=grupo.id).update(member_count=7, expense_count=0)
+		GrupoCurrencyTotal.objects.filter(grupo=grupo, moneda='ARS').update(total=1)
+		GrupoCurrencyTotal.objects.filter(grupo=grupo, moneda='USD').delete()
+		GrupoCurrencyTotal.objects.create(grupo=grupo, moneda='EUR', total=3, count=1)
+
+		out = StringIO()
+		call_command('reconcile_grupo_counters', '--verify', stdout=out)
+		self.assertIn('1 member counts, 1 expense counts and 3 currency totals drifted (not repaired', out.getvalue())
+		self.assertNotEqual(self._counters(grupo), expected)
+
+		call_command('reconcile_grupo_counters', '--batch-size', '1', stdout=StringIO())
+		self.assertEqual(self._counters(grupo), expected)
+		out = StringIO()
+		call_command('reconcile_grupo_counters', stdout=out)
+		self.assertIn('Checked 1 grupos: 0 member counts, 0 expense counts and 0 currency totals drifted', out.getvalue())
+
+
+class GrupoBalanceTests(APITestCase):
+	def setUp(self):
+		self.ana = User.objects.create_user(username='ana', password='AnaPass12345', email='ana@example.com')
+		self.beto = User.objects.create_user(username='beto', password='BetoPass12345', email='beto@example.com')
+		self.caro = User.objects.create_user(username='caro', password='CaroPass12345', email='caro@example.com')
+		self.medio_pago = MedioPago.objects.create(user=self.ana, ente_emisor='Banco', tipo='debito')
+		self.grupo = Grupo.objects.create(name='Viaje', owner=self.ana)
+		for user in (self.ana, self.beto, self.caro):
+			GrupoMembership.objects.create(grupo=self.grupo, user=user)
+		self.client.force_authenticate(user=self.ana)
+
+	def _gasto(self, user, monto, splits, moneda='ARS', paid_by=None, is_shared=True):
+		gasto = Gasto.objects.create(
+			user=user, grupo=self.grupo, titulo='', monto=monto, moneda=moneda, pagos_realizados=1, pagos_totales=1,
+			medio_pago=self.medio_pago, vendedor='Hotel', fecha_gasto=date(2025, 7, 1), is_shared=is_shared, paid_by=paid_by,
+		)
+		for split_user, amount, *paid in splits:
+			ExpenseSplit.objects.create(expense=gasto, user=split_user, amount=amount, **(paid[0] if paid else {}))
+		return gasto
+
+	def test_balances_and_transfers(self):
+		self._gasto(self.ana, 300, [(self.ana, 100), (self.beto, 100), (self.caro, 100)])
+		# Registered by beto but paid by caro; ana already paid 10 of her share
+		self._gasto(self.beto, 60, [(self.ana, 30, {'paid_amount': 10}), (self.beto, 30)], paid_by=self.caro)
+		self._gasto(self.ana, 50, [(self.beto, 50, {'status': 'paid'})])
+		self._gasto(self.ana, 80, [(self.beto, 80)], is_shared=False)
+		self._gasto(self.beto, 10, [(self.ana, 10)], moneda='USD')
+
+		resp = self.client.get(reverse('grupos_balances', kwargs={'id': self.grupo.id}))
+		self.assertEqual(resp.status_code, 200)
+		ars = resp.data['monedas']['ARS']
+		self.assertEqual(
+			[(row['user']['username'], row['balance']) for row in ars['balances']],
+			[('ana', 180.0), ('caro', -50.0), ('beto', -130.0)],
+		)
+		self.assertEqual(
+			[(row['from']['username'], row['to']['username'], row['amount']) for row in ars['transfers']],
+			[('beto', 'ana', 130.0), ('caro', 'ana', 50.0)],
+		)
+		usd = resp.data['monedas']['USD']
+		self.assertEqual([(row['from']['id'], row['to']['id'], row['amount']) for row in usd['transfers']], [(self.ana.id, self.beto.id, 10.0)])
+
+		outsider = User.objects.create_user(username='ajena', password='AjenaPass123', email='ajena@example.com')
+		self.client.force_authenticate(user=outsider)
+		resp = self.client.get(reverse('grupos_balances', kwargs={'id': self.grupo.id}))
+		self.assertEqual(resp.status_code, 404)
+
+	def test_large_grupo_is_settled_in_two_queries(self):
+		members = User.objects.bulk_create(User(username=f'miembro{i}') for i in range(60))
+		GrupoMembership.objects.bulk_create(GrupoMembership(grupo=self.grupo, user=user) for user in members)
+		gastos = [
+			self._gasto(payer, 123.45, [], paid_by=payer)
+			for payer in members[:12]
+		]
+		ExpenseSplit.objects.bulk_create(
+			ExpenseSplit(expense=gasto, user=user, amount=round(123.45 / len(members), 2))
+			for gasto in gastos for user in members
+		)
+
+		with CaptureQueriesContext(connection) as queries:
+			result = grupo_balances(self.grupo)
+		self.assertEqual(len(queries), 2)
+		balances = {row['user']['id']: row['balance'] for row in result['ARS']['balances']}
+		self.assertAlmostEqual(sum(balances.values()), 0, places=6)
+		# Every transfer settles at least one member
+		transfers = result['ARS']['transfers']
+		self.assertLessEqual(len(transfers), len(balances) - 1)
+		for transfer in transfers:
+			balances[transfer['from']['id']] += transfer['amount']
+			balances[transfer['to']['id']] -= transfer['amount']
+		self.assertTrue(all(abs(balance) < 0.005 for balance in balances.values()))
+
+	def test_settle_is_minimal_for_chains(self):
+		# a owes b and b owes c the same amount: one transfer from a to c
+		self.assertEqual(settle({1: -500, 2: 0, 3: 500}), [(1, 3, 500)])
+		self.assertEqual(settle({}), [])
+
+
+class GrupoPermissionTests(APITestCase):
+	def setUp(self):
+		self.owner = User.objects.create_user(username='duena', password='DuenaPass123', email='duena@example.com')
+		self.member = User.objects.create_user(username='socio', password='SocioPass123', email='socio@example.com')
+		self.viewer = User.objects.create_user(username='mirona', password='MironaPass123', email='mirona@example.com')
+		self.client.force_authenticate(user=self.owner)
+		with self.captureOnCommitCallbacks(execute=True):
+			resp = self.client.post(reverse('grupos_list_create'), {'name': 'Viaje'}, format='json')
+			self.grupo = Grupo.objects.get(id=resp.data['id'])
+			self.membership = GrupoMembership.objects.create(grupo=self.grupo, user=self.member, can_add_expenses=False)
+			GrupoMembership.objects.create(grupo=self.grupo, user=self.viewer, role='viewer', can_add_expenses=True, can_manage_members=True)
+
+	def _post_gasto(self, user):
+		medio_pago = MedioPago.objects.create(user=user, ente_emisor='Banco', tipo='debito')
+		self.client.force_authenticate(user=user)
+		return self.client.post(reverse('gastos_list_create'), {
+			'monto': 5, 'pagos_realizados': 1, 'pagos_totales': 1, 'medio_pago': medio_pago.id,
+			'vendedor': 'Hotel', 'fecha_gasto': '2025-07-02', 'grupo': self.grupo.id,
+		}, format='json')
+
+	def _add_member(self, user, username):
+		self.client.force_authenticate(user=user)
+		invitee = User.objects.create_user(username=username, password='InvitadoPass123')
+		return self.client.post(reverse('grupo_memberships_list_create'), {'grupo': self.grupo.id, 'user': invitee.id}, format='json')
+
+	def test_roles_and_flags_are_enforced(self):
+		self.assertEqual(self._post_gasto(self.owner).status_code, 201)
+		self.assertEqual(self._post_gasto(self.member).status_code, 403)
+		# Viewers only read, whatever their flags
+		self.assertEqual(self._post_gasto(self.viewer).status_code, 403)
+		self.assertEqual(self._add_member(self.viewer, 'invitado1').status_code, 403)
+		self.assertEqual(self._add_member(self.member, 'invitado2').status_code, 403)
+		self.assertEqual(self._add_member(self.owner, 'invitado3').status_code, 201)
+
+		self.client.force_authenticate(user=self.member)
+		url = reverse('grupos_detail', kwargs={'id': self.grupo.id})
+		self.assertEqual(self.client.get(url).status_code, 200)
+		self.assertEqual(self.client.patch(url, {'name': 'Otro'}, format='json').status_code, 403)
+		self.assertEqual(self.client.delete(url).status_code, 403)
+		# Members may leave on their own
+		with self.captureOnCommitCallbacks(execute=True):
+			resp = self.client.delete(reverse('grupo_memberships_detail', kwargs={'id': self.membership.id}))
+		self.assertEqual(resp.status_code, 204)
+		self.assertEqual(self.client.get(reverse('grupos_balances', kwargs={'id': self.grupo.id})).status_code, 404)
+
+	def test_membership_map_is_cached_until_memberships_change(self):
+		self.assertEqual(self._post_gasto(self.member).status_code, 403)
+		# The map comes from the cache: no membership query
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(self._add_member(self.member, 'invitado1').status_code, 403)
+		self.assertFalse(any('"api_grupo_membership"' in query['sql'] for query in queries))
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.membership.can_add_expenses = True
+			self.membership.can_manage_members = True
+			self.membership.save()
+		self.assertEqual(self._post_gasto(self.member).status_code, 201)
+		self.assertEqual(self._add_member(self.member, 'invitado2').status_code, 201)
+
+		with self.captureOnCommitCallbacks(execute=True):
+			self.grupo.is_active = False
+			self.grupo.save()
+		self.assertEqual(self._post_gasto(self.member).status_code, 403)
+		self.assertFalse(self.grupo.can_add_expense(self.member))
+
+	def test_admin_actions_refresh_the_membership_map(self):
+		self.assertEqual(self._post_gasto(self.owner).status_code, 201)
+		grupos = Grupo.objects.filter(pk=self.grupo.pk)
+		grupo_admin = GrupoAdmin(Grupo, admin.site)
+		with mock.patch.object(grupo_admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+			grupo_admin.deactivate_grupos(None, grupos)
+		self.assertEqual(self._post_gasto(self.owner).status_code, 403)
+		with mock.patch.object(grupo_admin, 'message_user'), self.captureOnCommitCallbacks(execute=True):
+			grupo_admin.activate_grupos(None, grupos)
+		self.assertEqual(self._post_gasto(self.owner).status_code, 201)
+
+		self.client.force_authenticate(user=self.member)
+		url = reverse('grupos_detail', kwargs={'id': self.grupo.id})
+		self.assertEqual(self.client.get(url).status_code, 200)
+		with self.captureOnCommitCallbacks(execute=True):
+			GrupoMembershipAdmin(GrupoMembership, admin.site).delete_queryset(
+				None, GrupoMembership.objects.filter(pk=self.membership.pk)
+			)
+		self.assertEqual(self.client.get(url).status_code, 404)
+		self.grupo.refresh_from_db()
+		self.assertEqual(self.grupo.member_count, 2)
+
+	def test_grupo_owner_counts_as_owner_role(self):
+		with self.captureOnCommitCallbacks(execute=True):
+			GrupoMembership.objects.filter(grupo=self.grupo, user=self.owner).update(role='member', can_add_expenses=False)
+		self.assertEqual(load_grupo_permissions(self.owner.id)[self.grupo.id][0], 'owner')
+		self.assertTrue(self.grupo.can_add_expense(self.owner))
+		self.assertFalse(self.grupo.can_add_expense(self.member))
+
+
+class ExchangeRateServiceTests(APITestCase):
+	QUOTES = [{'casa': 'oficial', 'compra': 990.0, 'venta': 1000.0}]
+
+	def setUp(self):
+		cache.clear()
+		self.user = User.objects.create_user(username='dolar', password='DolarPass123', email='dolar@example.com')
+		self.client.force_authenticate(user=self.user)
+		self.url = reverse('cotizacion')
+
+	def _age(self, seconds):
+		entry = cache.get(DOLARES.cache_key)
+		entry['fetched_at'] -= seconds
+		cache.set(DOLARES.cache_key, entry)
+
+	@mock.patch('api.rates.fetch_quotes')
+	def test_served_from_cache_with_cache_control(self, fetch_quotes):
+		fetch_quotes.return_value = self.QUOTES
+		self.assertEqual(self.client.get(self.url).data['data'], self.QUOTES)
+		self._age(100)
+		resp = self.client.get(self.url)
+		self.assertEqual(resp.data['data'], self.QUOTES)
+		self.assertEqual(fetch_quotes.call_count, 1)
+		self.assertEqual(resp['Cache-Control'], 'private, max-age=199, stale-while-revalidate=300')
+
+	@mock.patch('api.rates.threading.Thread')
+	@mock.patch('api.rates.fetch_quotes')
+	def test_stale_copy_is_served_while_refreshing(self, fetch_quotes, thread):
+		# Run the background refresh right away
+		thread.side_effect = lambda target, args, daemon: mock.Mock(start=lambda: target(*args))
+		fetch_quotes.return_value = self.QUOTES
+		get_quotes(DOLARES)
+		self._age(DOLARES.ttl + 1)
+
+		fetch_quotes.side_effect = requests.Timeout()
+		data, age = get_quotes(DOLARES)
+		self.assertEqual(data, self.QUOTES)
+		self.assertGreater(age, DOLARES.ttl)
+		# A failed refresh is not retried on every request
+		get_quotes(DOLARES)
+		self.assertEqual(fetch_quotes.call_count, 2)
+
+		cache.delete(DOLARES.lock_key)
+		fetch_quotes.side_effect = None
+		fetch_quotes.return_value = [{'casa': 'blue', 'venta': 1200.0}]
+		# Still the stale copy; the refresh replaces it for the next request
+		self.assertEqual(get_quotes(DOLARES)[0], self.QUOTES)
+		self.assertEqual(get_quotes(DOLARES), ([{'casa': 'blue', 'venta': 1200.0}], mock.ANY))
+		self.assertLess(get_quotes(DOLARES)[1], 1)
+
+	@mock.patch('api.rates.fetch_quotes', side_effect=requests.ConnectionError())
+	def test_unavailable_without_a_copy(self, fetch_quotes):
+		self.assertEqual(self.client.get(self.url).status_code, 503)
+		self.assertEqual(self.client.get(self.url).status_code, 503)
+		fetch_quotes.assert_called_once()
+		self.assertIsNone(get_rates())
+
+	def test_concurrent_requests_share_one_fetch(self):
+		calls = []
+
+		def slow_fetch(source):
+			calls.append(source.name)
+			time.sleep(0.2)
+			return self.QUOTES
+
+		results = []
+		with mock.patch('api.rates.fetch_quotes', side_effect=slow_fetch):
+			threads = [threading.Thread(target=lambda: results.append(get_quotes(DOLARES)[0])) for _ in range(5)]
+			for thread in threads:
+				thread.start()
+			for thread in threads:
+				thread.join()
+		self.assertEqual(calls, ['dolares'])
+		self.assertEqual(results, [self.QUOTES] * 5)
+
+	@mock.patch('api.rates.afetch_quotes')
+	def test_async_endpoint_shares_the_cache(self, afetch_quotes):
+		afetch_quotes.return_value = self.QUOTES
+		self.client.force_authenticate(user=None)
+		url = reverse('cotizacion_async')
+		self.assertEqual(self.client.get(url).status_code, 401)
+
+		self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+		resp = self.client.get(url)
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(resp.json(), {'success': True, 'data': self.QUOTES})
+		self.assertEqual(resp['Cache-Control'], 'private, max-age=299, stale-while-revalidate=300')
+		# The sync endpoint is served from the copy the async one fetched
+		with mock.patch('api.rates.fetch_quotes') as fetch_quotes:
+			self.assertEqual(self.client.get(self.url).data['data'], self.QUOTES)
+		fetch_quotes.assert_not_called()
+
+	def test_async_concurrent_requests_share_one_fetch(self):
+		calls = []
+
+		async def slow_fetch(source):
+			calls.append(source.name)
+			await asyncio.sleep(0.2)
+			return self.QUOTES
+
+		async def burst():
+			return await asyncio.gather(*(aget_quotes(DOLARES) for _ in range(5)))
+
+		with mock.patch('api.rates.afetch_quotes', side_effect=slow_fetch):
+			results = async_to_sync(burst)()
+		self.assertEqual(calls, ['dolares'])
+		self.assertEqual([data for data, _ in results], [self.QUOTES] * 5)
+
+
+class OutboundClientTests(APITestCase):
+	def setUp(self):
+		self.fake = FakeDolarapi().start()
+		self.addCleanup(self.fake.stop)
+
+	def test_connections_are_reused(self):
+		client = OutboundClient('test', self.fake.url)
+		for _ in range(5):
+			self.assertEqual(client.get_json('/dolares')[0]['casa'], 'oficial')
+		self.assertEqual(self.fake.requests, 5)
+		self.assertEqual(self.fake.connections, 1)
+
+	def test_failed_calls_are_retried(self):
+		client = OutboundClient('test', self.fake.url, retries=2, backoff=0)
+		self.fake.down = True
+		with self.assertRaises(requests.HTTPError):
+			client.get('/dolares')
+		self.assertEqual(self.fake.requests, 3)
+
+	def test_circuit_opens_and_recovers(self):
+		breaker = CircuitBreaker('test', failure_threshold=2, reset_timeout=60)
+		client = OutboundClient('test', self.fake.url, retries=0, breaker=breaker)
+		self.fake.down = True
+		for _ in range(2):
+			with self.assertRaises(requests.HTTPError):
+				client.get('/dolares')
+		# Fails fast without calling the upstream
+		with self.assertRaises(CircuitOpen):
+			client.get('/dolares')
+		self.assertEqual(self.fake.requests, 2)
+		self.assertEqual(breaker.state, CircuitBreaker.OPEN)
+
+		# After the reset timeout one trial call goes through and closes it
+		breaker.reset_timeout = 0
+		self.fake.down = False
+		self.assertEqual(client.get('/dolares').status_code, 200)
+		self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+	def test_cancelled_trial_does_not_keep_the_circuit_open(self):
+		breaker = CircuitBreaker('test', failure_threshold=1, reset_timeout=0)
+		client = AsyncOutboundClient('test', self.fake.url, retries=0, breaker=breaker)
+		breaker.record_failure()
+		self.fake.latency = 0.5
+
+		async def calls():
+			try:
+				# The half-open trial is cancelled, as on a client disconnect
+				with self.assertRaises(asyncio.TimeoutError):
+					await asyncio.wait_for(client.get('/dolares'), 0.05)
+				self.assertFalse(breaker.trial_running)
+				self.fake.latency = 0
+				return (await client.get('/dolares')).status_code
+			finally:
+				await client.aclose()
+
+		self.assertEqual(async_to_sync(calls)(), 200)
+		self.assertEqual(breaker.state, CircuitBreaker.CLOSED)
+
+	def test_async_client_reuses_connections_and_retries(self):
+		client = AsyncOutboundClient('test', self.fake.url, retries=2, backoff=0)
+
+		async def calls():
+			try:
+				quotes = [await client.get_json('/cotizaciones') for _ in range(3)]
+				self.fake.down = True
+				with self.assertRaises(httpx.HTTPStatusError):
+					await client.get('/cotizaciones')
+				return quotes
+			finally:
+				await client.aclose()
+
+		quotes = async_to_sync(calls)()
+		self.assertEqual(quotes[0][0]['moneda'], 'USD')
+		self.assertEqual(self.fake.requests, 6)
+		self.assertEqual(self.fake.connections, 1)
+
+	def test_quotes_are_fetched_through_the_shared_client(self):
+		self.addCleanup(dolarapi.breaker.reset)
+		with mock.patch.object(dolarapi, 'base_url', self.fake.url):
+			quotes = fetch_quotes(DOLARES)
+		self.assertIn('blue', [quote['casa'] for quote in quotes])
+
+	def test_async_view_closes_its_client_under_wsgi(self):
+		cache.delete_many([DOLARES.cache_key, DOLARES.lock_key])
+		self.addCleanup(cache.delete_many, [DOLARES.cache_key, DOLARES.lock_key])
+		self.addCleanup(dolarapi.breaker.reset)
+		user = User.objects.create_user(username='cotiza', password='CotizaPass123')
+		self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+		opened = []
+		original = AsyncOutboundClient._client
+
+		def client(instance):
+			opened.append(original(instance))
+			return opened[-1]
+
+		with mock.patch.object(async_dolarapi, 'base_url', self.fake.url), \
+				mock.patch.object(AsyncOutboundClient, '_client', client):
+			resp = self.client.get(reverse('cotizacion_async'))
+		self.assertEqual(resp.status_code, 200)
+		self.assertEqual(self.fake.requests, 1)
+		# The test client is WSGI: the request's loop and its pool are gone
+		self.assertTrue(opened and all(client.is_closed for client in opened))
+		self.assertEqual(len(async_dolarapi._clients), 0)
+
+	def test_async_whitenoise_serves_static_files(self):
+		static_root = tempfile.mkdtemp()
+		self.addCleanup(shutil.rmtree, static_root)
+		with open(os.path.join(static_root, 'app.css'), 'w') as static_file:
+			static_file.write('body{}')
+
+		async def view(request):
+			return HttpResponse('view')
+
+		factory = RequestFactory()
+		with override_settings(STATIC_ROOT=static_root, STATIC_URL='/static/', WHITENOISE_AUTOREFRESH=False):
+			middleware = AsyncWhiteNoiseMiddleware(view)
+			sync_middleware = AsyncWhiteNoiseMiddleware(lambda request: HttpResponse('view'))
+		self.assertTrue(asyncio.iscoroutinefunction(middleware))
+		resp = async_to_sync(middleware)(factory.get('/static/app.css'))
+		self.assertEqual((resp.status_code, b''.join(resp.streaming_content)), (200, b'body{}'))
+		self.assertEqual(async_to_sync(middleware)(factory.get('/api/')).content, b'view')
+		resp = sync_middleware(factory.get('/static/app.css'))
+		self.assertEqual((resp.status_code, b''.join(resp.streaming_content)), (200, b'body{}'))
+
+
+class ExchangeRateHistoryTests(APITestCase):
+	def setUp(self):
+		self.user = User.objects.create_user(username='historia', password='HistPass123', email='hist@example.com')
+		self.client.force_authenticate(user=self.user)
+		tz = timezone.get_current_timezone()
+		for moneda, casa, day, hour, venta in (
+			('USD', 'oficial', date(2025, 1, 10), 12, 1000.0),
+			('USD', 'oficial', date(2025, 1, 20), 9, 1100.0),
+			('USD', 'oficial', date(2025, 1, 20), 18, 1150.0),
+			('USD', 'blue', date(2025, 1, 10), 12, 1300.0),
+			('EUR', 'oficial', date(2025, 1, 15), 12, 1200.0),
+		):
+			ExchangeRateSnapshot.objects.create(
+				moneda=moneda, casa=casa, venta=venta, compra=venta - 20,
+				fecha=timezone.make_aware(datetime.combine(day, dt_time(hour)), tz),
+			)
+
+	def test_bulk_lookup_is_one_query(self):
+		days = [date(2025, 1, 1) + timedelta(days=offset) for offset in range(40)] * 50
+		with self.assertNumQueries(1):
+			history = RateHistory.load(days, ['USD', 'EUR', 'ARS'])
+		self.assertIsNone(history.rate('USD', date(2025, 1, 9)))
+		self.assertEqual(history.rate('USD', date(2025, 1, 10)), 1000.0)
+		self.assertEqual(history.rate('USD', date(2025, 1, 19)), 1000.0)
+		# The last snapshot of the day wins
+		self.assertEqual(history.rate('USD', date(2025, 1, 20)), 1150.0)
+		self.assertEqual(history.rate('ARS', date(2025, 1, 1)), 1.0)
+		self.assertEqual(history.convert(120, 'EUR', 'USD', date(2025, 1, 16)), 144.0)
+		self.assertIsNone(history.convert(1, 'EUR', 'USD', date(2025, 1, 12)))
+
+		# Dates after a long gap still find their floor snapshot
+		with self.assertNumQueries(1):
+			history = RateHistory.load([date(2025, 6, 1)], ['USD'])
+		self.assertEqual(history.rate('USD', date(2025, 6, 1)), 1150.0)
+
+	def test_endpoint_and_snapshot_command(self):
+		resp = self.client.get(reverse('cotizacion_historica'), {'fechas': '2025-01-05,2025-01-12', 'casa': 'blue'})
+		self.assertEqual(resp.status_code, 200)
+		self.assertIsNone(resp.data['cotizaciones']['2025-01-05'])
+		self.assertEqual(resp.data['cotizaciones']['2025-01-12']['venta'], 1300.0)
+		self.assertEqual(self.client.get(reverse('cotizacion_historica'), {'fechas': '2025-13-01'}).status_code, 400)
+
+		quotes = [
+			{'moneda': 'USD', 'casa': 'tarjeta', 'compra': 1500, 'venta': 1600, 'fechaActualizacion': '2025-02-01T15:00:00.000Z'},
+			{'moneda': 'USD', 'casa': 'mayorista', 'venta': 'x'},
+		]
+		with mock.patch('api.management.commands.snapshot_exchange_rates.fetch_quotes', return_value=quotes):
+			out = StringIO()
+			call_command('snapshot_exchange_rates', stdout=out)
+			self.assertIn('Stored 1 new exchange rate snapshots (1 unchanged)', out.getvalue())
+			out = StringIO()
+			call_command('snapshot_exchange_rates', stdout=out)
+			self.assertIn('Stored 0 new', out.getvalue())
+		self.assertEqual(RateHistory.load([date(2025, 2, 2)], ['USD'], casa='tarjeta').rate('USD', date(2025, 2, 2)), 1600.0)
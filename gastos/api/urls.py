@@ -10,6 +10,8 @@ urlpatterns = [
     
     # Currency exchange rates
     path('cotizacion/', views.get_cotizacion, name='cotizacion'),
+    path('cotizacion/async/', views.get_cotizacion_async, name='cotizacion_async'),
+    path('cotizacion/historico/', views.cotizacion_historica, name='cotizacion_historica'),
     
     # Payment methods (Class-based views)
     path('medios-pago/', views.MedioPagoListCreate.as_view(), name='medios_pago_list_create'),
@@ -18,10 +20,22 @@ urlpatterns = [
     # Expenses (Gastos) - Class-based views
     path('gastos/', views.GastoListCreate.as_view(), name='gastos_list_create'),
     path('gastos/<int:id>/', views.GastoDetail.as_view(), name='gastos_detail'),
+    path('gastos/changes/', views.gasto_changes_view, name='gastos_changes'),
+    path('gastos/search/', views.gasto_search, name='gastos_search'),
+    path('gastos/vendedores/', views.vendor_autocomplete, name='gastos_vendors'),
+    path('gastos/categoria-sugerida/', views.categoria_suggestion, name='gastos_categoria_suggestion'),
+    path('gastos/duplicados/', views.duplicate_gastos, name='gastos_duplicates'),
+    path('gastos/summary/', views.gasto_summary, name='gastos_summary'),
+    path('gastos/proyeccion/', views.installment_projection_view, name='gastos_projection'),
+    path('gastos/pendiente/', views.pending_gastos, name='gastos_pending'),
+    path('gastos/export/', views.export_gastos, name='gastos_export'),
+    path('gastos/bulk/', views.bulk_gastos, name='gastos_bulk'),
+    path('gastos/import/', views.import_statement, name='gastos_import'),
 
     # Grupos - Class-based views
     path('grupos/', views.GrupoListCreate.as_view(), name='grupos_list_create'),
     path('grupos/<int:id>/', views.GrupoDetail.as_view(), name='grupos_detail'),
+    path('grupos/<int:id>/balances/', views.grupo_balances_view, name='grupos_balances'),
     
     # Grupo Memberships
     path('grupo-memberships/', views.GrupoMembershipListCreate.as_view(), name='grupo_memberships_list_create'),
@@ -1,16 +1,45 @@
-from rest_framework.decorators import api_view, permission_classes
+import json
+from datetime import date
+from rest_framework.decorators import api_view, permission_classes, parser_classes
+from rest_framework.parsers import MultiPartParser
 from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
+from django.db.models import Count, Max, OuterRef, Subquery, Sum
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import require_GET
+from django.utils import timezone
 from rest_framework.response import Response
 from rest_framework import status, generics
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
-from rest_framework.exceptions import PermissionDenied
+from rest_framework.exceptions import AuthenticationFailed, PermissionDenied
+from rest_framework_simplejwt.authentication import JWTStatelessUserAuthentication
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.views import TokenObtainPairView
 from django.contrib.auth.models import User
-from .models import Gasto, MedioPago, LoginAttempt, Grupo, GrupoMembership, GrupoInvitation, ExpenseSplit
+from .models import Gasto, MedioPago, LoginAttempt, Grupo, GrupoMembership, GrupoCurrencyTotal, GrupoInvitation, ExpenseSplit
 from .utils import check_attempts
+from .caching import GASTOS, GRUPOS, MEDIOS_PAGO
+from .conditional import ConditionalListMixin
+from .pagination import GastoCursorPagination
+from .filters import GastoFilterBackend, PENDING_GASTOS, filter_gastos, order_gastos
+from .exports import EXPORT_FORMATS, stream_export
+from .bulk import apply_gasto_batch
+from .imports import StatementImporter, StatementImportError, open_text
+from .rollups import summarize_gastos
+from .sync import CHANGES_MAX_PAGE_SIZE, CHANGES_PAGE_SIZE, gasto_changes
+from .search import SEARCH_DEFAULT_LIMIT, SEARCH_MAX_LIMIT, search_gastos
+from .autocomplete import VENDOR_DEFAULT_LIMIT, VENDOR_MAX_LIMIT, suggest_vendors
+from .categorization import suggest_categoria
+from .duplicates import find_duplicates, scan_duplicates
+from .grupos import user_grupos
+from .balances import grupo_balances
+from .permissions import GrupoRolePermission, has_grupo_permission
+from .rates import DOLARES, QuotesUnavailable, aget_quotes, arelease_loop, get_quotes
+from .rate_history import DEFAULT_CASA, RateHistory
+from .projections import PROJECTION_DEFAULT_MONTHS, PROJECTION_MAX_MONTHS, installment_projection
 from .serializers import (
-    GastoSerializer,
+    GastoListSerializer,
+    GastoDetailSerializer,
     MedioPagoSerializer,
     GrupoSerializer,
     GrupoMembershipSerializer,
@@ -21,42 +50,96 @@ from .serializers import (
 )
 
 # Grupos API views
-class GrupoListCreate(generics.ListCreateAPIView):
+class GrupoListCreate(ConditionalListMixin, generics.ListCreateAPIView):
     """
     API endpoint - Lista y crea grupos
+
+    Responde ``304 Not Modified`` a ``If-None-Match`` / ``If-Modified-Since``
+    si no cambiaron los grupos, sus miembros ni sus gastos.
     """
     serializer_class = GrupoSerializer
     permission_classes = [IsAuthenticated]
+    version_scopes = (GRUPOS,)
 
     def get_queryset(self):
         # Return only grupos for the authenticated user (owner or member)
-        return Grupo.objects.filter(members=self.request.user).distinct()
+        return user_grupos(self.request.user)
+
+    def get_conditional_queryset(self):
+        # Rows also render the members and the spend. Memberships are summed
+        # by a correlated subquery instead of a join, and gastos through
+        # their persisted counters, so api_gasto is never read.
+        memberships = GrupoMembership.objects.filter(grupo=OuterRef('pk')).order_by().values('grupo')
+        totals = GrupoCurrencyTotal.objects.filter(grupo=OuterRef('pk')).order_by().values('grupo')
+        return Grupo.objects.filter(
+            id__in=GrupoMembership.objects.filter(user=self.request.user).values('grupo_id')
+        ).annotate(
+            grupo_membership_count=Subquery(memberships.annotate(count=Count('pk')).values('count')),
+            grupo_membership_updated_at=Subquery(memberships.annotate(latest=Max('updated_at')).values('latest')),
+            grupo_total=Subquery(totals.annotate(total=Sum('total')).values('total')),
+        )
+
+    def get_conditional_aggregates(self):
+        return {
+            'count': Count('pk'),
+            'updated_at': Max('updated_at'),
+            'membership_count': Sum('grupo_membership_count'),
+            'membership_updated_at': Max('grupo_membership_updated_at'),
+            'expense_count': Sum('expense_count'),
+            'total': Sum('grupo_total'),
+        }
 
     def perform_create(self, serializer):
         # Automatically set the owner to the authenticated user
         grupo = serializer.save(owner=self.request.user)
-        grupo.members.add(self.request.user)
+        # Through the model, so member_count and the caches see the owner
+        GrupoMembership.objects.create(grupo=grupo, user=self.request.user, role='owner')
 
 
 class GrupoDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint - Obtiene, actualiza o elimina un grupo específico
+
+    Editarlo requiere rol owner o admin; eliminarlo, ser el owner.
     """
     serializer_class = GrupoSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, GrupoRolePermission]
     lookup_field = 'id'
+    grupo_object_actions = {'PUT': 'manage_grupo', 'PATCH': 'manage_grupo', 'DELETE': 'delete_grupo'}
 
     def get_queryset(self):
         # Only allow access to grupos where the user is a member
-        return Grupo.objects.filter(members=self.request.user).distinct()
+        return user_grupos(self.request.user)
+
+
+@api_view(['GET'])
+def grupo_balances_view(request, id):
+    """
+    API endpoint - Saldos de los miembros de un grupo y transferencias para saldarlos
+
+    Por moneda: cuánto le deben (positivo) o debe (negativo) cada miembro según
+    las divisiones pendientes de los gastos compartidos, y la lista de
+    transferencias que deja a todos en cero (a lo sumo una menos que los
+    miembros con saldo).
+    """
+    grupo = Grupo.objects.filter(pk=id).first() if has_grupo_permission(request, id, 'view') else None
+    if grupo is None:
+        return Response({
+            'success': False,
+            'error': 'Grupo no encontrado'
+        }, status=status.HTTP_404_NOT_FOUND)
+    return Response({'success': True, 'monedas': grupo_balances(grupo)}, status=status.HTTP_200_OK)
 
 
 class GrupoMembershipListCreate(generics.ListCreateAPIView):
     """
     API endpoint - Lista y crea membresías de grupo
+
+    Crear una membresía requiere rol owner o admin, o ``can_manage_members``.
     """
     serializer_class = GrupoMembershipSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, GrupoRolePermission]
+    grupo_body_actions = {'POST': 'manage_members'}
 
     def get_queryset(self):
         grupo_id = self.request.query_params.get('grupo_id')
@@ -72,21 +155,20 @@ class GrupoMembershipListCreate(generics.ListCreateAPIView):
                 grupo__members=self.request.user
             ).distinct()
 
-    def perform_create(self, serializer):
-        # Ensure user can only create memberships for grupos they belong to
-        grupo = serializer.validated_data['grupo']
-        if not grupo.is_member(self.request.user):
-            raise PermissionDenied("You don't have permission to manage this grupo's memberships")
-        serializer.save()
-
 
 class GrupoMembershipDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint - Obtiene, actualiza o elimina una membresía específica
+
+    Modificarla requiere rol owner o admin, o ``can_manage_members``; cada
+    miembro puede eliminar su propia membresía (salir del grupo).
     """
     serializer_class = GrupoMembershipSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, GrupoRolePermission]
     lookup_field = 'id'
+    # Also checked against the grupo a membership is moved to
+    grupo_body_actions = {'PUT': 'manage_members', 'PATCH': 'manage_members'}
+    grupo_object_actions = {'PUT': 'manage_members', 'PATCH': 'manage_members', 'DELETE': 'manage_members'}
 
     def get_queryset(self):
         # Only allow access to memberships in grupos where the user is a member
@@ -94,13 +176,22 @@ class GrupoMembershipDetail(generics.RetrieveUpdateDestroyAPIView):
             grupo__members=self.request.user
         ).distinct()
 
+    def check_object_permissions(self, request, obj):
+        # Leaving a grupo needs no role
+        if request.method == 'DELETE' and obj.user_id == request.user.id:
+            return
+        super().check_object_permissions(request, obj)
+
 
 class GrupoInvitationListCreate(generics.ListCreateAPIView):
     """
     API endpoint - Lista y crea invitaciones de grupo
+
+    Invitar requiere rol owner o admin, o ``can_manage_members``.
     """
     serializer_class = GrupoInvitationSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, GrupoRolePermission]
+    grupo_body_actions = {'POST': 'manage_members'}
 
     def get_queryset(self):
         # Return invitations for grupos where the user is a member
@@ -110,9 +201,6 @@ class GrupoInvitationListCreate(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         # Automatically set the invited_by to the authenticated user
-        grupo = serializer.validated_data['grupo']
-        if not grupo.is_member(self.request.user):
-            raise PermissionDenied("You don't have permission to invite users to this grupo")
         serializer.save(invited_by=self.request.user)
 
 
@@ -127,16 +215,17 @@ class ExpenseSplitListCreate(generics.ListCreateAPIView):
         expense_id = self.request.query_params.get('expense_id')
         if expense_id:
             # Return splits for a specific expense
-            return ExpenseSplit.objects.filter(
+            queryset = ExpenseSplit.objects.filter(
                 expense_id=expense_id,
                 expense__user=self.request.user
             )
         else:
             # Return all splits for expenses created by the user or splits assigned to the user
             from django.db.models import Q
-            return ExpenseSplit.objects.filter(
+            queryset = ExpenseSplit.objects.filter(
                 Q(expense__user=self.request.user) | Q(user=self.request.user)
             ).distinct()
+        return self.get_serializer_class().setup_eager_loading(queryset)
 
     def perform_create(self, serializer):
         # Ensure user can only create splits for their own expenses
@@ -146,12 +235,6 @@ class ExpenseSplitListCreate(generics.ListCreateAPIView):
         serializer.save()
 
 
-import requests
-
-URL_DOLARAPI = 'https://dolarapi.com/v1/dolares'
-
-
-
 class CreateUserView(generics.CreateAPIView):
     """git 
     API endpoint - Crea un nuevo usuarios
@@ -182,43 +265,350 @@ def get_current_user(request):
     }
     return Response(user_data, status=status.HTTP_200_OK)
 
-class GastoListCreate(generics.ListCreateAPIView):
+class GastoListCreate(ConditionalListMixin, generics.ListCreateAPIView):
     """
     API endpoint - Lista y crea gastos
+
+    La lista se pagina por cursor; ``?paginate=false`` devuelve todos los gastos.
+    Filtros y orden: ver ``api.filters.filter_gastos``.
+    Campos: ``?fields=`` y ``?expand=`` (ver ``SparseFieldsetMixin``).
+    Validación condicional: ETag / Last-Modified (ver ``ConditionalListMixin``).
+    Cargar un gasto en un grupo requiere poder agregar gastos en él (ver ``GrupoRolePermission``).
     """
-    serializer_class = GastoSerializer
-    permission_classes = [IsAuthenticated]
+    permission_classes = [IsAuthenticated, GrupoRolePermission]
+    grupo_body_actions = {'POST': 'add_expenses'}
+    pagination_class = GastoCursorPagination
+    filter_backends = [GastoFilterBackend]
+    version_scopes = (GASTOS,)
+
+    def get_serializer_class(self):
+        # Creating answers with the full representation, listing with the compact one
+        if self.request.method == 'POST':
+            return GastoDetailSerializer
+        return GastoListSerializer
 
     def get_queryset(self):
         # Return only gastos for the authenticated user
         return Gasto.objects.filter(user=self.request.user)
+
+    def filter_queryset(self, queryset):
+        # Load only the columns and relations of the requested fields, once
+        # the filters have fixed the ordering the paginator will read
+        queryset = super().filter_queryset(queryset)
+        return self.get_serializer().setup_sparse_loading(queryset)
     
     def perform_create(self, serializer):
         # Automatically set the user to the authenticated user
-        serializer.save(user=self.request.user)
+        gasto = serializer.save(user=self.request.user)
+        self.duplicates = find_duplicates(gasto)
+
+    def create(self, request, *args, **kwargs):
+        response = super().create(request, *args, **kwargs)
+        # Lets the form offer a categoria for gastos left in 'otros'
+        response.data['categoria_sugerida'] = suggest_categoria(request.user, response.data.get('vendedor'))
+        # A warning only: the gasto is saved either way
+        response.data['posibles_duplicados'] = [
+            {'id': gasto.id, 'fecha_gasto': gasto.fecha_gasto, 'monto': gasto.monto, 'moneda': gasto.moneda, 'vendedor': gasto.vendedor}
+            for gasto in self.duplicates
+        ]
+        return response
 
 class GastoDetail(generics.RetrieveUpdateDestroyAPIView):
     """
     API endpoint - Obtiene, actualiza o elimina un gasto específico
+
+    Dejar el gasto en un grupo requiere poder agregar gastos en él.
     """
-    serializer_class = GastoSerializer
-    permission_classes = [IsAuthenticated]
+    serializer_class = GastoDetailSerializer
+    permission_classes = [IsAuthenticated, GrupoRolePermission]
+    grupo_body_actions = {'PUT': 'add_expenses', 'PATCH': 'add_expenses'}
     lookup_field = 'id'
 
     def get_queryset(self):
-        # Return only gastos for the authenticated user
-        return Gasto.objects.filter(user=self.request.user)
+        # Return only gastos for the authenticated user, loading what the
+        # requested fields render
+        queryset = Gasto.objects.filter(user=self.request.user)
+        return self.get_serializer().setup_sparse_loading(queryset)
+
+@api_view(['GET'])
+def gasto_summary(request):
+    """
+    API endpoint - Resumen mensual de gastos por categoría y moneda
+
+    Lee solo la tabla de resúmenes mensuales, que se actualiza con cada alta,
+    edición o baja de gastos. Filtros: ``?desde=AAAA-MM&hasta=AAAA-MM``,
+    ``grupo``, ``categoria`` y ``moneda``.
+    """
+    summary = summarize_gastos(request.user, request.query_params)
+    return Response({'success': True, 'summary': summary}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def installment_projection_view(request):
+    """
+    API endpoint - Proyección de cuotas a pagar por mes
+
+    Agrupa las cuotas pendientes por medio de pago y moneda para los próximos
+    ``?meses=`` meses (12 por defecto). Las cuotas vencidas sin pagar se suman
+    al mes actual. El resultado queda en caché hasta que cambie un gasto.
+    """
+    try:
+        months = int(request.query_params.get('meses', PROJECTION_DEFAULT_MONTHS))
+    except ValueError:
+        months = 0
+    if not 1 <= months <= PROJECTION_MAX_MONTHS:
+        return Response({
+            'success': False,
+            'error': f'meses debe ser un número entre 1 y {PROJECTION_MAX_MONTHS}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    projection = installment_projection(request.user, months)
+    return Response({'success': True, **projection}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def gasto_changes_view(request):
+    """
+    API endpoint - Cambios de gastos desde un cursor (sincronización incremental)
+
+    ``?since=<cursor>`` devuelve los gastos creados o modificados (``upserts``)
+    y los ids eliminados (``deleted``) después del cursor, más el ``cursor``
+    para la próxima llamada. Sin ``since`` devuelve todo el historial por partes.
+    Con ``has_more`` hay que volver a llamar enseguida; con ``reset`` el cliente
+    debe descartar su copia y sincronizar desde cero.
+    """
+    try:
+        limit = min(int(request.query_params.get('limit', CHANGES_PAGE_SIZE)), CHANGES_MAX_PAGE_SIZE)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return Response({
+            'success': False,
+            'error': f'limit debe ser un número entre 1 y {CHANGES_MAX_PAGE_SIZE}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = GastoListSerializer(context={'request': request})
+    queryset = serializer.setup_sparse_loading(Gasto.objects.order_by('updated_at', 'id'))
+    changes = gasto_changes(request.user, request.query_params.get('since'), limit, queryset=queryset)
+    changes['upserts'] = GastoListSerializer(changes['upserts'], many=True, context={'request': request}).data
+    return Response({'success': True, **changes}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def gasto_search(request):
+    """
+    API endpoint - Búsqueda de texto en vendedor, titulo y comentarios
+
+    ``?q=`` busca gastos que contengan todas las palabras (también como
+    prefijo), ordenados por relevancia usando el índice de texto de la base.
+    ``?limit=`` (máximo 100) limita la cantidad de resultados.
+    """
+    try:
+        limit = min(int(request.query_params.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return Response({
+            'success': False,
+            'error': f'limit debe ser un número entre 1 y {SEARCH_MAX_LIMIT}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    serializer = GastoListSerializer(context={'request': request})
+    queryset = serializer.setup_sparse_loading(Gasto.objects.all())
+    gastos = search_gastos(request.user, request.query_params.get('q'), limit, queryset=queryset)
+    results = GastoListSerializer(gastos, many=True, context={'request': request}).data
+    for row, gasto in zip(results, gastos):
+        row['rank'] = gasto.search_rank
+    return Response({'success': True, 'count': len(results), 'results': results}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def vendor_autocomplete(request):
+    """
+    API endpoint - Autocompletado de vendedores
+
+    ``?q=`` devuelve los vendedores del usuario con alguna palabra que empiece
+    así (sin distinguir mayúsculas ni acentos), ordenados por frecuencia de
+    uso, pesando más los usados recientemente. ``?limit=`` (máximo 50).
+    """
+    try:
+        limit = min(int(request.query_params.get('limit', VENDOR_DEFAULT_LIMIT)), VENDOR_MAX_LIMIT)
+    except ValueError:
+        limit = 0
+    if limit <= 0:
+        return Response({
+            'success': False,
+            'error': f'limit debe ser un número entre 1 y {VENDOR_MAX_LIMIT}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    results = suggest_vendors(request.user, request.query_params.get('q', ''), limit)
+    return Response({'success': True, 'results': results}, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def categoria_suggestion(request):
+    """
+    API endpoint - Sugiere una categoría para un vendedor
+
+    ``?vendedor=`` devuelve la categoría que el usuario eligió más veces para
+    ese vendedor y la proporción de sus gastos en ella (``confidence``), o
+    ``null`` si no hay historial.
+    """
+    vendedor = request.query_params.get('vendedor', '')
+    if not vendedor.strip():
+        return Response({
+            'success': False,
+            'error': 'vendedor es requerido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    return Response({
+        'success': True,
+        'suggestion': suggest_categoria(request.user, vendedor),
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def duplicate_gastos(request):
+    """
+    API endpoint - Grupos de gastos posiblemente duplicados
+
+    Revisa todo el historial del usuario: mismo monto (redondeado) y moneda,
+    fechas a un día o menos y vendedores parecidos. Cada grupo se devuelve
+    con sus gastos; los grupos más recientes primero.
+    """
+    clusters = scan_duplicates(request.user)
+    serializer = GastoListSerializer(context={'request': request})
+    queryset = serializer.setup_sparse_loading(Gasto.objects.filter(user=request.user))
+    gastos = queryset.in_bulk([gasto_id for cluster in clusters for gasto_id in cluster])
+    clusters = [[gastos[gasto_id] for gasto_id in cluster if gasto_id in gastos] for cluster in clusters]
+    clusters.sort(key=lambda cluster: max(gasto.fecha_gasto for gasto in cluster), reverse=True)
+    return Response({
+        'success': True,
+        'count': len(clusters),
+        'clusters': [
+            GastoListSerializer(cluster, many=True, context={'request': request}).data
+            for cluster in clusters
+        ],
+    }, status=status.HTTP_200_OK)
+
+
+@api_view(['GET'])
+def export_gastos(request):
+    """
+    API endpoint - Exporta los gastos del usuario en CSV (por defecto) o NDJSON
+
+    Acepta los mismos filtros y orden que la lista (``?formato=csv|ndjson``).
+    Las filas se leen y envían por partes, sin cargar el historial en memoria.
+    """
+    export_format = request.query_params.get('formato', 'csv')
+    if export_format not in EXPORT_FORMATS:
+        return Response({
+            'success': False,
+            'error': f"Formato inválido. Opciones: {', '.join(EXPORT_FORMATS)}"
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    queryset = Gasto.objects.filter(user=request.user)
+    queryset = order_gastos(filter_gastos(queryset, request.query_params), request.query_params)
+
+    response = StreamingHttpResponse(
+        stream_export(queryset, export_format),
+        content_type=EXPORT_FORMATS[export_format],
+    )
+    filename = f"gastos_{request.user.username}_{timezone.localdate():%Y%m%d}.{export_format}"
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@api_view(['GET'])
+def pending_gastos(request):
+    """
+    API endpoint - Deuda pendiente del usuario (cuotas por pagar) por moneda
+
+    Suma ``monto_pendiente`` en la base de datos sobre los gastos con cuotas
+    restantes; acepta los mismos filtros que la lista.
+    """
+    queryset = filter_gastos(Gasto.objects.filter(user=request.user), request.query_params)
+    totals = (
+        queryset.filter(PENDING_GASTOS)
+        .values('moneda')
+        .annotate(monto_pendiente=Sum('monto_pendiente'), monto_total=Sum('monto_total'), gastos=Count('id'))
+        .order_by('moneda')
+    )
+    return Response({'success': True, 'totales': list(totals)}, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+def bulk_gastos(request):
+    """
+    API endpoint - Crea, actualiza y elimina gastos en lote
+
+    Body: ``{"create": [...], "update": [{"id": ..., ...}], "delete": [ids]}``.
+    Todo el lote se valida antes de escribir y se aplica en una sola transacción;
+    si algún elemento es inválido no se escribe nada y se devuelve un error por elemento.
+    """
+    result = apply_gasto_batch(request.user, request.data)
+    return Response(result, status=status.HTTP_200_OK)
+
+
+@api_view(['POST'])
+@parser_classes([MultiPartParser])
+def import_statement(request):
+    """
+    API endpoint - Importa un resumen bancario o de tarjeta en CSV
+
+    Campos: ``file`` (CSV), ``medio_pago`` (id por defecto si el CSV no trae
+    ``ente_emisor``), ``moneda``, ``delimitador`` y ``mapping`` (JSON campo -> columna).
+    Las filas ya importadas se omiten.
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return Response({
+            'success': False,
+            'error': 'Archivo requerido'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        mapping = json.loads(request.data.get('mapping') or '{}')
+        if not isinstance(mapping, dict):
+            raise ValueError
+    except ValueError:
+        return Response({
+            'success': False,
+            'error': 'mapping debe ser un objeto JSON'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    text_stream = open_text(upload.file)
+    try:
+        importer = StatementImporter(
+            request.user,
+            mapping=mapping,
+            default_medio_pago=request.data.get('medio_pago') or None,
+            moneda=request.data.get('moneda') or 'ARS',
+            delimiter=request.data.get('delimitador') or None,
+        )
+        summary = importer.run(text_stream)
+    except (StatementImportError, UnicodeDecodeError) as e:
+        return Response({
+            'success': False,
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    finally:
+        text_stream.detach()
+    return Response({'success': True, **summary}, status=status.HTTP_200_OK)
 
-class MedioPagoListCreate(generics.ListCreateAPIView):
+
+class MedioPagoListCreate(ConditionalListMixin, generics.ListCreateAPIView):
     """
     API endpoint - Lista y crea medios de pago
+
+    Validación condicional: ETag / Last-Modified (ver ``ConditionalListMixin``).
     """
     serializer_class = MedioPagoSerializer
     permission_classes = [IsAuthenticated]
+    version_scopes = (MEDIOS_PAGO,)
 
     def get_queryset(self):
         # Return only medios de pago for the authenticated user
-        return MedioPago.objects.filter(user=self.request.user)
+        queryset = MedioPago.objects.filter(user=self.request.user)
+        return self.get_serializer_class().setup_eager_loading(queryset)
     
     def perform_create(self, serializer):
         # Automatically set the user to the authenticated user
@@ -234,33 +624,111 @@ class MedioPagoDetail(generics.RetrieveUpdateDestroyAPIView):
 
     def get_queryset(self):
         # Return only medios de pago for the authenticated user
-        return MedioPago.objects.filter(user=self.request.user)
+        queryset = MedioPago.objects.filter(user=self.request.user)
+        return self.get_serializer_class().setup_eager_loading(queryset)
 
 
 @api_view(['GET'])
 def get_cotizacion(request):
     """
     API endpoint - Trae cotizacion de todas las casas
+
+    Se sirve desde el caché de cotizaciones (ver ``api.rates``): dolarapi se
+    consulta a lo sumo una vez cada 5 minutos, y si no responde se devuelve
+    la última copia. ``Cache-Control`` deja al navegador reusar la respuesta
+    mientras siga fresca.
     """
-    url = URL_DOLARAPI
     try:
-        response = requests.get(url)
-        if response.status_code == 200:
-            data = response.json()
-            return Response({
-                'success': True,
-                'data': data
-            }, status=status.HTTP_200_OK)
-        else:
-            return Response({
-                'success': False,
-                'error': 'Bad Gateway'
-            }, status=status.HTTP_502_BAD_GATEWAY)
-    except requests.RequestException as e:
+        data, age = get_quotes(DOLARES)
+    except QuotesUnavailable:
         return Response({
             'success': False,
-            'error': f'{str(e)}'
+            'error': 'Cotizaciones no disponibles'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    response = Response({
+        'success': True,
+        'data': data
+    }, status=status.HTTP_200_OK)
+    response['Cache-Control'] = _cotizacion_cache_control(age)
+    return response
+
+
+def _cotizacion_cache_control(age):
+    return f'private, max-age={max(int(DOLARES.ttl - age), 0)}, stale-while-revalidate={DOLARES.ttl}'
+
+
+@require_GET
+async def get_cotizacion_async(request):
+    """
+    API endpoint - Trae cotizacion de todas las casas (versión asíncrona)
+
+    Misma respuesta que ``get_cotizacion`` para despliegues ASGI: espera a
+    dolarapi en el event loop (``api.rates.aget_quotes``) en vez de ocupar un
+    thread por request. DRF no soporta vistas async, así que valida el JWT
+    directamente y sin consultar la base: las cotizaciones no son datos del
+    usuario, alcanza con un token válido.
+    """
+    try:
+        if JWTStatelessUserAuthentication().authenticate(request) is None:
+            raise AuthenticationFailed('Authentication credentials were not provided.')
+    except AuthenticationFailed as e:
+        # Same body and header as DRF's 401
+        detail = e.detail if isinstance(e.detail, dict) else {'detail': e.detail}
+        return JsonResponse(detail, status=status.HTTP_401_UNAUTHORIZED, headers={'WWW-Authenticate': 'Bearer realm="api"'})
+
+    try:
+        data, age = await aget_quotes(DOLARES)
+    except QuotesUnavailable:
+        return JsonResponse({
+            'success': False,
+            'error': 'Cotizaciones no disponibles'
         }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    finally:
+        if not isinstance(request, ASGIRequest):
+            # Under WSGI this request's event loop ends with it
+            await arelease_loop()
+    response = JsonResponse({
+        'success': True,
+        'data': data
+    }, status=status.HTTP_200_OK)
+    response['Cache-Control'] = _cotizacion_cache_control(age)
+    return response
+
+
+@api_view(['GET'])
+def cotizacion_historica(request):
+    """
+    API endpoint - Cotización vigente en cada fecha pedida
+
+    ``?fechas=AAAA-MM-DD,...`` (hasta 366), ``?moneda=USD`` y ``?casa=oficial``.
+    Cada fecha toma la última cotización guardada hasta ese día inclusive;
+    ``null`` si no hay ninguna anterior.
+    """
+    moneda = request.query_params.get('moneda', 'USD').upper()
+    casa = request.query_params.get('casa', DEFAULT_CASA).lower()
+    try:
+        fechas = sorted({date.fromisoformat(value.strip()) for value in request.query_params.get('fechas', '').split(',') if value.strip()})
+    except ValueError:
+        fechas = None
+    if not fechas or len(fechas) > 366:
+        return Response({
+            'success': False,
+            'error': 'fechas debe ser una lista de 1 a 366 fechas AAAA-MM-DD separadas por comas'
+        }, status=status.HTTP_400_BAD_REQUEST)
+
+    history = RateHistory.load(fechas, [moneda], casa=casa)
+    cotizaciones = {}
+    for fecha in fechas:
+        quote = history.quote(moneda, fecha)
+        cotizaciones[fecha.isoformat()] = None if quote is None else {
+            'fecha': quote[0], 'compra': quote[1], 'venta': quote[2],
+        }
+    return Response({
+        'success': True,
+        'moneda': moneda,
+        'casa': casa,
+        'cotizaciones': cotizaciones,
+    }, status=status.HTTP_200_OK)
 
 
 @api_view(['POST'])
@@ -62,7 +62,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',
+    # whitenoise.middleware.WhiteNoiseMiddleware, async-capable for ASGI
+    'api.middleware.AsyncWhiteNoiseMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -105,6 +106,17 @@ DATABASES = {
 if not DEBUG:
     DATABASES['default']['CONN_MAX_AGE'] = 60
 
+# Per-user computed data (installment projections, ...) is cached here and
+# invalidated through a per-user gasto version (see api.caching). The default
+# local memory cache is per process: point these at a shared backend when
+# running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv('DJANGO_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('DJANGO_CACHE_LOCATION', ''),
+    }
+}
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
@@ -155,4 +167,6 @@ AUTH_RATE_LIMIT = {
     'MAX_FAILURES': 5,           # Failures allowed before temporary block
     'BLOCK_MINUTES': 15,         # How long user/identifier is blocked after threshold
     'RETENTION_DAYS': 30,        # Purge LoginAttempt rows older than this (management command)
-}
\ No newline at end of file
+}
+# Exchange rates upstream; point it at `manage.py fake_dolarapi` to run offline
+DOLARAPI_URL = os.getenv('DOLARAPI_URL', 'https://dolarapi.com/v1')